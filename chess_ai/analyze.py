@@ -0,0 +1,193 @@
+"""
+This module is the non-interactive batch analyzer. It reads positions from
+files or stdin, one per line, and prints one JSON object per position with
+its legal moves, game status, the engine's best move and score, and timings.
+
+Each input line is one of:
+
+- a FEN, optionally followed by ``moves <move> ...``
+- ``startpos`` or ``fen <fen>``, optionally followed by ``moves <move> ...``
+  (the UCCI ``position`` syntax; a leading ``position`` is ignored)
+- a bare move list such as ``h2e2 h9g7``, played from the starting position
+
+Blank lines and lines starting with ``#`` are skipped. Lines are analyzed in
+chunks by a process pool, and results are printed in input order as soon as
+each chunk is done, so the analyzer can sit in a pipeline over large logs.
+
+Run it with ``python run.py analyze [FILE ...] [--depth 3] [--workers N]``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from my_chess.chess_ai.search import Searcher
+from my_chess.chess_core.chessboard import Chessboard
+from my_chess.chess_core.tables import move_from_ucci, move_to_ucci
+
+DEFAULT_DEPTH = 3
+DEFAULT_CHUNK = 32
+
+Line = Tuple[int, str]
+
+
+def parse_position(text: str) -> Chessboard:
+    """Builds the board described by one input line; raises ValueError if invalid."""
+    tokens = text.split()
+    if tokens and tokens[0] == "position":
+        tokens = tokens[1:]
+    if "moves" in tokens:
+        split = tokens.index("moves")
+        setup, moves = tokens[:split], tokens[split + 1 :]
+    elif tokens and (tokens[0] in ("fen", "startpos") or "/" in tokens[0]):
+        setup, moves = tokens, []
+    else:
+        setup, moves = [], tokens
+    if setup and setup[0] == "fen":
+        setup = setup[1:]
+    if setup and setup[0] != "startpos":
+        try:
+            board = Chessboard.from_fen(" ".join(setup))
+        except (ValueError, IndexError, KeyError) as error:
+            raise ValueError(f"invalid FEN: {' '.join(setup)}") from error
+    else:
+        board = Chessboard("analyze")
+        board.init_board()
+    for text_move in moves:
+        move = move_from_ucci(text_move)
+        if move not in board.legal_moves():
+            raise ValueError(f"illegal move: {text_move}")
+        board.make_move(move >> 8, move & 0xFF)
+    return board
+
+
+def analyze_position(text: str, depth: int) -> Dict:
+    """Analyzes one input line; a ``depth`` of 0 skips the search."""
+    start = time.perf_counter()
+    board = parse_position(text)
+    result: Dict = {
+        "fen": board.to_fen(),
+        "turn": "red" if board.is_red_turn else "black",
+        "legal": [move_to_ucci(move) for move in board.legal_moves()],
+        "status": board.get_winner(),
+    }
+    if depth > 0 and result["status"] is None:
+        searcher = Searcher(board)
+        search_start = time.perf_counter()
+        move, score = searcher.search(depth)
+        result.update(
+            best=move_to_ucci(move) if move else None,
+            score=score,
+            depth=depth,
+            nodes=searcher.nodes + searcher.qnodes,
+            search_ms=round((time.perf_counter() - search_start) * 1000, 3),
+        )
+    result["ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+def analyze_chunk(lines: List[Line], depth: int) -> List[Dict]:
+    """Analyzes a chunk of numbered lines (runs in a pool worker)."""
+    results = []
+    for number, text in lines:
+        try:
+            result = analyze_position(text, depth)
+        except ValueError as error:
+            result = {"error": str(error)}
+        results.append({"line": number, "input": text, **result})
+    return results
+
+
+def read_lines(files: Iterable[TextIO]) -> Iterator[Line]:
+    """Yields (line number, text) for every position in the inputs."""
+    number = 0
+    for file in files:
+        for raw in file:
+            number += 1
+            text = raw.strip()
+            if text and not text.startswith("#"):
+                yield number, text
+
+
+def chunked(lines: Iterable[Line], size: int) -> Iterator[List[Line]]:
+    """Splits the input into lists of at most ``size`` lines."""
+    iterator = iter(lines)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyze_lines(
+    lines: Iterable[Line],
+    depth: int = DEFAULT_DEPTH,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK,
+) -> Iterator[Dict]:
+    """
+    Analyzes the lines in parallel chunks, yielding results in input order.
+    Only a few chunks per worker are in flight, so input is read lazily.
+    """
+    chunks = chunked(lines, chunk_size)
+    if workers == 1:
+        for chunk in chunks:
+            yield from analyze_chunk(chunk, depth)
+        return
+    workers = workers or os.cpu_count() or 1
+    window = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(analyze_chunk, chunk, depth))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv=None, stdin: Optional[TextIO] = None, stdout: Optional[TextIO] = None):
+    """Command-line entry point for batch analysis."""
+    parser = argparse.ArgumentParser(description="my_chess batch position analysis")
+    parser.add_argument(
+        "files", nargs="*", help="input files, one position per line (default: stdin)"
+    )
+    parser.add_argument(
+        "--depth", type=int, default=DEFAULT_DEPTH, help="search depth (0: no search)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes (default: CPUs)"
+    )
+    parser.add_argument(
+        "--chunk", type=int, default=DEFAULT_CHUNK, help="positions per work unit"
+    )
+    args = parser.parse_args(argv)
+    stdin = stdin if stdin is not None else sys.stdin
+    stdout = stdout if stdout is not None else sys.stdout
+
+    files = [
+        stdin if name == "-" else open(name, encoding="utf-8") for name in args.files
+    ]
+    try:
+        lines = read_lines(files or [stdin])
+        for result in analyze_lines(
+            lines, max(0, args.depth), args.workers, max(1, args.chunk)
+        ):
+            stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+            stdout.flush()
+    finally:
+        for file in files:
+            if file is not stdin:
+                file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+This module runs the engine search in a separate process, so that an
+interactive front end (the Pygame window) keeps handling events and drawing
+frames while the engine thinks.
+
+The front end calls ``poll()`` once per frame. ``poll()`` never blocks: it
+drains the progress messages of the search (depth, score and principal
+variation of every completed iteration) and returns the best move once the
+search is done.
+
+``start()`` takes an optional ``TimeControl``; the search then runs until the
+``TimeManager`` in the worker ends it instead of stopping at a fixed depth.
+The time it takes to start the worker counts against the clock.
+
+``ponder()`` searches the position after the opponent's expected reply while
+the opponent thinks. Once the opponent has moved, ``check_ponder()`` either
+lets the same search carry on under the clock (the expected move was
+played, so the move is usually ready at once) or cancels it. ``poll()``
+never returns a move found while pondering before that.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import time
+from typing import TYPE_CHECKING, List, Optional
+
+from my_chess.chess_ai.search import MAX_PLY
+from my_chess.chess_ai.smp import parallel_search
+from my_chess.chess_ai.time_manager import TimeManager
+
+if TYPE_CHECKING:
+    from my_chess.chess_ai.search import Searcher
+    from my_chess.chess_ai.time_manager import TimeControl
+    from my_chess.chess_core.chessboard import Chessboard
+
+DEFAULT_DEPTH = 4
+JOIN_TIMEOUT = 2.0
+
+
+def _run_search(
+    search_id: int,
+    board_data: bytes,
+    depth: int,
+    workers: int,
+    stop,
+    results,
+    control: Optional[TimeControl] = None,
+    started: float = 0.0,
+    ponderhit=None,
+) -> None:
+    """Runs one search and reports its progress and result on ``results``."""
+    from my_chess.chess_core.chessboard import Chessboard
+
+    manager = None
+    if control is not None:
+        # started 是父进程的 time.time()，进程启动所花的时间也计入用时
+        spent_ms = max(0.0, (time.time() - started) * 1000)
+        manager = TimeManager(control, stop, spent_ms, ponderhit)
+        stop = manager
+    board = Chessboard.from_bytes(board_data)
+
+    def report(searcher: Searcher, current: int, score: int) -> None:
+        pv = searcher.principal_variation(current)
+        results.put(("info", search_id, current, score, pv))
+        if manager is not None:
+            manager.on_iteration(searcher, current, score)
+
+    result = parallel_search(
+        board, depth, workers=workers, on_iteration=report, stop=stop
+    )
+    results.put(("done", search_id, result.move, result.score, result.nps))
+
+
+class BackgroundSearch:
+    """
+    Searches positions in a worker process, one search at a time.
+
+    By default the search uses one process per CPU but one, which leaves a
+    core for the front end so its frame rate stays steady. ``depth``,
+    ``score``, ``pv`` and ``nps`` describe the current (or last) search.
+    """
+
+    def __init__(self, depth: int = DEFAULT_DEPTH, workers: Optional[int] = None):
+        self.max_depth = depth
+        self.workers = workers or max(1, (os.cpu_count() or 1) - 1)
+        self.context = multiprocessing.get_context()
+        self.results = self.context.Queue()
+        self.process = None
+        self.stop_event = None
+        self.ponderhit_event = None
+        self.ponder_hash = 0
+        self.ponder_result = None
+        self.search_id = 0
+        self.depth = 0
+        self.score = 0
+        self.pv: List[int] = []
+        self.nps = 0
+
+    @property
+    def thinking(self) -> bool:
+        """True while a search is running."""
+        return self.process is not None
+
+    @property
+    def pondering(self) -> bool:
+        """True while searching on the opponent's time."""
+        return self.ponderhit_event is not None and not self.ponderhit_event.is_set()
+
+    def start(
+        self,
+        board: Chessboard,
+        control: Optional[TimeControl] = None,
+        ponder: bool = False,
+    ) -> None:
+        """Starts searching ``board``, budgeted by ``control``'s clock if given."""
+        self.cancel()
+        self.search_id += 1
+        self.depth, self.score, self.pv, self.nps = 0, 0, [], 0
+        board_data = board.to_bytes()
+        self.stop_event = self.context.Event()
+        self.ponderhit_event = self.context.Event() if ponder else None
+        # 搜索进程自己还要启动并行搜索的辅助进程，所以不能设为守护进程
+        self.process = self.context.Process(
+            target=_run_search,
+            args=(
+                self.search_id,
+                board_data,
+                self.max_depth if control is None else MAX_PLY,
+                self.workers,
+                self.stop_event,
+                self.results,
+                control,
+                time.time(),
+                self.ponderhit_event,
+            ),
+        )
+        self.process.start()
+
+    def ponder(
+        self, board: Chessboard, move: int, control: Optional[TimeControl] = None
+    ) -> None:
+        """
+        Starts pondering: searches ``board`` after the opponent's expected ``move``.
+
+        ``control`` is the clock the engine will have once the opponent moves.
+        """
+        board = board.clone()
+        board.make_move(move >> 8, move & 0xFF)
+        self.start(board, control, ponder=True)
+        self.ponder_hash = board.current_hash
+
+    def check_ponder(self, board: Chessboard) -> bool:
+        """
+        Resolves pondering once the opponent has moved to ``board``.
+
+        On the expected move the search goes on under the clock and True is
+        returned; otherwise the search is cancelled.
+        """
+        if not self.pondering:
+            return False
+        if board.current_hash == self.ponder_hash:
+            self.ponderhit_event.set()
+            return True
+        self.cancel()
+        return False
+
+    def poll(self) -> Optional[int]:
+        """Reads pending messages without blocking; returns the best move once found."""
+        if self.ponder_result is not None and not self.pondering:
+            # 后台思考时已经搜完，对方走了预期的着法
+            best_move, self.score, self.nps = self.ponder_result
+            self.ponder_result = None
+            return best_move
+        best_move = None
+        while True:
+            try:
+                message = self.results.get_nowait()
+            except queue.Empty:
+                break
+            kind, search_id = message[0], message[1]
+            if search_id != self.search_id or self.process is None:
+                continue  # 已取消的搜索
+            if kind == "info":
+                self.depth, self.score, self.pv = message[2:]
+            elif self.pondering:
+                self.ponder_result = message[2:]
+                self._finish()
+                break
+            else:
+                best_move, self.score, self.nps = message[2:]
+                self._finish()
+                break
+        return best_move
+
+    def stop(self) -> None:
+        """Asks the running search to finish now; ``poll()`` then returns its move."""
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    def cancel(self) -> None:
+        """Stops the running search (or pondering) and discards its result."""
+        if self.process is not None:
+            self.stop()
+            self._finish()
+        self.ponderhit_event = None
+        self.ponder_result = None
+
+    def close(self) -> None:
+        """Cancels any search; call before the front end exits."""
+        self.cancel()
+
+    def _finish(self) -> None:
+        process = self.process
+        self.process = None
+        self.stop_event = None
+        if process is not None:
+            process.join(JOIN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
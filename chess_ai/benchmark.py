@@ -0,0 +1,273 @@
+"""
+This module is the search benchmark suite. It runs fixed-depth searches over a
+set of positions and reports node counts and timings for each configuration,
+so search changes can be compared on the same work. With ``--movetime`` it
+also searches each position for a fixed time and reports the depth reached
+and the solve rate on ``SOLVE_POSITIONS``, an EPD-style set of positions with
+known best moves. With ``--multipv N`` it reports what each extra line of a
+MultiPV search costs.
+
+Run it with ``python run.py bench`` or ``python -m my_chess.chess_ai.benchmark``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from my_chess.chess_ai.search import MAX_PLY, Searcher
+from my_chess.chess_ai.smp import parallel_search
+from my_chess.chess_core.chessboard import Chessboard
+from my_chess.chess_core.tables import move_to_ucci
+
+BENCH_FENS = [
+    "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1",
+    "rnbakab1r/9/1c4nc1/p1p1p1p1p/9/9/P1P1P1P1P/1C2C4/9/RNBAKABNR w - - 0 1",
+    "r1bakab1r/9/1cn3nc1/p1p1p1p1p/9/9/P1P1P1P1P/1C2C1N2/9/RNBAKAB1R w - - 0 1",
+    "r2akab1r/3n5/4b1nc1/p1p1p3p/6p2/2P1c4/P3P1P1P/1CN1C1N2/9/R1BAKAB1R w - - 0 1",
+    "2bak4/4a4/4b1n2/p3C3p/2p3p2/9/P3c1P1P/4B1N2/4A4/2BAK4 w - - 0 1",
+    "3ak4/4a4/4b4/p3R3p/9/2n3p2/P1r3P1P/4C4/4A4/3AK4 w - - 0 1",
+]
+
+# (FEN, best moves): 一步杀与三步杀，答案由全宽度搜索验证
+SOLVE_POSITIONS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("4k4/9/9/9/9/9/9/9/R8/3K1R3 w - - 0 1", ("a1e1", "f0f8")),
+    ("3k1ab2/4a4/4b4/9/5P3/2R1C4/9/4K4/9/9 w - - 0 1", ("c4d4",)),
+    ("6b2/9/3a1k3/9/6R2/9/2R1C4/3Kn4/9/9 w - - 0 1", ("c3c6", "c3c8")),
+    ("3a1ab2/5k3/9/9/9/R2R2P2/9/9/2p6/3K5 w - - 0 1", ("a4a8", "d4d8")),
+    ("9/4k2C1/b8/9/R8/9/9/1C7/9/5K3 w - - 0 1", ("a5e5",)),
+]
+
+# Searcher switches for the selective search, compared by bench_selective
+SELECTIVE_OPTIONS = ("use_null_move", "use_lmr", "use_futility", "use_check_extension")
+
+
+def selective_configs() -> Dict[str, Dict[str, bool]]:
+    """Returns the configurations to compare: none, each switch alone, all."""
+    configs = {"none": {option: False for option in SELECTIVE_OPTIONS}}
+    for option in SELECTIVE_OPTIONS:
+        configs[option[len("use_") :]] = {
+            other: other == option for other in SELECTIVE_OPTIONS
+        }
+    configs["all"] = {option: True for option in SELECTIVE_OPTIONS}
+    return configs
+
+
+def run_search(fen: str, depth: int, **options) -> Dict[str, float]:
+    """Searches one position and returns its node counts and elapsed time."""
+    board = Chessboard.from_fen(fen)
+    searcher = Searcher(board, **options)
+    start = time.perf_counter()
+    searcher.search(depth)
+    elapsed = time.perf_counter() - start
+    return {
+        "nodes": searcher.nodes,
+        "qnodes": searcher.qnodes,
+        "seconds": elapsed,
+    }
+
+
+def timed_search(fen: str, seconds: float, **options) -> Tuple[Optional[str], int]:
+    """Searches one position for ``seconds``; returns (UCCI best move, depth reached)."""
+    stop = threading.Event()
+    searcher = Searcher(Chessboard.from_fen(fen), stop=stop, **options)
+    timer = threading.Timer(seconds, stop.set)
+    timer.start()
+    try:
+        move, _ = searcher.search(MAX_PLY)
+    finally:
+        timer.cancel()
+    return (move_to_ucci(move) if move else None), searcher.depth
+
+
+def bench_quiescence(depth: int = 3, fens: List[str] = BENCH_FENS) -> None:
+    """Compares quiescence nodes with MVV-LVA ordering and with SEE pruning."""
+    print(f"Quiescence search, depth {depth}: MVV-LVA vs SEE")
+    print(f"{'pos':>3} {'qnodes mvv':>11} {'qnodes see':>11} {'saved':>7} {'time':>13}")
+    totals = {"mvv": 0.0, "see": 0.0, "mvv_s": 0.0, "see_s": 0.0}
+    for index, fen in enumerate(fens, 1):
+        mvv = run_search(fen, depth, use_see=False)
+        see = run_search(fen, depth, use_see=True)
+        totals["mvv"] += mvv["qnodes"]
+        totals["see"] += see["qnodes"]
+        totals["mvv_s"] += mvv["seconds"]
+        totals["see_s"] += see["seconds"]
+        saved = 1 - see["qnodes"] / mvv["qnodes"] if mvv["qnodes"] else 0.0
+        print(
+            f"{index:>3} {mvv['qnodes']:>11} {see['qnodes']:>11} {saved:>7.1%} "
+            f"{mvv['seconds']:>6.2f}/{see['seconds']:<6.2f}"
+        )
+    saved = 1 - totals["see"] / totals["mvv"] if totals["mvv"] else 0.0
+    print(
+        f"all {int(totals['mvv']):>11} {int(totals['see']):>11} {saved:>7.1%} "
+        f"{totals['mvv_s']:>6.2f}/{totals['see_s']:<6.2f}"
+    )
+
+
+def bench_ordering(depth: int = 3, fens: List[str] = BENCH_FENS) -> None:
+    """Compares the total nodes needed to reach ``depth`` with and without move ordering."""
+    print(f"Nodes to depth {depth}: generation order vs staged move ordering")
+    print(
+        f"{'pos':>3} {'nodes plain':>12} {'nodes ordered':>14} {'saved':>7} {'time':>13}"
+    )
+    totals = {"plain": 0.0, "ordered": 0.0, "plain_s": 0.0, "ordered_s": 0.0}
+    for index, fen in enumerate(fens, 1):
+        plain = run_search(fen, depth, use_ordering=False)
+        ordered = run_search(fen, depth, use_ordering=True)
+        plain_nodes = plain["nodes"] + plain["qnodes"]
+        ordered_nodes = ordered["nodes"] + ordered["qnodes"]
+        totals["plain"] += plain_nodes
+        totals["ordered"] += ordered_nodes
+        totals["plain_s"] += plain["seconds"]
+        totals["ordered_s"] += ordered["seconds"]
+        saved = 1 - ordered_nodes / plain_nodes if plain_nodes else 0.0
+        print(
+            f"{index:>3} {plain_nodes:>12} {ordered_nodes:>14} {saved:>7.1%} "
+            f"{plain['seconds']:>6.2f}/{ordered['seconds']:<6.2f}"
+        )
+    saved = 1 - totals["ordered"] / totals["plain"] if totals["plain"] else 0.0
+    print(
+        f"all {int(totals['plain']):>12} {int(totals['ordered']):>14} {saved:>7.1%} "
+        f"{totals['plain_s']:>6.2f}/{totals['ordered_s']:<6.2f}"
+    )
+
+
+def bench_selective(depth: int = 3, fens: List[str] = BENCH_FENS) -> None:
+    """Compares the nodes needed to reach ``depth`` with each selective switch."""
+    print(f"Selective search, depth {depth}: nodes with each switch on its own")
+    print(f"{'config':<16} {'nodes':>10} {'saved':>7} {'time':>7}")
+    baseline = 0
+    for name, options in selective_configs().items():
+        nodes, seconds = 0, 0.0
+        for fen in fens:
+            result = run_search(fen, depth, **options)
+            nodes += result["nodes"] + result["qnodes"]
+            seconds += result["seconds"]
+        baseline = baseline or nodes
+        saved = 1 - nodes / baseline if baseline else 0.0
+        print(f"{name:<16} {nodes:>10} {saved:>7.1%} {seconds:>7.2f}")
+
+
+def bench_timed(
+    seconds: float = 1.0,
+    fens: List[str] = BENCH_FENS,
+    positions: List[Tuple[str, Tuple[str, ...]]] = SOLVE_POSITIONS,
+) -> None:
+    """Reports depth reached and solve rate at a fixed time per position."""
+    print(f"Fixed time, {seconds:g}s per position: depth reached and solve rate")
+    print(f"{'config':<16} {'avg depth':>9} {'min':>4} {'solved':>8}")
+    for name, options in selective_configs().items():
+        depths = [timed_search(fen, seconds, **options)[1] for fen in fens]
+        solved = 0
+        for fen, best_moves in positions:
+            move, _ = timed_search(fen, seconds, **options)
+            solved += move in best_moves
+        print(
+            f"{name:<16} {sum(depths) / len(depths):>9.2f} {min(depths):>4} "
+            f"{solved:>4}/{len(positions):<3}"
+        )
+
+
+def fresh_lines(fen: str, depth: int, lines: int) -> int:
+    """Nodes to find ``lines`` best moves with one fresh search per line."""
+    nodes = 0
+    found: List[int] = []
+    for _ in range(lines):
+        searcher = Searcher(Chessboard.from_fen(fen), exclude_moves=found)
+        move, _ = searcher.search(depth)
+        nodes += searcher.nodes + searcher.qnodes
+        if move is None:
+            break
+        found.append(move)
+    return nodes
+
+
+def bench_multipv(
+    depth: int = 3, max_pv: int = 4, fens: List[str] = BENCH_FENS
+) -> None:
+    """Reports the nodes a MultiPV search needs for 1..``max_pv`` lines."""
+    print(f"MultiPV, depth {depth}: shared search vs one fresh search per line")
+    print(
+        f"{'lines':>5} {'nodes':>10} {'fresh':>10} {'overhead':>9} "
+        f"{'per line':>9} {'time':>7}"
+    )
+    single = 0
+    previous = 0
+    for lines in range(1, max_pv + 1):
+        nodes, fresh, seconds = 0, 0, 0.0
+        for fen in fens:
+            result = run_search(fen, depth, multi_pv=lines)
+            nodes += result["nodes"] + result["qnodes"]
+            seconds += result["seconds"]
+            fresh += fresh_lines(fen, depth, lines)
+        single = single or nodes
+        # overhead：相对单主变搜索多花的节点；per line：最后加入的这条主变的花费
+        overhead = nodes / single - 1 if single else 0.0
+        added = (nodes - previous) / single if lines > 1 and single else 0.0
+        previous = nodes
+        print(
+            f"{lines:>5} {nodes:>10} {fresh:>10} {overhead:>9.1%} "
+            f"{added:>9.1%} {seconds:>7.2f}"
+        )
+
+
+def bench_parallel(
+    depth: int = 3, workers: int = 2, fens: List[str] = BENCH_FENS
+) -> None:
+    """Compares combined nodes per second of one process and of ``workers`` processes."""
+    print(f"Lazy SMP, depth {depth}: 1 vs {workers} processes")
+    print(
+        f"{'pos':>3} {'nps 1':>9} {f'nps {workers}':>9} {'nodes 1':>9} {f'nodes {workers}':>9}"
+    )
+    for index, fen in enumerate(fens, 1):
+        single = parallel_search(Chessboard.from_fen(fen), depth, workers=1)
+        multi = parallel_search(Chessboard.from_fen(fen), depth, workers=workers)
+        print(
+            f"{index:>3} {single.nps:>9} {multi.nps:>9} "
+            f"{single.nodes:>9} {multi.nodes:>9}"
+        )
+
+
+def main(argv=None) -> None:
+    """Command-line entry point for the benchmark suite."""
+    parser = argparse.ArgumentParser(description="my_chess search benchmarks")
+    parser.add_argument("--depth", type=int, default=3, help="search depth")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=1,
+        help="also benchmark Lazy SMP with N processes",
+    )
+    parser.add_argument(
+        "--movetime",
+        type=float,
+        default=0.0,
+        help="also search every position for this many seconds per configuration",
+    )
+    parser.add_argument(
+        "--multipv",
+        type=int,
+        default=1,
+        help="also report the cost of MultiPV searches with up to N lines",
+    )
+    args = parser.parse_args(argv)
+    bench_quiescence(args.depth)
+    print()
+    bench_ordering(args.depth)
+    print()
+    bench_selective(args.depth)
+    if args.movetime > 0:
+        print()
+        bench_timed(args.movetime)
+    if args.multipv > 1:
+        print()
+        bench_multipv(args.depth, args.multipv)
+    if args.threads > 1:
+        print()
+        bench_parallel(args.depth, args.threads)
+
+
+if __name__ == "__main__":
+    main()
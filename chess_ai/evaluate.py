@@ -0,0 +1,39 @@
+"""
+This module provides the static evaluation used by the search: material with a
+bonus for pawns that have crossed the river, scored from the side to move's
+point of view.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from my_chess.chess_core.tables import BLACK_OFFSET, EMPTY, PAWN, own_half
+
+if TYPE_CHECKING:
+    from my_chess.chess_core.chessboard import Chessboard
+
+# Indexed by piece type: King, Mandarin, Elephant, Knight, Rook, Cannon, Pawn
+PIECE_VALUES = (10000, 200, 200, 400, 900, 450, 100)
+CROSSED_PAWN_BONUS = 100
+
+
+def piece_value(code: int) -> int:
+    """Returns the material value of a piece code (0 for an empty square)."""
+    if code == EMPTY:
+        return 0
+    return PIECE_VALUES[code % BLACK_OFFSET]
+
+
+def evaluate(board: Chessboard) -> int:
+    """Scores the position in centipawns for the side to move."""
+    score = 0
+    for sq, code in enumerate(board.codes):
+        if code == EMPTY:
+            continue
+        is_red = code < BLACK_OFFSET
+        value = PIECE_VALUES[code % BLACK_OFFSET]
+        if code % BLACK_OFFSET == PAWN and not own_half(sq, is_red):
+            value += CROSSED_PAWN_BONUS
+        score += value if is_red else -value
+    return score if board.is_red_turn else -score
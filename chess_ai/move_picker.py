@@ -0,0 +1,115 @@
+"""
+This module implements the staged move picker used by the alpha-beta search.
+
+Moves are produced best-first in stages, and each stage is only generated when
+the previous one is exhausted, so a beta cutoff on an early move skips the
+rest of the generation work:
+
+1. the transposition table move
+2. winning and equal captures, by MVV-LVA (losing ones found by SEE are kept
+   for the end)
+3. the two killer moves of this ply, then the countermove to the opponent's
+   last move
+4. quiet moves by history score
+5. losing captures
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator, List, Sequence
+
+from my_chess.chess_ai.evaluate import PIECE_VALUES
+from my_chess.chess_ai.see import see
+from my_chess.chess_core import movegen
+from my_chess.chess_core.tables import BLACK_OFFSET, EMPTY
+
+if TYPE_CHECKING:
+    from my_chess.chess_core.chessboard import Chessboard
+
+# Stages, in the order moves are produced
+STAGE_TT_MOVE = 0
+STAGE_GOOD_CAPTURES = 1
+STAGE_KILLERS = 2
+STAGE_QUIETS = 3
+STAGE_BAD_CAPTURES = 4
+STAGE_DONE = 5
+
+
+class MovePicker:
+    """
+    Iterates over the pseudo-legal moves of the side to move, best first.
+
+    ``killers`` are the killer moves of the current ply, ``counter_move`` the
+    recorded reply to the opponent's last move and ``history`` a table of quiet
+    move scores indexed by packed move.
+    """
+
+    def __init__(
+        self,
+        board: Chessboard,
+        tt_move: int = 0,
+        killers: Sequence[int] = (),
+        counter_move: int = 0,
+        history: Sequence[int] = (),
+    ) -> None:
+        self.board = board
+        self.tt_move = tt_move
+        self.killers = killers
+        self.counter_move = counter_move
+        self.history = history
+        self.stage = STAGE_TT_MOVE
+
+    def __iter__(self) -> Iterator[int]:
+        board = self.board
+        codes = board.codes
+        tt_move = self.tt_move
+        if tt_move and movegen.is_pseudo_legal(board, tt_move):
+            yield tt_move
+
+        self.stage = STAGE_GOOD_CAPTURES
+        captures = movegen.generate_captures(board, [])
+        captures.sort(key=lambda m: _mvv_lva(codes, m), reverse=True)
+        bad_captures: List[int] = []
+        for move in captures:
+            if move == tt_move:
+                continue
+            # 只有以大吃小时才需要 SEE 判断是否亏子
+            attacker = PIECE_VALUES[codes[move >> 8] % BLACK_OFFSET]
+            victim = PIECE_VALUES[codes[move & 0xFF] % BLACK_OFFSET]
+            if attacker > victim and see(board, move) < 0:
+                bad_captures.append(move)
+                continue
+            yield move
+
+        self.stage = STAGE_KILLERS
+        tried = [tt_move]
+        for move in (*self.killers, self.counter_move):
+            if (
+                move
+                and move not in tried
+                and codes[move & 0xFF] == EMPTY
+                and movegen.is_pseudo_legal(board, move)
+            ):
+                tried.append(move)
+                yield move
+
+        self.stage = STAGE_QUIETS
+        quiets = movegen.generate_quiets(board, [])
+        history = self.history
+        if history:
+            quiets.sort(key=history.__getitem__, reverse=True)
+        for move in quiets:
+            if move not in tried:
+                yield move
+
+        self.stage = STAGE_BAD_CAPTURES
+        yield from bad_captures
+        self.stage = STAGE_DONE
+
+
+def _mvv_lva(codes: List[int], move: int) -> int:
+    """Most valuable victim first, least valuable attacker as tie-break."""
+    return (
+        16 * PIECE_VALUES[codes[move & 0xFF] % BLACK_OFFSET]
+        - PIECE_VALUES[codes[move >> 8] % BLACK_OFFSET]
+    )
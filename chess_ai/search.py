@@ -0,0 +1,507 @@
+"""
+This module implements the game tree search on top of ``Chessboard``:
+an iterative-deepening alpha-beta search with a transposition table, staged
+move ordering (hash move, captures, killers, countermove, history) and a
+capture-only quiescence search at the leaves. Repeated positions are ruled
+with the perpetual check/chase adjudicator.
+
+The search is selective: null-move pruning, late-move reductions, futility
+pruning with razoring at frontier nodes and check extensions can each be
+switched off through the ``Searcher`` options, so ``benchmark`` can measure
+what every one of them is worth.
+
+With ``multi_pv`` above one every iteration searches the root again for the
+next best move, skipping the moves already found. The repeated root searches
+share the transposition table, history and killers, so each extra line costs
+a fraction of a fresh search.
+
+The transposition table is keyed on ``Chessboard.canonical_hash``, so a
+position and its left-right mirror share one entry; moves are stored in the
+canonical orientation and mirrored back when the board is the mirror image.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional, Set, Tuple
+
+from my_chess.chess_ai.evaluate import PIECE_VALUES, evaluate
+from my_chess.chess_ai.move_picker import MovePicker
+from my_chess.chess_ai.see import see
+from my_chess.chess_ai.transposition import (
+    EXACT,
+    LOWER,
+    UPPER,
+    TranspositionTable,
+    score_from_tt,
+    score_to_tt,
+)
+from my_chess.chess_core import movegen, repetition
+from my_chess.chess_core.tables import (
+    BLACK_OFFSET,
+    CANNON,
+    EMPTY,
+    KNIGHT,
+    ROOK,
+    mirror_move,
+)
+
+if TYPE_CHECKING:
+    from my_chess.chess_core.chessboard import Chessboard
+
+MATE_SCORE = 30000
+INFINITY = 32000
+MAX_PLY = 64
+# Packed moves are below 90 << 8, so this many slots index every move
+MOVE_SLOTS = 1 << 15
+# The stop signal is polled once every this many nodes (a few ms of search)
+STOP_CHECK_MASK = 127
+# Scores beyond this are mate scores, which pruning must not guess at
+MATE_BOUND = MATE_SCORE - MAX_PLY
+
+# 空着裁剪：剩余深度至少为 NULL_MOVE_MIN_DEPTH 时，让对方连走一步并少搜 R 层
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_DEEP_REDUCTION = 3
+NULL_MOVE_DEEP_DEPTH = 7
+# 防止等着（zugzwang）误判：走棋方至少要有这么多车、马、炮才做空着
+NULL_MOVE_MIN_PIECES = 2
+
+# 后期着法削减：前 LMR_FULL_MOVES 个合法着法全深度搜索，之后的安静着法少搜
+LMR_MIN_DEPTH = 3
+LMR_FULL_MOVES = 3
+LMR_LATE_MOVES = 8
+
+# 前沿节点的静态评估余量（按剩余深度索引），单位与 evaluate 相同
+FUTILITY_MARGINS = (0, 200, 450)
+RAZOR_MARGINS = (0, 300, 600)
+
+
+class SearchStopped(Exception):
+    """Raised inside the search when its stop signal is set."""
+
+
+class Searcher:
+    """
+    Searches a position for the best move.
+
+    ``use_see`` orders quiescence captures by static exchange evaluation and
+    skips the ones that lose material; without it captures are ordered by
+    MVV-LVA and all of them are searched. ``use_ordering`` switches the staged
+    move picker on; without it moves are searched in generation order.
+
+    The selective search options, all on by default:
+
+    - ``use_null_move``: null-move pruning, skipped when in check, right
+      after another null move and when the side to move has fewer than
+      ``NULL_MOVE_MIN_PIECES`` rooks, knights and cannons (endgames where
+      passing could be better than any move).
+    - ``use_lmr``: late quiet moves are searched shallower and re-searched at
+      full depth only if they beat alpha; moves with a good history score are
+      reduced less.
+    - ``use_futility``: at the last two plies, quiet moves that cannot lift
+      the static evaluation to alpha are skipped, and nodes far below alpha
+      drop straight into quiescence (razoring).
+    - ``use_check_extension``: positions in check are searched one ply
+      deeper, up to twice the iteration's depth from the root.
+
+    ``multi_pv`` is the number of best lines to search; after every completed
+    iteration ``pv_lines`` holds their (root move, score) pairs, best first.
+    Root moves in ``exclude_moves`` are never searched.
+
+    ``stop`` is any object with an ``is_set()`` method (e.g. an ``Event``);
+    once it is set the search unwinds and returns the result of the last
+    completed iteration. ``on_iteration(searcher, depth, score)`` is called
+    after every completed iteration.
+    """
+
+    def __init__(
+        self,
+        board: Chessboard,
+        use_see: bool = True,
+        use_ordering: bool = True,
+        tt: Optional[TranspositionTable] = None,
+        stop=None,
+        on_iteration: Optional[Callable[["Searcher", int, int], None]] = None,
+        use_null_move: bool = True,
+        use_lmr: bool = True,
+        use_futility: bool = True,
+        use_check_extension: bool = True,
+        multi_pv: int = 1,
+        exclude_moves: Iterable[int] = (),
+    ) -> None:
+        self.board = board
+        self.use_see = use_see
+        self.use_ordering = use_ordering
+        self.use_null_move = use_null_move
+        self.use_lmr = use_lmr
+        self.use_futility = use_futility
+        self.use_check_extension = use_check_extension
+        self.multi_pv = max(1, multi_pv)
+        self.exclude_moves = frozenset(exclude_moves)
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.stop = stop
+        self.on_iteration = on_iteration
+        self.depth = 0
+        self.nodes = 0
+        self.qnodes = 0
+        self.killers: List[List[int]] = [[0, 0] for _ in range(MAX_PLY)]
+        self.history: List[int] = [0] * MOVE_SLOTS
+        self.counter_moves: List[int] = [0] * MOVE_SLOTS
+        # null_plies[ply] 标记该层走的是空着；null_count 是当前路径上的空着数
+        self.null_plies: List[bool] = [False] * (MAX_PLY + 1)
+        self.null_count = 0
+        # 当前迭代的搜索深度；将军延伸最多延伸到根深度的两倍层数
+        self.root_depth = 0
+        self.root_move = 0
+        # 根节点跳过的着法：exclude_moves 加上多主变搜索中已找到的着法
+        self.root_exclude: Set[int] = set()
+        self.pv_lines: List[Tuple[int, int]] = []
+
+    def search(self, depth: int, start_depth: int = 1) -> Tuple[Optional[int], int]:
+        """Searches with iterative deepening up to ``depth``; returns (move, score)."""
+        board = self.board
+        root_length = len(board.move_stack)
+        self.nodes = 0
+        self.qnodes = 0
+        self.depth = 0
+        self.root_move = 0
+        self.pv_lines = []
+        best_move, score = 0, -MATE_SCORE
+        lines: List[Tuple[int, int]] = []
+        try:
+            for current in range(start_depth, depth + 1):
+                self.root_depth = current
+                lines = []
+                self._search_root(current, lines)
+                if not lines:
+                    break
+                best_move, score = lines[0]
+                self.pv_lines = lines
+                self.depth = current
+                if self.on_iteration is not None:
+                    self.on_iteration(self, current, score)
+                # 停止信号在两轮迭代之间设置时，不再开始注定完不成的下一轮
+                if self.stop is not None and self.stop.is_set():
+                    break
+        except SearchStopped:
+            while len(board.move_stack) > root_length:
+                board.unmake_move()
+            if not best_move:
+                # 第一轮迭代被中断时，优先用已经搜完的第一条主变
+                best_move = lines[0][0] if lines else self.root_move
+        if not best_move:
+            return None, score
+        return best_move, score
+
+    def _search_root(self, depth: int, lines: List[Tuple[int, int]]) -> None:
+        """Runs one iteration, appending up to ``multi_pv`` (move, score) pairs."""
+        self.root_exclude = set(self.exclude_moves)
+        while len(lines) < self.multi_pv:
+            self.root_move = 0
+            # 后一条主变的分数不会高于前一条，可以收紧上界
+            beta = lines[-1][1] + 1 if lines else INFINITY
+            score = self.alphabeta(depth, -INFINITY, beta, 0)
+            if score >= beta:
+                # 剪枝带来的分数不一致时按全窗口重搜
+                score = self.alphabeta(depth, -INFINITY, INFINITY, 0)
+            if not self.root_move:
+                break
+            lines.append((self.root_move, score))
+            self.root_exclude.add(self.root_move)
+        self.root_exclude = set()
+
+    def principal_variations(
+        self, max_length: int = MAX_PLY
+    ) -> List[Tuple[int, List[int]]]:
+        """Returns (score, moves) for every line in ``pv_lines``, best first."""
+        board = self.board
+        variations = []
+        for move, score in self.pv_lines:
+            board.make_move(move >> 8, move & 0xFF)
+            line = [move] + self.principal_variation(max_length - 1)
+            board.unmake_move()
+            variations.append((score, line))
+        return variations
+
+    def principal_variation(self, max_length: int = MAX_PLY) -> List[int]:
+        """Follows the hash table's best moves from the current position."""
+        board = self.board
+        line: List[int] = []
+        while len(line) < max_length:
+            move = self.tt.best_move(board.canonical_hash)
+            if move and board.is_mirrored:
+                move = mirror_move(move)
+            if not move or not movegen.is_pseudo_legal(board, move):
+                break
+            if not movegen.is_legal(board, move):
+                break
+            board.make_move(move >> 8, move & 0xFF)
+            line.append(move)
+            if board.hash_history.get(board.current_hash, 0) > 1:
+                break
+        for _ in line:
+            board.unmake_move()
+        return line
+
+    def alphabeta(self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """Searches the current position to ``depth`` plies (fail-soft)."""
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(alpha, beta, ply)
+        self.nodes += 1
+        self._poll_stop()
+        board = self.board
+        if ply > 0 and not self.null_count:
+            # 空着不进入走棋记录，其子树中不做重复局面裁决
+            repeated = self._repetition_score(ply)
+            if repeated is not None:
+                return repeated
+        in_check = board.in_check(board.is_red_turn)
+        if in_check and self.use_check_extension and ply < 2 * self.root_depth:
+            depth += 1
+
+        key = board.canonical_hash
+        mirrored = board.is_mirrored
+        tt_move = 0
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, flag, tt_score, tt_move = entry
+            if tt_move and mirrored:
+                tt_move = mirror_move(tt_move)
+            if ply > 0 and tt_depth >= depth:
+                tt_score = score_from_tt(tt_score, ply)
+                if (
+                    flag == EXACT
+                    or (flag == LOWER and tt_score >= beta)
+                    or (flag == UPPER and tt_score <= alpha)
+                ):
+                    return tt_score
+
+        futility_score = None
+        if ply > 0 and not in_check:
+            if (
+                self.use_futility
+                and depth < len(FUTILITY_MARGINS)
+                and -MATE_BOUND < alpha < MATE_BOUND
+            ):
+                static_eval = evaluate(board)
+                if static_eval + RAZOR_MARGINS[depth] <= alpha:
+                    score = self.quiescence(alpha, alpha + 1, ply)
+                    if score <= alpha:
+                        return score
+                if static_eval + FUTILITY_MARGINS[depth] <= alpha:
+                    futility_score = static_eval + FUTILITY_MARGINS[depth]
+            if (
+                self.use_null_move
+                and depth >= NULL_MOVE_MIN_DEPTH
+                and -MATE_BOUND < beta < MATE_BOUND
+                and not self.null_plies[ply - 1]
+                and self._null_move_allowed()
+            ):
+                score = self._null_move_score(depth, beta, ply)
+                if score >= beta:
+                    return beta if score >= MATE_BOUND else score
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        legal = 0
+        previous = None
+        if board.move_stack and not self.null_plies[ply - 1]:
+            previous = board.move_stack[-1]
+        killers = self.killers[ply]
+        for move in self._ordered_moves(tt_move, ply, previous):
+            if ply == 0 and move in self.root_exclude:
+                continue
+            quiet = board.codes[move & 0xFF] == EMPTY
+            if not self._make_legal(move):
+                continue
+            legal += 1
+            reduction = 0
+            if legal > 1 and quiet and move != tt_move:
+                selective = futility_score is not None or (
+                    self.use_lmr
+                    and depth >= LMR_MIN_DEPTH
+                    and legal > LMR_FULL_MOVES
+                    and not in_check
+                    and move not in killers
+                )
+                if selective and not board.in_check(board.is_red_turn):
+                    if futility_score is not None:
+                        board.unmake_move()
+                        if futility_score > best_score:
+                            best_score = futility_score
+                        continue
+                    reduction = self._lmr_reduction(depth, legal, move)
+            if reduction:
+                score = -self.alphabeta(
+                    depth - 1 - reduction, -alpha - 1, -alpha, ply + 1
+                )
+                if score > alpha:
+                    score = -self.alphabeta(depth - 1, -beta, -alpha, ply + 1)
+            else:
+                score = -self.alphabeta(depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if ply == 0:
+                    self.root_move = move
+                if score > alpha:
+                    alpha = score
+                    if score >= beta:
+                        if board.codes[move & 0xFF] == EMPTY:
+                            self._update_quiet_stats(move, depth, ply, previous)
+                        break
+        if legal == 0:
+            # 将死与困毙都判负
+            return -MATE_SCORE + ply
+
+        if best_score >= beta:
+            flag = LOWER
+        elif best_score > original_alpha:
+            flag = EXACT
+        else:
+            flag = UPPER
+        if ply == 0 and self.root_exclude:
+            # 排除了最佳着法的根节点结果不能写入置换表
+            return best_score
+        if best_move and mirrored:
+            best_move = mirror_move(best_move)
+        self.tt.store(key, depth, flag, score_to_tt(best_score, ply), best_move)
+        return best_score
+
+    def quiescence(self, alpha: int, beta: int, ply: int) -> int:
+        """Resolves captures until the position is quiet."""
+        self.qnodes += 1
+        self._poll_stop()
+        board = self.board
+        in_check = board.in_check(board.is_red_turn)
+        if in_check:
+            # 被将军时不能站着不动，需要搜索所有应将
+            moves = movegen.generate_moves(board, [])
+        else:
+            stand_pat = evaluate(board)
+            if stand_pat >= beta:
+                return beta
+            if stand_pat > alpha:
+                alpha = stand_pat
+            moves = self.order_captures(movegen.generate_captures(board, []))
+
+        legal = 0
+        for move in moves:
+            if not self._make_legal(move):
+                continue
+            legal += 1
+            score = -self.quiescence(-beta, -alpha, ply + 1)
+            board.unmake_move()
+            if score >= beta:
+                return beta
+            if score > alpha:
+                alpha = score
+        if in_check and legal == 0:
+            return -MATE_SCORE + ply
+        return alpha
+
+    def order_captures(self, captures: List[int]) -> List[int]:
+        """Orders captures best first, dropping losing ones when SEE is on."""
+        codes = self.board.codes
+        if not self.use_see:
+            return sorted(
+                captures,
+                key=lambda m: (
+                    PIECE_VALUES[codes[m >> 8] % BLACK_OFFSET]
+                    - 16 * PIECE_VALUES[codes[m & 0xFF] % BLACK_OFFSET]
+                ),
+            )
+        scored = [(see(self.board, move), move) for move in captures]
+        scored.sort(reverse=True)
+        return [move for score, move in scored if score >= 0]
+
+    def _ordered_moves(self, tt_move: int, ply: int, previous: Optional[Tuple]):
+        if not self.use_ordering:
+            return movegen.generate_moves(self.board, [])
+        counter_move = 0
+        if previous is not None:
+            counter_move = self.counter_moves[previous[0] << 8 | previous[1]]
+        return MovePicker(
+            self.board, tt_move, self.killers[ply], counter_move, self.history
+        )
+
+    def _update_quiet_stats(
+        self, move: int, depth: int, ply: int, previous: Optional[Tuple]
+    ) -> None:
+        """Records a quiet move that caused a beta cutoff."""
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[move] += depth * depth
+        if previous is not None:
+            self.counter_moves[previous[0] << 8 | previous[1]] = move
+
+    def _null_move_allowed(self) -> bool:
+        """Guards null-move pruning against zugzwang in thin endgames."""
+        board = self.board
+        offset = 0 if board.is_red_turn else BLACK_OFFSET
+        pieces = 0
+        for piece_type in (ROOK, KNIGHT, CANNON):
+            pieces += len(board.piece_squares(piece_type + offset))
+        return pieces >= NULL_MOVE_MIN_PIECES
+
+    def _null_move_score(self, depth: int, beta: int, ply: int) -> int:
+        """Lets the opponent move twice and searches the result with a null window."""
+        reduction = NULL_MOVE_REDUCTION
+        if depth >= NULL_MOVE_DEEP_DEPTH:
+            reduction = NULL_MOVE_DEEP_REDUCTION
+        board = self.board
+        length = len(board.move_stack)
+        board.make_null_move()
+        self.null_plies[ply] = True
+        self.null_count += 1
+        try:
+            return -self.alphabeta(depth - 1 - reduction, -beta, -beta + 1, ply + 1)
+        finally:
+            # 搜索在空着子树里被中断时，先退回子树中走的着法再撤销空着
+            while len(board.move_stack) > length:
+                board.unmake_move()
+            self.null_count -= 1
+            self.null_plies[ply] = False
+            board.unmake_null_move()
+
+    def _lmr_reduction(self, depth: int, legal: int, move: int) -> int:
+        """Plies to take off a late quiet move, less if it has cut off before."""
+        reduction = 2 if legal > LMR_LATE_MOVES else 1
+        if self.history[move] >= depth * depth:
+            reduction -= 1
+        return min(reduction, depth - 2)
+
+    def _poll_stop(self) -> None:
+        if (
+            self.stop is not None
+            and (self.nodes + self.qnodes) & STOP_CHECK_MASK == 0
+            and self.stop.is_set()
+        ):
+            raise SearchStopped
+
+    def _make_legal(self, move: int) -> bool:
+        """Makes ``move`` and returns True, or returns False if it is illegal."""
+        board = self.board
+        is_red = board.is_red_turn
+        board.make_move(move >> 8, move & 0xFF)
+        if board.in_check(is_red):
+            board.unmake_move()
+            return False
+        return True
+
+    def _repetition_score(self, ply: int) -> Optional[int]:
+        """Scores a repeated position by the perpetual check/chase rules."""
+        board = self.board
+        if board.hash_history.get(board.current_hash, 0) < 2:
+            return None
+        result = repetition.adjudicate(board, board.rules)
+        if result == "Draw":
+            return 0
+        winner_is_red = result == "Red"
+        if winner_is_red == board.is_red_turn:
+            return MATE_SCORE - ply
+        return -MATE_SCORE + ply
@@ -0,0 +1,64 @@
+"""
+This module implements static exchange evaluation (SEE): the material balance of
+the capture sequence a move starts on its target square, with both sides always
+recapturing with their least valuable piece and free to stop at any point.
+
+The exchange is played out on a private copy of the compact piece code list, and
+the attackers of the square are looked up again from the rays after every
+capture. That way cannon screens that appear or disappear during the exchange,
+x-ray attackers lined up behind the first one, pinned pieces and the rule that
+the kings may not face each other are all taken into account.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List
+
+from my_chess.chess_ai.evaluate import PIECE_VALUES, piece_value
+from my_chess.chess_core.attacks import attackers, in_check
+from my_chess.chess_core.tables import BLACK_OFFSET, EMPTY
+
+if TYPE_CHECKING:
+    from my_chess.chess_core.chessboard import Chessboard
+
+
+def _least_valuable_capture(codes: List[int], target: int, is_red: bool) -> int:
+    """Plays the cheapest legal recapture on ``target``; returns its source or -1."""
+    candidates = attackers(codes, target, is_red)
+    candidates.sort(key=lambda sq: PIECE_VALUES[codes[sq] % BLACK_OFFSET])
+    for source in candidates:
+        captured = codes[target]
+        codes[target] = codes[source]
+        codes[source] = EMPTY
+        if not in_check(codes, is_red):
+            return source
+        codes[source] = codes[target]
+        codes[target] = captured
+    return -1
+
+
+def see(board: Chessboard, move: int) -> int:
+    """Returns the expected material gain of ``move`` for the side to move.
+
+    Quiet moves are scored as the exchange that follows if the opponent
+    captures the moved piece.
+    """
+    codes = list(board.codes)
+    from_sq, target = move >> 8, move & 0xFF
+    # swap[i]: 第 i 次吃子方在交换到此为止时的净得分
+    swap = [piece_value(codes[target])]
+    codes[target] = codes[from_sq]
+    codes[from_sq] = EMPTY
+    is_red = not board.is_red_turn
+
+    while True:
+        on_square = piece_value(codes[target])
+        if _least_valuable_capture(codes, target, is_red) < 0:
+            break
+        swap.append(on_square - swap[-1])
+        is_red = not is_red
+
+    # 每一方都可以选择不再吃回
+    for i in range(len(swap) - 1, 0, -1):
+        swap[i - 1] = min(swap[i - 1], -swap[i])
+    return swap[0]
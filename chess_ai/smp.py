@@ -0,0 +1,147 @@
+"""
+This module implements a Lazy SMP parallel search. Python threads cannot
+speed up a search because of the GIL, so it uses processes instead. Every
+process searches the same root position, and they all share a
+``SharedTranspositionTable``. Odd-numbered helpers skip the first iteration,
+so the processes stay out of step and fill the table with entries that the
+main search then probes. The main search runs in the calling process. Its
+result is the result of the whole search; helpers are stopped as soon as it
+finishes.
+
+Helpers receive the board in its compact ``Chessboard.to_bytes`` encoding,
+which keeps the moves played, so they see the same repetition history as the
+main search. The shared
+table works across processes because Zobrist keys are deterministic.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from my_chess.chess_ai.search import Searcher
+from my_chess.chess_ai.transposition import SharedTranspositionTable
+
+if TYPE_CHECKING:
+    from my_chess.chess_core.chessboard import Chessboard
+
+# Helpers keep deepening past the requested depth until they are stopped
+HELPER_MAX_DEPTH = 64
+RESULT_TIMEOUT = 5.0
+
+
+@dataclass
+class SearchResult:
+    """The outcome of a (parallel) search."""
+
+    move: Optional[int]
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+    workers: int = 1
+    pv: List[int] = field(default_factory=list)
+    # 多主变搜索时每条主变的 (分数, 着法序列)，最佳的在前
+    lines: List[Tuple[int, List[int]]] = field(default_factory=list)
+
+    @property
+    def nps(self) -> int:
+        """Nodes per second over all workers."""
+        return int(self.nodes / self.seconds) if self.seconds > 0 else 0
+
+
+def _helper(
+    index: int,
+    tt_name: str,
+    tt_size: int,
+    board_data: bytes,
+    options: dict,
+    stop,
+    results,
+) -> None:
+    """Runs a helper search until ``stop`` is set, then reports its node count."""
+    from my_chess.chess_core.chessboard import Chessboard
+
+    board = Chessboard.from_bytes(board_data)
+    tt = SharedTranspositionTable(tt_size, name=tt_name)
+    searcher = Searcher(board, tt=tt, stop=stop, **options)
+    try:
+        # 奇数号的辅助进程从更深一层开始，错开各进程的搜索
+        searcher.search(HELPER_MAX_DEPTH, start_depth=1 + index % 2)
+    finally:
+        results.put((index, searcher.nodes + searcher.qnodes))
+        tt.close()
+
+
+def parallel_search(
+    board: Chessboard,
+    depth: int,
+    workers: Optional[int] = None,
+    tt_size: int = 1 << 20,
+    on_iteration: Optional[Callable[[Searcher, int, int], None]] = None,
+    stop=None,
+    **options,
+) -> SearchResult:
+    """
+    Searches ``board`` to ``depth`` with ``workers`` processes (default: one per CPU).
+
+    ``options`` are passed on to every ``Searcher``. With one worker no process
+    is started, but the shared table is still used. Setting ``stop`` ends the
+    search early with the result of the last completed iteration.
+    """
+    workers = workers or os.cpu_count() or 1
+    tt = SharedTranspositionTable(tt_size)
+    context = multiprocessing.get_context()
+    helpers_stop = context.Event()
+    results = context.Queue()
+    helpers = []
+    start = time.perf_counter()
+    try:
+        if workers > 1:
+            board_data = board.to_bytes()
+            for index in range(1, workers):
+                process = context.Process(
+                    target=_helper,
+                    args=(
+                        index,
+                        tt.name,
+                        tt_size,
+                        board_data,
+                        options,
+                        helpers_stop,
+                        results,
+                    ),
+                    daemon=True,
+                )
+                process.start()
+                helpers.append(process)
+        searcher = Searcher(
+            board, tt=tt, stop=stop, on_iteration=on_iteration, **options
+        )
+        move, score = searcher.search(depth)
+        elapsed = time.perf_counter() - start
+        nodes = searcher.nodes + searcher.qnodes
+        helpers_stop.set()
+        for _ in helpers:
+            try:
+                nodes += results.get(timeout=RESULT_TIMEOUT)[1]
+            except queue.Empty:
+                break
+        pv = searcher.principal_variation(depth)
+        lines = searcher.principal_variations(depth)
+        result = SearchResult(
+            move, score, searcher.depth, nodes, elapsed, workers, pv, lines
+        )
+    finally:
+        helpers_stop.set()
+        for process in helpers:
+            process.join(RESULT_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        tt.close()
+        tt.unlink()
+    return result
@@ -0,0 +1,156 @@
+"""
+This module measures how fast each ``run.py`` mode starts. Every measurement
+runs in a fresh interpreter, so it sees a cold process the way a tournament
+manager launching the engine does: module imports, the table cache and, for
+the UCCI engine started through ``run.py ucci``, the time until it answers
+``readyok``. The engine's first output line must be its ``id name``; anything
+printed before the handshake would confuse a GUI, so the profile fails on it.
+
+Run it with ``python run.py --startup-profile`` or
+``python -m my_chess.chess_ai.startup``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+# 各模式对应的入口模块（GUI 与观战模式需要 pygame，其余均为无界面模式）
+MODES: Dict[str, str] = {
+    "ucci": "my_chess.chess_ai.ucci",
+    "analyze": "my_chess.chess_ai.analyze",
+    "bench": "my_chess.chess_ai.benchmark",
+    "serve": "my_chess.chess_server.server",
+    "cli": "my_chess.chess_ui.cli_game",
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+from my_chess.chess_core import table_cache
+print(json.dumps({
+    "import_ms": elapsed * 1000,
+    "modules": len(sys.modules),
+    "pygame": "pygame" in sys.modules,
+    "cache": table_cache.STATS,
+}))
+"""
+
+
+def _package_dir() -> str:
+    return os.path.dirname(os.path.abspath(sys.modules["my_chess"].__file__))
+
+
+def _child_env() -> Dict[str, str]:
+    """Environment for child interpreters that can import ``my_chess``."""
+    env = dict(os.environ)
+    paths = [os.path.dirname(_package_dir())]
+    if env.get("PYTHONPATH"):
+        paths.append(env["PYTHONPATH"])
+    env["PYTHONPATH"] = os.pathsep.join(paths)
+    return env
+
+
+def probe_import(module: str) -> dict:
+    """Imports ``module`` in a fresh interpreter and reports what it cost."""
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE, module],
+        env=_child_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    report = json.loads(output.splitlines()[-1])
+    report["process_ms"] = (time.perf_counter() - start) * 1000
+    return report
+
+
+def ucci_ready_ms() -> float:
+    """Starts ``run.py ucci`` and times it until the engine answers ``readyok``."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(_package_dir(), "run.py"), "ucci"],
+        env=_child_env(),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        process.stdin.write("ucci\nisready\n")
+        process.stdin.flush()
+        first = process.stdout.readline()
+        if not first.startswith("id name "):
+            raise RuntimeError(f"UCCI engine printed {first!r} before its handshake")
+        for line in process.stdout:
+            if line.strip() == "readyok":
+                break
+        elapsed = time.perf_counter() - start
+        process.stdin.write("quit\n")
+        process.stdin.flush()
+        process.wait(timeout=10)
+    finally:
+        if process.poll() is None:
+            process.kill()
+    return elapsed * 1000
+
+
+def interpreter_ms() -> float:
+    """Times a bare interpreter start, the floor for every mode."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def _summary(samples: List[float]) -> str:
+    return f"{min(samples):8.1f} {statistics.median(samples):8.1f}"
+
+
+def profile(repeat: int = 5) -> None:
+    """Prints the startup report for every mode, best and median of ``repeat`` runs."""
+    print(f"startup profile ({repeat} runs each, times in ms: best median)")
+    print(f"{'interpreter':<12} {_summary([interpreter_ms() for _ in range(repeat)])}")
+    print()
+    print(
+        f"{'mode':<12} {'import':>8} {'':>8} {'process':>8} {'':>8} "
+        f"{'modules':>7}  pygame  table cache"
+    )
+    for mode, module in MODES.items():
+        reports = [probe_import(module) for _ in range(repeat)]
+        imports = [r["import_ms"] for r in reports]
+        processes = [r["process_ms"] for r in reports]
+        last = reports[-1]
+        # 第一次运行可能要重建缓存，这里同时列出首次与之后的状态
+        first_cache = reports[0]["cache"]
+        cache = " ".join(
+            f"{name}={first_cache.get(name, '-')}/{status}"
+            for name, status in sorted(last["cache"].items())
+        )
+        print(
+            f"{mode:<12} {_summary(imports)} {_summary(processes)} "
+            f"{last['modules']:>7}  {'yes' if last['pygame'] else 'no':<6}  {cache}"
+        )
+    print()
+    ready = [ucci_ready_ms() for _ in range(repeat)]
+    print(f"{'ucci readyok':<12} {_summary(ready)}")
+
+
+def main(argv=None) -> None:
+    """Command-line entry point for the startup profiler."""
+    parser = argparse.ArgumentParser(description="my_chess startup profile")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement")
+    args = parser.parse_args(argv)
+    profile(max(1, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+This module budgets thinking time under a game clock. ``TimeControl``
+describes the clock of the side to move (remaining time, increment and moves
+to the next time control, or a fixed time per move); ``TimeManager`` turns it
+into two limits for one search:
+
+- the optimum time, which is stretched or shrunk after every iteration from
+  how stable the search is: the best move changing or the score dropping
+  buys more time, a best move that keeps standing, a forced reply or a found
+  mate ends the search early;
+- the maximum time, a hard limit enforced inside the search.
+
+A fixed time per move is used in full unless the move is forced or a mate
+is found.
+
+While pondering (searching on the opponent's time, given a ``ponderhit``
+signal) neither limit applies and the search only ends on the outside stop.
+Once ``ponderhit`` is set the clock is running: the hard limit counts from
+that moment, while the time already spent pondering counts towards the
+optimum time, so a search that has pondered long enough moves at once.
+
+A ``TimeManager`` is both the ``stop`` object and an ``on_iteration`` hook of
+a ``Searcher``: the search polls ``is_set()`` every few hundred nodes, and
+``on_iteration`` decides after every completed iteration whether the next
+one is worth starting. Every limit keeps ``MOVE_OVERHEAD_MS`` in reserve for
+the time it takes the move to reach the clock, so the engine does not flag.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    from my_chess.chess_ai.search import Searcher
+
+# 留给走法传递与进程调度的时间
+MOVE_OVERHEAD_MS = 50
+MIN_THINK_MS = 10
+# 包干制（sudden death）下假定还要走的步数
+MOVES_HORIZON = 30
+INCREMENT_SHARE = 0.75
+# 硬上限：正常时间的倍数，以及剩余时间的比例（到时限前最后一步可用更多）
+MAX_RATIO = 4.0
+MAX_FRACTION = 0.5
+LAST_MOVE_FRACTION = 0.9
+# 已用时间超过目标时间的这个比例时，下一轮迭代多半来不及完成，不再开始
+NEXT_ITERATION_SHARE = 0.6
+# 最佳着法变化与分数下跌时延长思考，连续这么多轮不变时缩短
+INSTABILITY_DECAY = 0.5
+SCORE_DROP_MARGIN = 20
+SCORE_DROP_SCALE = 200
+STABLE_ITERATIONS = 4
+STABLE_FACTOR = 0.5
+
+
+@dataclass
+class TimeControl:
+    """
+    The clock of the side to move, in milliseconds.
+
+    ``moves_to_go`` of 0 means sudden death (plus ``increment_ms`` per move);
+    a positive ``move_time_ms`` overrides the clock with a fixed time per move.
+    """
+
+    time_ms: int = 0
+    increment_ms: int = 0
+    moves_to_go: int = 0
+    move_time_ms: int = 0
+
+
+class TimeManager:
+    """
+    Decides how long one search may think.
+
+    ``stop`` is an optional outside stop signal (an object with ``is_set()``)
+    that ends the search as well, e.g. when the user presses stop.
+    ``spent_ms`` is time already used on this move before the manager was
+    created, such as starting a worker process. ``ponderhit`` (an object with
+    ``is_set()``) makes the search start in ponder mode; it is polled like
+    ``stop`` and starts the clock once set.
+    """
+
+    def __init__(
+        self, control: TimeControl, stop=None, spent_ms: float = 0, ponderhit=None
+    ) -> None:
+        self.control = control
+        self.stop = stop
+        self.ponderhit = ponderhit
+        self.pondering = ponderhit is not None
+        self.optimum_ms, self.maximum_ms = allocate(control)
+        self.start = time.perf_counter() - spent_ms / 1000
+        self.deadline = self.start + self.maximum_ms / 1000
+        self.stopped = False
+        self.best_move = 0
+        self.best_score = 0
+        self.stable_iterations = 0
+        self.instability = 0.0
+        self.target_ms = float(self.optimum_ms)
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the search started."""
+        return (time.perf_counter() - self.start) * 1000
+
+    def is_set(self) -> bool:
+        """True once the search must stop (polled by ``Searcher``)."""
+        if self.stopped:
+            return True
+        if self.stop is not None and self.stop.is_set():
+            self.stopped = True
+        elif self.pondering:
+            if self.ponderhit.is_set():
+                self.start_clock()
+        elif time.perf_counter() >= self.deadline:
+            self.stopped = True
+        return self.stopped
+
+    def start_clock(self) -> None:
+        """Ends ponder mode: the opponent played the expected move."""
+        from my_chess.chess_ai.search import MATE_BOUND
+
+        self.pondering = False
+        self.deadline = time.perf_counter() + self.maximum_ms / 1000
+        if not self.best_move:
+            return
+        # 后台思考的时间算进目标用时：已经想够了或已算出杀棋就直接走
+        if abs(self.best_score) >= MATE_BOUND:
+            self.stopped = True
+        elif self.control.move_time_ms <= 0:
+            if self.elapsed_ms() >= self.target_ms * NEXT_ITERATION_SHARE:
+                self.stopped = True
+
+    def on_iteration(self, searcher: Searcher, depth: int, score: int) -> None:
+        """Updates the time target after an iteration; stops if it is used up."""
+        from my_chess.chess_ai.search import MATE_BOUND
+
+        move = searcher.pv_lines[0][0] if searcher.pv_lines else 0
+        self.instability *= INSTABILITY_DECAY
+        if depth > 1 and move != self.best_move:
+            self.instability += 1.0
+            self.stable_iterations = 0
+        else:
+            self.stable_iterations += 1
+        drop = self.best_score - score if depth > 1 else 0
+        self.best_move, self.best_score = move, score
+
+        factor = 1.0 + self.instability
+        if drop > SCORE_DROP_MARGIN:
+            factor *= 1.0 + min(drop, SCORE_DROP_SCALE) / SCORE_DROP_SCALE
+        elif self.stable_iterations >= STABLE_ITERATIONS:
+            factor *= STABLE_FACTOR
+        self.target_ms = min(self.optimum_ms * factor, self.maximum_ms)
+
+        if self.pondering:
+            return  # 对方还在想，时间不限
+        # 只有一个合法着法或已经算出杀棋时不必再想；固定每步用时则用满
+        forced = depth == 1 and len(searcher.board.legal_moves()) <= 1
+        if forced or abs(score) >= MATE_BOUND:
+            self.stopped = True
+        elif self.control.move_time_ms <= 0:
+            if self.elapsed_ms() >= self.target_ms * NEXT_ITERATION_SHARE:
+                self.stopped = True
+
+
+def allocate(control: TimeControl) -> Tuple[int, int]:
+    """Returns the (optimum, maximum) thinking time in ms for one move."""
+    if control.move_time_ms > 0:
+        budget = max(MIN_THINK_MS, control.move_time_ms - MOVE_OVERHEAD_MS)
+        return budget, budget
+    available = max(0, control.time_ms - MOVE_OVERHEAD_MS)
+    moves = MOVES_HORIZON
+    if control.moves_to_go > 0:
+        moves = min(control.moves_to_go, MOVES_HORIZON)
+    optimum = available / moves + control.increment_ms * INCREMENT_SHARE
+    fraction = LAST_MOVE_FRACTION if control.moves_to_go == 1 else MAX_FRACTION
+    maximum = min(optimum * MAX_RATIO, available * fraction)
+    optimum = min(optimum, maximum)
+    # 时间将尽时也至少想一下，但绝不超过剩余时间
+    floor = min(MIN_THINK_MS, available)
+    return int(max(optimum, floor)), int(max(maximum, floor))
@@ -0,0 +1,178 @@
+"""
+This module implements the transposition table: a fixed-size hash table keyed by
+the board's Zobrist hash that remembers the depth, bound, score and best move
+of searched positions.
+
+``SharedTranspositionTable`` keeps the same table in
+``multiprocessing.shared_memory`` so that parallel search processes can share
+it. Its entries are packed into two 64-bit words and stored with the key
+XORed into the data word, so a torn write from a concurrent store is detected
+as a miss instead of returning a corrupt entry.
+"""
+
+from typing import List, Optional, Tuple
+
+EXACT = 0
+LOWER = 1  # score is a lower bound (fail high)
+UPPER = 2  # score is an upper bound (fail low)
+
+# Scores beyond this are mate scores and are stored relative to the node
+MATE_BOUND = 29000
+
+Entry = Tuple[int, int, int, int]  # (depth, flag, score, move)
+
+
+def score_to_tt(score: int, ply: int) -> int:
+    """Converts a mate score from root-relative to node-relative."""
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score: int, ply: int) -> int:
+    """Converts a stored mate score back to root-relative."""
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class TranspositionTable:
+    """
+    A direct-mapped transposition table with depth-preferred replacement.
+    """
+
+    def __init__(self, size: int = 1 << 18) -> None:
+        self.size = size
+        self.keys: List[int] = [0] * size
+        self.entries: List[Optional[Entry]] = [None] * size
+
+    def probe(self, key: int) -> Optional[Entry]:
+        """Returns the stored (depth, flag, score, move) for ``key``, if any."""
+        index = key % self.size
+        if self.keys[index] == key:
+            return self.entries[index]
+        return None
+
+    def store(self, key: int, depth: int, flag: int, score: int, move: int) -> None:
+        """Stores a search result, keeping deeper results for the same position."""
+        index = key % self.size
+        old = self.entries[index]
+        if self.keys[index] == key and old is not None:
+            if depth < old[0] and flag != EXACT:
+                return
+            if move == 0:
+                move = old[3]
+        self.keys[index] = key
+        self.entries[index] = (depth, flag, score, move)
+
+    def best_move(self, key: int) -> int:
+        """Returns the stored best move for ``key`` (0 if unknown)."""
+        entry = self.probe(key)
+        return entry[3] if entry is not None else 0
+
+    def clear(self) -> None:
+        """Empties the table."""
+        self.keys = [0] * self.size
+        self.entries = [None] * self.size
+
+
+# Packed entry layout: move (16 bits) | score + SCORE_BIAS (16) | flag (2) | depth (8)
+SCORE_BIAS = 1 << 15
+_DEPTH_MASK = 0xFF
+_FLAG_SHIFT = 8
+_SCORE_SHIFT = 10
+_MOVE_SHIFT = 26
+_WORD_MASK = (1 << 64) - 1
+
+
+def pack_entry(depth: int, flag: int, score: int, move: int) -> int:
+    """Packs an entry into one 64-bit word."""
+    return (
+        min(depth, _DEPTH_MASK)
+        | flag << _FLAG_SHIFT
+        | (score + SCORE_BIAS) << _SCORE_SHIFT
+        | move << _MOVE_SHIFT
+    )
+
+
+def unpack_entry(data: int) -> Entry:
+    """Unpacks a word made by ``pack_entry``."""
+    return (
+        data & _DEPTH_MASK,
+        data >> _FLAG_SHIFT & 0x3,
+        (data >> _SCORE_SHIFT & 0xFFFF) - SCORE_BIAS,
+        data >> _MOVE_SHIFT & 0xFFFF,
+    )
+
+
+class SharedTranspositionTable:
+    """
+    A transposition table in shared memory, with the same interface and
+    replacement policy as ``TranspositionTable``.
+
+    Pass no ``name`` to create a new table; pass the ``name`` of an existing
+    one (from another process) to attach to it. The creator must call
+    ``unlink()`` when every process is done with the table.
+    """
+
+    def __init__(self, size: int = 1 << 18, name: Optional[str] = None) -> None:
+        # 延迟导入：单进程搜索不需要为 shared_memory 付出启动开销
+        from multiprocessing import shared_memory
+
+        self.size = size
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size * 16)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        # 偶数位置存 key ^ data，奇数位置存 data
+        self.words = self.shm.buf.cast("Q")
+        if name is None:
+            self.clear()
+
+    def probe(self, key: int) -> Optional[Entry]:
+        """Returns the stored (depth, flag, score, move) for ``key``, if any."""
+        slot = (key % self.size) << 1
+        words = self.words
+        data = words[slot + 1]
+        if data and words[slot] ^ data == key & _WORD_MASK:
+            return unpack_entry(data)
+        return None
+
+    def store(self, key: int, depth: int, flag: int, score: int, move: int) -> None:
+        """Stores a search result, keeping deeper results for the same position."""
+        key &= _WORD_MASK
+        slot = (key % self.size) << 1
+        words = self.words
+        old_data = words[slot + 1]
+        if old_data and words[slot] ^ old_data == key:
+            old = unpack_entry(old_data)
+            if depth < old[0] and flag != EXACT:
+                return
+            if move == 0:
+                move = old[3]
+        data = pack_entry(depth, flag, score, move)
+        words[slot] = key ^ data
+        words[slot + 1] = data
+
+    def best_move(self, key: int) -> int:
+        """Returns the stored best move for ``key`` (0 if unknown)."""
+        entry = self.probe(key)
+        return entry[3] if entry is not None else 0
+
+    def clear(self) -> None:
+        """Empties the table."""
+        self.shm.buf[:] = bytes(len(self.shm.buf))
+
+    def close(self) -> None:
+        """Detaches this process from the table."""
+        self.words.release()
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """Frees the shared memory; call once, from the creating process."""
+        self.shm.unlink()
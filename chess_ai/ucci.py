@@ -0,0 +1,292 @@
+"""
+This module implements a UCCI (Universal Chinese Chess Protocol) engine front
+end, so the search can be driven by UCCI-speaking GUIs and tools over
+stdin/stdout.
+
+Supported commands: ``ucci``, ``isready``, ``setoption``, ``position``,
+``go``, ``ponderhit``, ``stop`` and ``quit``. ``go`` runs the Lazy SMP search with the configured
+number of ``threads``. With ``setoption multipv <n>`` every iteration reports
+the ``n`` best lines, each on its own ``info ... multipv <k> ...`` line.
+
+``go`` accepts a fixed ``depth``, a fixed ``movetime`` or a clock, given
+either the UCCI way (``time``, ``increment``, ``movestogo`` for the side to
+move) or the UCI way (``wtime``/``btime``, ``winc``/``binc``, ``movestogo``,
+where white is Red). Times are in milliseconds; clock searches are budgeted
+by ``time_manager``.
+
+Every ``go`` searches in a background thread, so ``stop`` ends it early.
+``go ponder`` searches the position after the expected reply while the
+opponent thinks and never answers before ``ponderhit`` or ``stop`` arrives. ``ponderhit`` keeps
+the same search (its tree, history and transposition table) going under the
+clock given to ``go ponder``; ``stop`` ends it. ``bestmove`` names the
+expected reply from the principal variation as ``ponder <move>``.
+
+Run it with ``python run.py ucci``.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional, TextIO, Tuple
+
+from my_chess.chess_core import movegen
+from my_chess.chess_core.chessboard import Chessboard
+from my_chess.chess_core.tables import move_from_ucci, move_to_ucci
+
+if TYPE_CHECKING:
+    from my_chess.chess_ai.search import Searcher
+    from my_chess.chess_ai.time_manager import TimeControl, TimeManager
+
+ENGINE_NAME = "my_chess"
+DEFAULT_DEPTH = 4
+DEFAULT_HASH_MB = 16
+MAX_THREADS = 256
+MAX_MULTI_PV = 32
+# 按时间搜索时的最大深度，实际深度由用时决定
+TIMED_MAX_DEPTH = 64
+TT_ENTRY_BYTES = 16
+
+
+class UcciEngine:
+    """
+    Holds the engine state (position and options) and answers UCCI commands.
+
+    ``write`` receives each output line without its newline.
+    """
+
+    def __init__(self, write: Callable[[str], None]) -> None:
+        self.write = write
+        self.threads = 1
+        self.multi_pv = 1
+        self.hash_mb = DEFAULT_HASH_MB
+        self.board = Chessboard("ucci")
+        self.board.init_board()
+        self.search_thread: Optional[threading.Thread] = None
+        self.stop_event: Optional[threading.Event] = None
+        self.ponderhit_event: Optional[threading.Event] = None
+
+    def handle(self, line: str) -> bool:
+        """Handles one command line; returns False once the engine should exit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "ucci":
+            self.write(f"id name {ENGINE_NAME}")
+            self.write(f"option threads type spin min 1 max {MAX_THREADS} default 1")
+            self.write(
+                f"option hashsize type spin min 1 max 1024 default {DEFAULT_HASH_MB}"
+            )
+            self.write(f"option multipv type spin min 1 max {MAX_MULTI_PV} default 1")
+            self.write("ucciok")
+        elif command == "isready":
+            self.write("readyok")
+        elif command == "setoption":
+            self.set_option(args)
+        elif command == "position":
+            self.set_position(args)
+        elif command == "go":
+            self.go(args)
+        elif command == "ponderhit":
+            if self.ponderhit_event is not None:
+                self.ponderhit_event.set()
+        elif command == "stop":
+            self.stop_search()
+        elif command == "quit":
+            self.stop_search()
+            self.write("bye")
+            return False
+        return True
+
+    def set_option(self, args: List[str]) -> None:
+        """Handles ``setoption <name> <value>``."""
+        if len(args) < 2:
+            return
+        name, value = args[0].lower(), args[1]
+        try:
+            number = int(value)
+        except ValueError:
+            return
+        if name == "threads":
+            self.threads = max(1, min(number, MAX_THREADS))
+        elif name == "hashsize":
+            self.hash_mb = max(1, number)
+        elif name == "multipv":
+            self.multi_pv = max(1, min(number, MAX_MULTI_PV))
+
+    def set_position(self, args: List[str]) -> None:
+        """
+        Handles ``position {fen <fen> | startpos} [moves <move> ...]``.
+
+        An invalid FEN is reported on stderr and the previous position kept.
+        """
+        if "moves" in args:
+            split = args.index("moves")
+            setup, moves = args[:split], args[split + 1 :]
+        else:
+            setup, moves = args, []
+        if setup and setup[0] == "fen":
+            try:
+                board = Chessboard.from_fen(" ".join(setup[1:]))
+            except (ValueError, IndexError) as error:
+                # stdout 只输出协议内容；保留原局面
+                print(f"ignored position: {error}", file=sys.stderr)
+                return
+        else:
+            board = Chessboard("ucci")
+            board.init_board()
+        for text in moves:
+            try:
+                move = move_from_ucci(text)
+            except ValueError:
+                break
+            if not movegen.is_pseudo_legal(board, move) or not movegen.is_legal(
+                board, move
+            ):
+                break
+            board.make_move(move >> 8, move & 0xFF)
+        self.board = board
+
+    def parse_go(self, args: List[str]) -> Tuple[int, Optional[TimeControl]]:
+        """Reads the depth limit and the clock (if any) from ``go`` arguments."""
+        values = {}
+        for name, value in zip(args, args[1:]):
+            if value.isdigit():
+                values[name] = int(value)
+        red = self.board.is_red_turn
+        clock = values.get("time", values.get("wtime" if red else "btime"))
+        control = None
+        if clock is not None or "movetime" in values:
+            from my_chess.chess_ai.time_manager import TimeControl
+
+            control = TimeControl(
+                time_ms=clock or 0,
+                increment_ms=values.get(
+                    "increment", values.get("winc" if red else "binc", 0)
+                ),
+                moves_to_go=values.get("movestogo", 0),
+                move_time_ms=values.get("movetime", 0),
+            )
+        default = DEFAULT_DEPTH if control is None else TIMED_MAX_DEPTH
+        return max(1, values.get("depth", default)), control
+
+    def go(self, args: List[str]) -> None:
+        """
+        Handles ``go`` with a depth, a move time or a clock; answers ``bestmove``.
+
+        The search runs in a background thread, so ``stop``, ``ponderhit`` and
+        ``isready`` are answered while it thinks.
+        """
+        self.stop_search()
+        ponder = "ponder" in args
+        depth, control = self.parse_go(args)
+        self.stop_event = threading.Event()
+        self.ponderhit_event = threading.Event() if ponder else None
+        manager = None
+        if control is not None:
+            from my_chess.chess_ai.time_manager import TimeManager
+
+            # 计时从收到 go 开始，包括导入搜索模块的时间
+            manager = TimeManager(
+                control, self.stop_event, ponderhit=self.ponderhit_event
+            )
+        search_args = (depth, manager or self.stop_event, manager, self.ponderhit_event)
+        self.search_thread = threading.Thread(
+            target=self.search, args=search_args, daemon=True
+        )
+        self.search_thread.start()
+
+    def wait_search(self) -> None:
+        """Waits until the search answers ``bestmove``; stops one still pondering."""
+        if self.ponderhit_event is not None and not self.ponderhit_event.is_set():
+            self.stop_search()
+        elif self.search_thread is not None:
+            self.search_thread.join()
+            self.search_thread = self.stop_event = self.ponderhit_event = None
+
+    def stop_search(self) -> None:
+        """Stops the search; it answers ``bestmove`` before this returns."""
+        if self.stop_event is not None:
+            self.stop_event.set()
+        if self.ponderhit_event is not None:
+            self.ponderhit_event.set()
+        if self.search_thread is not None:
+            self.search_thread.join()
+        self.search_thread = self.stop_event = self.ponderhit_event = None
+
+    def search(
+        self,
+        depth: int,
+        stop,
+        manager: Optional[TimeManager] = None,
+        ponderhit: Optional[threading.Event] = None,
+    ) -> None:
+        """Searches the current position and writes ``info`` and ``bestmove``."""
+        # 延迟导入搜索模块，引擎握手（ucci/isready）不必等待它们加载
+        from my_chess.chess_ai.smp import parallel_search
+
+        start = time.perf_counter()
+
+        def report(searcher: Searcher, current: int, score: int) -> None:
+            elapsed = int((time.perf_counter() - start) * 1000)
+            nodes = searcher.nodes + searcher.qnodes
+            lines = searcher.principal_variations(current)
+            for index, (line_score, line) in enumerate(lines, 1):
+                multi_pv = f"multipv {index} " if self.multi_pv > 1 else ""
+                pv = " ".join(move_to_ucci(m) for m in line)
+                self.write(
+                    f"info depth {current} {multi_pv}score {line_score} "
+                    f"nodes {nodes} time {elapsed} pv {pv}"
+                )
+            if manager is not None:
+                manager.on_iteration(searcher, current, score)
+
+        result = parallel_search(
+            self.board,
+            depth,
+            workers=self.threads,
+            tt_size=self.hash_mb * (1 << 20) // TT_ENTRY_BYTES,
+            on_iteration=report,
+            stop=stop,
+            multi_pv=self.multi_pv,
+        )
+        if ponderhit is not None:
+            # 后台思考提前结束（如达到深度）时，等到 ponderhit 或 stop 再回答
+            ponderhit.wait()
+        self.write(
+            f"info depth {result.depth} score {result.score} nodes {result.nodes} "
+            f"time {int((time.perf_counter() - start) * 1000)} nps {result.nps}"
+        )
+        if result.move is None:
+            self.write("nobestmove")
+        elif len(result.pv) > 1 and result.pv[0] == result.move:
+            self.write(
+                f"bestmove {move_to_ucci(result.move)} "
+                f"ponder {move_to_ucci(result.pv[1])}"
+            )
+        else:
+            self.write(f"bestmove {move_to_ucci(result.move)}")
+
+
+def main(stdin: Optional[TextIO] = None, stdout: Optional[TextIO] = None) -> None:
+    """Runs the engine loop over stdin/stdout."""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+
+    def write(line: str) -> None:
+        stdout.write(line + "\n")
+        stdout.flush()
+
+    engine = UcciEngine(write)
+    for line in stdin:
+        if not engine.handle(line):
+            break
+    else:
+        # 输入结束（没有 quit）时让正在进行的搜索给出结果
+        engine.wait_search()
+
+
+if __name__ == "__main__":
+    main()
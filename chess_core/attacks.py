@@ -0,0 +1,172 @@
+"""
+This module computes piece attacks on a compact board: a list of 90 piece codes
+indexed by square (see ``tables``). It answers "which squares does this piece
+attack" and "which pieces attack this square" without building move lists.
+
+A square is attacked when a piece could capture an enemy piece standing on it,
+so attacks on squares holding friendly pieces count as protection. The king's
+file is treated as an attack on the enemy palace squares it sees, which covers
+the rule that the two kings may not face each other.
+"""
+
+from typing import List, Sequence
+
+from my_chess.chess_core.tables import (
+    BLACK_OFFSET,
+    BOTTOM,
+    CANNON,
+    ELEPHANT,
+    ELEPHANT_MOVES,
+    EMPTY,
+    KING,
+    KING_MOVES,
+    KNIGHT,
+    KNIGHT_ATTACKERS,
+    KNIGHT_MOVES,
+    MANDARIN,
+    MANDARIN_MOVES,
+    PAWN,
+    PAWN_ATTACKERS,
+    PAWN_MOVES,
+    RAYS,
+    ROOK,
+    TOP,
+    in_palace,
+)
+
+
+def piece_attacks(codes: Sequence[int], sq: int) -> List[int]:
+    """Returns the squares attacked by the piece standing on ``sq``."""
+    code = codes[sq]
+    is_red = code < BLACK_OFFSET
+    color = 0 if is_red else 1
+    ptype = code % BLACK_OFFSET
+    targets: List[int] = []
+
+    if ptype == ROOK:
+        for ray in RAYS[sq]:
+            for target in ray:
+                targets.append(target)
+                if codes[target] != EMPTY:
+                    break
+    elif ptype == CANNON:
+        for ray in RAYS[sq]:
+            screened = False
+            for target in ray:
+                if screened:
+                    targets.append(target)
+                    if codes[target] != EMPTY:
+                        break
+                elif codes[target] != EMPTY:
+                    screened = True
+    elif ptype == KNIGHT:
+        for target, leg in KNIGHT_MOVES[sq]:
+            if codes[leg] == EMPTY:
+                targets.append(target)
+    elif ptype == ELEPHANT:
+        for target, eye in ELEPHANT_MOVES[color][sq]:
+            if codes[eye] == EMPTY:
+                targets.append(target)
+    elif ptype == MANDARIN:
+        targets.extend(MANDARIN_MOVES[color][sq])
+    elif ptype == KING:
+        targets.extend(KING_MOVES[color][sq])
+        enemy_king = KING + (BLACK_OFFSET if is_red else 0)
+        for target in RAYS[sq][TOP if is_red else BOTTOM]:
+            occupant = codes[target]
+            if in_palace(target, not is_red):
+                if occupant == EMPTY:
+                    targets.append(target)
+                    continue
+                if occupant == enemy_king:
+                    targets.append(target)
+            if occupant != EMPTY:
+                break
+    elif ptype == PAWN:
+        targets.extend(PAWN_MOVES[color][sq])
+    return targets
+
+
+def attackers(
+    codes: Sequence[int], sq: int, by_red: bool, first_only: bool = False
+) -> List[int]:
+    """Returns the squares of ``by_red``'s pieces that attack ``sq``.
+
+    With ``first_only`` the search stops at the first attacker found, which is
+    all that ``is_attacked`` needs.
+    """
+    offset = 0 if by_red else BLACK_OFFSET
+    color = 0 if by_red else 1
+    rook = ROOK + offset
+    cannon = CANNON + offset
+    king = KING + offset
+    found: List[int] = []
+
+    for direction, ray in enumerate(RAYS[sq]):
+        screened = False
+        for source in ray:
+            occupant = codes[source]
+            if occupant == EMPTY:
+                continue
+            if screened:
+                if occupant == cannon:
+                    found.append(source)
+                break
+            if occupant == rook:
+                found.append(source)
+            elif occupant == king:
+                if source in KING_MOVES[color][sq]:
+                    found.append(source)
+                elif (
+                    direction in (TOP, BOTTOM)
+                    and in_palace(sq, not by_red)
+                    and (codes[sq] == EMPTY or codes[sq] % BLACK_OFFSET == KING)
+                ):
+                    found.append(source)
+            screened = True
+        if first_only and found:
+            return found
+
+    knight = KNIGHT + offset
+    for source, leg in KNIGHT_ATTACKERS[sq]:
+        if codes[source] == knight and codes[leg] == EMPTY:
+            found.append(source)
+            if first_only:
+                return found
+
+    pawn = PAWN + offset
+    for source in PAWN_ATTACKERS[color][sq]:
+        if codes[source] == pawn:
+            found.append(source)
+            if first_only:
+                return found
+
+    elephant = ELEPHANT + offset
+    for source, eye in ELEPHANT_MOVES[color][sq]:
+        if codes[source] == elephant and codes[eye] == EMPTY:
+            found.append(source)
+            if first_only:
+                return found
+
+    mandarin = MANDARIN + offset
+    for source in MANDARIN_MOVES[color][sq]:
+        if codes[source] == mandarin:
+            found.append(source)
+            if first_only:
+                return found
+    return found
+
+
+def is_attacked(codes: Sequence[int], sq: int, by_red: bool) -> bool:
+    """Checks whether any of ``by_red``'s pieces attacks ``sq``."""
+    return bool(attackers(codes, sq, by_red, True))
+
+
+def in_check(codes: Sequence[int], is_red: bool) -> bool:
+    """Checks whether the given side's king is attacked (including facing kings)."""
+    king = KING if is_red else KING + BLACK_OFFSET
+    try:
+        king_sq = codes.index(king)
+    except ValueError:
+        return False
+    return is_attacked(codes, king_sq, not is_red)
@@ -1,17 +1,67 @@
 ﻿"""
 This module defines the Chessboard class, which represents the game state, board configuration,
 and game logic. It handles moving pieces, turn management, history tracking, and game end conditions.
+
+``clone`` copies a board for tree exploration without touching the immutable
+tables it shares, and boards pickle as the compact ``to_bytes`` encoding, so
+they are cheap to hand to worker processes.
 """
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Dict, List, Optional
-
-from my_chess.chess_core import chessman
+import struct
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from my_chess.chess_core import attacks, chessman, movegen, repetition
+from my_chess.chess_core.tables import (
+    BLACK_OFFSET,
+    CANNON,
+    CODE_TO_FEN,
+    DIAGONAL_NEIGHBORS,
+    ELEPHANT,
+    EMPTY,
+    KING,
+    KNIGHT,
+    MIRROR_SQUARES,
+    NUM_SQUARES,
+    RAYS,
+    ROOK,
+    col_of,
+    row_of,
+    square,
+)
 
 if TYPE_CHECKING:
     from my_chess.chess_core.chessman import Chessman as ChessmanType
 
+# Positions whose legal move lists are kept before the cache starts over
+LEGAL_CACHE_SIZE = 1024
+
+# 空格子共用的攻击列表，避免每盘棋为 90 个格子各分配一个空列表
+NO_ATTACKS: Tuple[int, ...] = ()
+
+STATE_VERSION = 2
+# version, red to move, move count, repetition stack length, current hash, mirror hash
+STATE_HEADER = struct.Struct("<B?HHQQ")
+
+# FEN character -> (piece class, is_red, Chinese name, English name prefix)
+FEN_PIECES = {
+    "R": (chessman.Rook, True, "车", "red_rook"),
+    "r": (chessman.Rook, False, "车", "black_rook"),
+    "N": (chessman.Knight, True, "马", "red_knight"),
+    "n": (chessman.Knight, False, "马", "black_knight"),
+    "C": (chessman.Cannon, True, "炮", "red_cannon"),
+    "c": (chessman.Cannon, False, "炮", "black_cannon"),
+    "B": (chessman.Elephant, True, "相", "red_elephant"),
+    "b": (chessman.Elephant, False, "象", "black_elephant"),
+    "A": (chessman.Mandarin, True, "仕", "red_mandarin"),
+    "a": (chessman.Mandarin, False, "士", "black_mandarin"),
+    "K": (chessman.King, True, "帅", "red_king"),
+    "k": (chessman.King, False, "将", "black_king"),
+    "P": (chessman.Pawn, True, "兵", "red_pawn"),
+    "p": (chessman.Pawn, False, "卒", "black_pawn"),
+}
+
 
 class Chessboard:
     """
@@ -38,7 +88,17 @@ class Chessboard:
 
         self.zobrist = Zobrist()
         self.current_hash = 0
+        # 左右镜像局面的哈希，与 current_hash 一起增量维护
+        self.mirror_hash = 0
         self.hash_history: Dict[int, int] = {}
+        # 按走棋顺序记录的 (起点, 终点) 格子和每步之后的局面哈希，用于重复局面裁决
+        self.move_stack: List[Tuple[int, int]] = []
+        self.hash_stack: List[int] = []
+        self.rules = repetition.ASIAN_RULES
+        # 悔棋信息：(被吃的棋子, 走棋前的哈希)
+        self.__undo_stack: List[Tuple[Optional[ChessmanType], int]] = []
+        self.__reset_attack_maps()
+        self.__reset_caches()
 
     @property
     def is_red_turn(self) -> bool:
@@ -116,29 +176,35 @@ class Chessboard:
 
         # Initialize Hash
         self.current_hash = self.zobrist.hash_board(self)
+        self.mirror_hash = self.zobrist.hash_board(self, mirror=True)
         self.hash_history = {self.current_hash: 1}
+        self.hash_stack = [self.current_hash]
 
     def add_chessman(self, piece: ChessmanType, col_num: int, row_num: int) -> None:
         """Adds a piece to the board at the specified coordinates."""
         self.chessmans[col_num][row_num] = piece
         if piece.name not in self.__chessmans_hash:
             self.__chessmans_hash[piece.name] = piece
+        self.__set_squares(((square(col_num, row_num), piece.code),))
+        self.__reset_caches()
 
     def remove_chessman_target(self, col_num: int, row_num: int) -> None:
         """Removes a piece from the board at the target coordinates (capture)."""
         chessman_old = self.get_chessman(col_num, row_num)
         if chessman_old is not None:
             self.__chessmans_hash.pop(chessman_old.name)
+            self.__reset_caches()
 
     def remove_chessman_source(self, col_num: int, row_num: int) -> None:
         """Removes a piece from the board at the source coordinates (move away)."""
         self.chessmans[col_num][row_num] = None
+        self.__set_squares(((square(col_num, row_num), EMPTY),))
+        self.__reset_caches()
 
     def calc_chessmans_moving_list(self) -> None:
         """Calculates valid moves for all pieces of the current turn's color."""
-        for piece in self.__chessmans_hash.values():
-            if piece.is_red == self._is_red_turn:
-                piece.calc_moving_list()
+        for piece in self.pieces_of(self._is_red_turn):
+            piece.calc_moving_list()
 
     def clear_chessmans_moving_list(self) -> None:
         """Clears the valid moves list for all pieces."""
@@ -154,54 +220,294 @@ class Chessboard:
             move_str = MoveNotation.get_move_name(
                 piece, piece.col_num, piece.row_num, col_num, row_num
             )
-
-            captured = self.get_chessman(col_num, row_num)
-
-            # Update Hash
-            self.current_hash = self.zobrist.update_hash(
-                self.current_hash,
-                piece,
-                piece.col_num,
-                piece.row_num,
-                col_num,
-                row_num,
-                captured,
-            )
-            self.hash_history[self.current_hash] = (
-                self.hash_history.get(self.current_hash, 0) + 1
-            )
-
             self.moves_history.append(move_str)
-
-            self.remove_chessman_target(col_num, row_num)
-            self.add_chessman(piece, col_num, row_num)
-            self._is_red_turn = not self._is_red_turn
+            self.make_move(
+                square(piece.col_num, piece.row_num), square(col_num, row_num)
+            )
             return True
         else:
             print("the wrong turn")
             return False
 
+    def make_move(self, from_sq: int, to_sq: int) -> None:
+        """Plays a move between two squares without validation or notation.
+
+        This is the fast path used by search and rule adjudication; every
+        change it makes (pieces, hash, attack maps, turn) is reverted by
+        ``unmake_move``. ``moves_history`` is only kept by ``move_chessman``.
+        """
+        from_col, from_row = col_of(from_sq), row_of(from_sq)
+        to_col, to_row = col_of(to_sq), row_of(to_sq)
+        piece = self.__chessmans[from_col][from_row]
+        captured = self.__chessmans[to_col][to_row]
+        assert piece is not None, "no piece on the source square"
+
+        self.__undo_stack.append((captured, self.current_hash))
+        codes = self.__codes
+        self.current_hash = self.zobrist.move_hash(
+            self.current_hash, codes[from_sq], from_sq, to_sq, codes[to_sq]
+        )
+        self.mirror_hash = self.zobrist.move_hash(
+            self.mirror_hash,
+            codes[from_sq],
+            MIRROR_SQUARES[from_sq],
+            MIRROR_SQUARES[to_sq],
+            codes[to_sq],
+        )
+        self.hash_history[self.current_hash] = (
+            self.hash_history.get(self.current_hash, 0) + 1
+        )
+        self.hash_stack.append(self.current_hash)
+        self.move_stack.append((from_sq, to_sq))
+
+        if captured is not None:
+            self.__chessmans_hash.pop(captured.name, None)
+        self.__chessmans[from_col][from_row] = None
+        self.__chessmans[to_col][to_row] = piece
+        piece.update_position(to_col, to_row)
+        self.__set_squares(((from_sq, EMPTY), (to_sq, codes[from_sq])))
+        self._is_red_turn = not self._is_red_turn
+
+    def unmake_move(self) -> None:
+        """Takes back the last move made by ``make_move`` or ``move_chessman``."""
+        from_sq, to_sq = self.move_stack.pop()
+        captured, previous_hash = self.__undo_stack.pop()
+        count = self.hash_history.get(self.current_hash, 0) - 1
+        if count > 0:
+            self.hash_history[self.current_hash] = count
+        else:
+            self.hash_history.pop(self.current_hash, None)
+        self.hash_stack.pop()
+        self.current_hash = previous_hash
+
+        from_col, from_row = col_of(from_sq), row_of(from_sq)
+        to_col, to_row = col_of(to_sq), row_of(to_sq)
+        piece = self.__chessmans[to_col][to_row]
+        assert piece is not None, "no piece on the target square"
+        self.__chessmans[from_col][from_row] = piece
+        self.__chessmans[to_col][to_row] = captured
+        piece.update_position(from_col, from_row)
+        if captured is None:
+            restored = EMPTY
+        else:
+            self.__chessmans_hash[captured.name] = captured
+            restored = captured.code
+        # 异或可逆：对同一步再做一次镜像增量更新即可还原
+        self.mirror_hash = self.zobrist.move_hash(
+            self.mirror_hash,
+            self.__codes[to_sq],
+            MIRROR_SQUARES[from_sq],
+            MIRROR_SQUARES[to_sq],
+            restored,
+        )
+        self.__set_squares(((from_sq, self.__codes[to_sq]), (to_sq, restored)))
+        self._is_red_turn = not self._is_red_turn
+
+    def make_null_move(self) -> None:
+        """
+        Passes the turn without moving a piece, for null-move pruning in the
+        search. The pass is not recorded in the move or repetition history;
+        take it back with ``unmake_null_move`` before undoing earlier moves.
+        """
+        self._is_red_turn = not self._is_red_turn
+        self.current_hash ^= self.zobrist.turn_key
+        self.mirror_hash ^= self.zobrist.turn_key
+
+    def unmake_null_move(self) -> None:
+        """Takes back a pass made by ``make_null_move``."""
+        self.make_null_move()
+
+    @property
+    def canonical_hash(self) -> int:
+        """Returns the hash shared by this position and its left-right mirror."""
+        return min(self.current_hash, self.mirror_hash)
+
+    @property
+    def is_mirrored(self) -> bool:
+        """True if the canonical form of the position is its mirror image.
+
+        Moves stored under ``canonical_hash`` must then be translated with
+        ``tables.mirror_move`` on the way in and out.
+        """
+        return self.mirror_hash < self.current_hash
+
+    @property
+    def codes(self) -> List[int]:
+        """Returns the live list of 90 piece codes indexed by square (read-only)."""
+        return self.__codes
+
+    def square_attacks(self, sq: int) -> Sequence[int]:
+        """Returns the squares attacked by the piece on ``sq`` (read-only)."""
+        return self.__square_attacks[sq]
+
+    def attack_count(self, sq: int, by_red: bool) -> int:
+        """Returns how many of ``by_red``'s pieces attack the square."""
+        return self.__attack_counts[0 if by_red else 1][sq]
+
+    def is_square_attacked(self, sq: int, by_red: bool) -> bool:
+        """Checks in O(1) whether any of ``by_red``'s pieces attacks the square."""
+        return self.__attack_counts[0 if by_red else 1][sq] > 0
+
+    def is_attacked(self, col_num: int, row_num: int, by_red: bool) -> bool:
+        """Checks whether any of ``by_red``'s pieces attacks the given position."""
+        return self.is_square_attacked(square(col_num, row_num), by_red)
+
+    def attackers_of(
+        self, col_num: int, row_num: int, by_red: bool
+    ) -> List[ChessmanType]:
+        """Returns ``by_red``'s pieces that attack the given position."""
+        result = []
+        for sq in attacks.attackers(self.__codes, square(col_num, row_num), by_red):
+            piece = self.__chessmans[col_of(sq)][row_of(sq)]
+            if piece is not None:
+                result.append(piece)
+        return result
+
+    def piece_squares(self, code: int) -> Set[int]:
+        """Returns the live set of squares holding pieces of ``code`` (read-only)."""
+        return self.__piece_squares[code]
+
+    def pieces_of(self, is_red: bool) -> Iterator[ChessmanType]:
+        """Yields the pieces of one side, looked up through the piece lists."""
+        first = 0 if is_red else BLACK_OFFSET
+        chessmans = self.__chessmans
+        for code in range(first, first + BLACK_OFFSET):
+            for sq in tuple(self.__piece_squares[code]):
+                piece = chessmans[col_of(sq)][row_of(sq)]
+                if piece is not None:
+                    yield piece
+
+    def king_square(self, is_red: bool) -> Optional[int]:
+        """Returns the square of the given side's king, or None if it is gone."""
+        for sq in self.__piece_squares[KING if is_red else KING + BLACK_OFFSET]:
+            return sq
+        return None
+
+    def in_check(self, is_red: bool) -> bool:
+        """Checks whether the given side's king is attacked (including facing kings)."""
+        king_sq = self.king_square(is_red)
+        if king_sq is None:
+            return False
+        return self.__attack_counts[1 if is_red else 0][king_sq] > 0
+
+    def is_in_check(self, is_red: Optional[bool] = None) -> bool:
+        """Checks whether a side (default: the side to move) is in check."""
+        return self.in_check(self._is_red_turn if is_red is None else is_red)
+
+    def __reset_attack_maps(self) -> None:
+        self.__codes: List[int] = [EMPTY] * NUM_SQUARES
+        # 按棋子编码分组的格子集合（每种颜色、每种兵种一组），与 __codes 同步更新
+        self.__piece_squares: List[Set[int]] = [set() for _ in range(2 * BLACK_OFFSET)]
+        self.__square_attacks: List[Sequence[int]] = [NO_ATTACKS] * NUM_SQUARES
+        # 每个格子被红方/黑方攻击（或保护）的次数
+        self.__attack_counts: Tuple[List[int], List[int]] = (
+            [0] * NUM_SQUARES,
+            [0] * NUM_SQUARES,
+        )
+
+    def __dependents(self, sq: int) -> List[int]:
+        """Squares of pieces whose attacks depend on whether ``sq`` is occupied."""
+        codes = self.__codes
+        found = []
+        for ray in RAYS[sq]:
+            if ray and codes[ray[0]] % BLACK_OFFSET == KNIGHT:
+                found.append(ray[0])  # sq 是这匹马的马腿
+            seen = 0
+            for other in ray:
+                code = codes[other]
+                if code == EMPTY:
+                    continue
+                ptype = code % BLACK_OFFSET
+                if seen == 0 and ptype in (ROOK, CANNON, KING):
+                    found.append(other)
+                elif seen == 1 and ptype == CANNON:
+                    found.append(other)
+                seen += 1
+                if seen == 2:
+                    break
+        for other in DIAGONAL_NEIGHBORS[sq]:
+            if codes[other] != EMPTY and codes[other] % BLACK_OFFSET == ELEPHANT:
+                found.append(other)  # sq 是这个象的象眼
+        return found
+
+    def __set_squares(self, changes: Tuple[Tuple[int, int], ...]) -> None:
+        """Writes piece codes and incrementally refreshes the attack maps.
+
+        Only the changed squares and the pieces that look through them (rook,
+        cannon and king rays, knight legs, elephant eyes) are recomputed.
+        """
+        codes = self.__codes
+        piece_squares = self.__piece_squares
+        affected = set()
+        for sq, _ in changes:
+            affected.update(self.__dependents(sq))
+            self.__remove_attacks(sq)
+        for sq, code in changes:
+            old = codes[sq]
+            if old != EMPTY:
+                piece_squares[old].discard(sq)
+            if code != EMPTY:
+                piece_squares[code].add(sq)
+            codes[sq] = code
+        for sq, _ in changes:
+            affected.update(self.__dependents(sq))
+        for sq, _ in changes:
+            affected.discard(sq)
+
+        for sq in affected:
+            self.__remove_attacks(sq)
+            self.__add_attacks(sq)
+        for sq, code in changes:
+            if code != EMPTY:
+                self.__add_attacks(sq)
+
+    def __remove_attacks(self, sq: int) -> None:
+        old = self.__square_attacks[sq]
+        if old:
+            side_counts = self.__attack_counts[
+                0 if self.__codes[sq] < BLACK_OFFSET else 1
+            ]
+            for target in old:
+                side_counts[target] -= 1
+            self.__square_attacks[sq] = NO_ATTACKS
+
+    def __add_attacks(self, sq: int) -> None:
+        new = attacks.piece_attacks(self.__codes, sq)
+        side_counts = self.__attack_counts[0 if self.__codes[sq] < BLACK_OFFSET else 1]
+        for target in new:
+            side_counts[target] += 1
+        self.__square_attacks[sq] = new
+
     def get_winner(self) -> Optional[str]:
-        """Checks if there is a winner (returns 'Red', 'Black', or None).
+        """Checks if the game is over (returns 'Red', 'Black', 'Draw', or None).
 
         判定规则：
-        1. 三次重复局面 → 造成重复的一方（长将/长捉方）判负
+        1. 三次重复局面 → 按 self.rules 裁决：长将/长捉方判负，否则和棋
         2. 将/帅被吃 → 对方胜
         3. 困毙（当前走棋方无任何合法走法）→ 对方胜
+
+        The result is cached until the position or the game history changes,
+        so polling it every frame is free while nobody moves.
         """
-        # 长将/长捉检测：三次重复局面，造成重复的一方判负
-        # move_chessman() 走完后已翻转回合，所以当前 _is_red_turn 是下一步走棋方
-        # 造成重复的是刚走完的一方（即对方），该方判负
-        if self.hash_history.get(self.current_hash, 0) >= 3:
-            # 当前轮到谁走 = 无辜方 → 无辜方胜
-            return "Red" if self._is_red_turn else "Black"
+        # 重复局面裁决取决于走棋历史，所以缓存键包含步数和重复次数
+        key = (
+            self.current_hash,
+            len(self.hash_stack),
+            self.hash_history.get(self.current_hash, 0),
+        )
+        if self.__winner_key != key:
+            self.__winner = self.__compute_winner()
+            self.__winner_key = key
+        return self.__winner
 
-        red_king = self.get_chessman_by_name("red_king")
-        black_king = self.get_chessman_by_name("black_king")
+    def __compute_winner(self) -> Optional[str]:
+        if self.hash_history.get(self.current_hash, 0) >= 3:
+            return self.adjudicate_repetition()
 
-        if not red_king:
+        # 按棋子编码查找将帅，不依赖棋子名字（FEN 局面里叫 red_king_1）
+        if self.king_square(True) is None:
             return "Black"
-        if not black_king:
+        if self.king_square(False) is None:
             return "Red"
 
         # 困毙检测：当前走棋方所有棋子都没有合法走法
@@ -210,14 +516,37 @@ class Chessboard:
 
         return None
 
+    def adjudicate_repetition(self) -> str:
+        """Rules the latest repetition cycle (returns 'Red', 'Black', or 'Draw')."""
+        return repetition.adjudicate(self, self.rules)
+
     def _is_stalemated(self) -> bool:
         """检查当前走棋方是否被困毙（无任何合法走法）。"""
-        for piece in self.__chessmans_hash.values():
-            if piece.is_red == self._is_red_turn:
-                piece.calc_moving_list()
-                if piece.moving_list:
-                    return False
-        return True
+        return not self.__cached_legal_moves()
+
+    def legal_moves(self) -> List[int]:
+        """Returns the legal moves of the side to move as packed moves.
+
+        Unlike ``calc_moving_list`` this filters out moves that leave the
+        mover's king attacked, and it never touches the pieces' moving lists.
+        The lists are cached per position hash.
+        """
+        return list(self.__cached_legal_moves())
+
+    def __cached_legal_moves(self) -> List[int]:
+        moves = self.__legal_cache.get(self.current_hash)
+        if moves is None:
+            if len(self.__legal_cache) >= LEGAL_CACHE_SIZE:
+                self.__legal_cache.clear()
+            moves = movegen.legal_moves(self)
+            self.__legal_cache[self.current_hash] = moves
+        return moves
+
+    def __reset_caches(self) -> None:
+        """Forgets cached results; called whenever pieces are edited directly."""
+        self.__legal_cache: Dict[int, List[int]] = {}
+        self.__winner_key: Optional[Tuple[int, int, int]] = None
+        self.__winner: Optional[str] = None
 
     def is_end(self) -> bool:
         """Checks if the game has ended."""
@@ -369,6 +698,10 @@ class Chessboard:
             screen += "\r\n" * 3
         print(screen)
 
+    def to_codes(self) -> List[int]:
+        """Returns the board as a list of 90 piece codes indexed by square."""
+        return list(self.__codes)
+
     def to_fen(self) -> str:
         """Serializes the board state to a FEN string."""
         fen_rows = []
@@ -402,11 +735,205 @@ class Chessboard:
         }
         self.moves_history = []
         self.current_hash = 0
+        self.mirror_hash = 0
         self.hash_history = {}
+        self.move_stack = []
+        self.hash_stack = []
+        self.__undo_stack = []
+        self.__reset_attack_maps()
+        self.__reset_caches()
+
+    def clone(self) -> "Chessboard":
+        """Returns an independent copy of the board and its game history.
+
+        Only the position arrays and the pieces are copied. Zobrist keys, the
+        move tables, the rules and the per-square attack lists (which are
+        replaced, never edited in place) are shared with the original, so a
+        clone costs a small fraction of ``copy.deepcopy``. Cached legal moves
+        and results start empty.
+        """
+        board = self.__class__.__new__(self.__class__)
+        copies: Dict[int, ChessmanType] = {}
+
+        def copy_of(piece: Optional[ChessmanType]) -> Optional[ChessmanType]:
+            if piece is None:
+                return None
+            copied = copies.get(id(piece))
+            if copied is None:
+                copied = copies[id(piece)] = piece.copy_to(board)
+            return copied
+
+        # 只走有子的格子，不必逐格复制 9x10 的棋子表
+        chessmans: List[List[Optional[ChessmanType]]] = [
+            ([None] * 10) for _ in range(9)
+        ]
+        for sq, code in enumerate(self.__codes):
+            if code != EMPTY:
+                col, row = col_of(sq), row_of(sq)
+                chessmans[col][row] = copy_of(self.__chessmans[col][row])
+
+        board.__name = self.__name
+        board._is_red_turn = self._is_red_turn
+        board.__chessmans = chessmans
+        board.__chessmans_hash = {
+            name: copy_of(piece) for name, piece in self.__chessmans_hash.items()
+        }
+        board.__history = {
+            side: dict(entry, chessman=copy_of(entry["chessman"]))
+            for side, entry in self.__history.items()
+        }
+        board.moves_history = list(self.moves_history)
+        board.zobrist = self.zobrist
+        board.current_hash = self.current_hash
+        board.mirror_hash = self.mirror_hash
+        board.hash_history = dict(self.hash_history)
+        board.move_stack = list(self.move_stack)
+        board.hash_stack = list(self.hash_stack)
+        board.rules = self.rules
+        board.__undo_stack = [
+            (copy_of(captured), previous) for captured, previous in self.__undo_stack
+        ]
+        board.__codes = list(self.__codes)
+        board.__piece_squares = [set(squares) for squares in self.__piece_squares]
+        board.__square_attacks = list(self.__square_attacks)
+        board.__attack_counts = (
+            list(self.__attack_counts[0]),
+            list(self.__attack_counts[1]),
+        )
+        board.__reset_caches()
+        return board
+
+    def __deepcopy__(self, memo: Dict) -> "Chessboard":
+        return self.clone()
+
+    def __reduce__(self):
+        return (self.__class__.from_bytes, (self.to_bytes(),))
+
+    def to_bytes(self) -> bytes:
+        """Encodes the board, its move stack and repetition history compactly.
+
+        The encoding holds the 90 square codes, the moves played with the
+        piece each one captured, the repetition stack and the piece names;
+        ``from_bytes`` rebuilds an equivalent board from it.
+        """
+        codes = self.__codes
+        pieces = [
+            self.__chessmans[col_of(sq)][row_of(sq)]
+            for sq in range(NUM_SQUARES)
+            if codes[sq] != EMPTY
+        ]
+        captured = [piece for piece, _ in self.__undo_stack]
+        pieces.extend(piece for piece in captured if piece is not None)
+        count = len(self.move_stack)
+        # 文本部分：棋盘名、规则名、每个棋子的名字，然后是记谱
+        text = "\n".join(
+            [
+                self.__name,
+                self.rules.name,
+                *(f"{piece.name}\t{piece.name_cn}" for piece in pieces),
+                *self.moves_history,
+            ]
+        )
+        return b"".join(
+            (
+                STATE_HEADER.pack(
+                    STATE_VERSION,
+                    self._is_red_turn,
+                    count,
+                    len(self.hash_stack),
+                    self.current_hash,
+                    self.mirror_hash,
+                ),
+                bytes(code + 1 for code in codes),
+                struct.pack(
+                    f"<{count}H",
+                    *(from_sq << 8 | to_sq for from_sq, to_sq in self.move_stack),
+                ),
+                bytes(0 if piece is None else piece.code + 1 for piece in captured),
+                struct.pack(
+                    f"<{count}Q", *(previous for _, previous in self.__undo_stack)
+                ),
+                struct.pack(f"<{len(self.hash_stack)}Q", *self.hash_stack),
+                text.encode("utf-8"),
+            )
+        )
+
+    @classmethod
+    def from_bytes(cls, data) -> "Chessboard":
+        """Rebuilds a board from ``to_bytes`` output (any bytes-like object)."""
+        version = data[0]
+        if version != STATE_VERSION:
+            raise ValueError(f"Unsupported board encoding version: {version}")
+        _, is_red_turn, count, hash_count, current_hash, mirror_hash = (
+            STATE_HEADER.unpack_from(data)
+        )
+        offset = STATE_HEADER.size
+        codes = [code - 1 for code in data[offset : offset + NUM_SQUARES]]
+        offset += NUM_SQUARES
+        moves = struct.unpack_from(f"<{count}H", data, offset)
+        offset += 2 * count
+        captured = [code - 1 for code in data[offset : offset + count]]
+        offset += count
+        previous_hashes = struct.unpack_from(f"<{count}Q", data, offset)
+        offset += 8 * count
+        hash_stack = list(struct.unpack_from(f"<{hash_count}Q", data, offset))
+        offset += 8 * hash_count
+        lines = bytes(data[offset:]).decode("utf-8").split("\n")
+        rules = repetition.RULE_SETS.get(lines[1])
+        if rules is None:
+            raise ValueError(f"Unknown repetition rules: {lines[1]}")
+
+        board = cls(lines[0])
+        board._is_red_turn = is_red_turn
+        board.rules = rules
+        labels = iter(lines[2:])
+
+        def make_piece(code: int, sq: int) -> ChessmanType:
+            piece_cls, is_red, _, _ = FEN_PIECES[CODE_TO_FEN[code]]
+            name, name_cn = next(labels).split("\t")
+            piece = piece_cls(name_cn, name, is_red, board)
+            piece.update_position(col_of(sq), row_of(sq))
+            return piece
+
+        for sq, code in enumerate(codes):
+            if code != EMPTY:
+                piece = make_piece(code, sq)
+                board.__chessmans[col_of(sq)][row_of(sq)] = piece
+                board.__chessmans_hash[piece.name] = piece
+        # 被吃的棋子留在被吃时的格子上，悔棋时原样放回
+        board.__undo_stack = [
+            (None if code == EMPTY else make_piece(code, move & 0xFF), previous)
+            for code, move, previous in zip(captured, moves, previous_hashes)
+        ]
+        board.moves_history = list(labels)
+        board.move_stack = [(move >> 8, move & 0xFF) for move in moves]
+        board.current_hash = current_hash
+        board.mirror_hash = mirror_hash
+        board.hash_stack = hash_stack
+        for key in hash_stack:
+            board.hash_history[key] = board.hash_history.get(key, 0) + 1
+        board.__load_codes(codes)
+        return board
+
+    def __load_codes(self, codes: List[int]) -> None:
+        """Sets every square at once and builds the attack maps from scratch."""
+        self.__reset_attack_maps()
+        self.__codes[:] = codes
+        for sq, code in enumerate(codes):
+            if code != EMPTY:
+                self.__piece_squares[code].add(sq)
+        for sq, code in enumerate(codes):
+            if code != EMPTY:
+                self.__add_attacks(sq)
+        self.__reset_caches()
 
     @classmethod
     def from_fen(cls, fen: str) -> "Chessboard":
-        """Creates a Chessboard instance from a FEN string."""
+        """Creates a Chessboard instance from a FEN string.
+
+        Raises ValueError for a malformed FEN: a rank that is not 9 squares
+        wide, a piece on a square it can never reach, or a missing king.
+        """
         board = cls("FEN_Board")
         board.clear_board()
 
@@ -421,24 +948,6 @@ class Chessboard:
         if len(rows) != 10:
             raise ValueError("Invalid FEN: Wrong number of rows")
 
-        # Mapping FEN char to (Class, is_red, name_cn_base, name_en_base)
-        char_map = {
-            "R": (chessman.Rook, True, "车", "red_rook"),
-            "r": (chessman.Rook, False, "车", "black_rook"),
-            "N": (chessman.Knight, True, "马", "red_knight"),
-            "n": (chessman.Knight, False, "马", "black_knight"),
-            "C": (chessman.Cannon, True, "炮", "red_cannon"),
-            "c": (chessman.Cannon, False, "炮", "black_cannon"),
-            "B": (chessman.Elephant, True, "相", "red_elephant"),
-            "b": (chessman.Elephant, False, "象", "black_elephant"),
-            "A": (chessman.Mandarin, True, "仕", "red_mandarin"),
-            "a": (chessman.Mandarin, False, "士", "black_mandarin"),
-            "K": (chessman.King, True, "帅", "red_king"),
-            "k": (chessman.King, False, "将", "black_king"),
-            "P": (chessman.Pawn, True, "兵", "red_pawn"),
-            "p": (chessman.Pawn, False, "卒", "black_pawn"),
-        }
-
         counts = {}
 
         for r_idx, row_data in enumerate(rows):
@@ -448,8 +957,8 @@ class Chessboard:
                 if char.isdigit():
                     current_col += int(char)
                 else:
-                    if char in char_map:
-                        piece_cls, is_red, cn_base, en_base = char_map[char]
+                    if char in FEN_PIECES:
+                        piece_cls, is_red, cn_base, en_base = FEN_PIECES[char]
 
                         if en_base not in counts:
                             counts[en_base] = 0
@@ -461,13 +970,28 @@ class Chessboard:
                         )
 
                         piece = piece_cls(name_cn, name_en, is_red, board)
+                        if current_col > 8 or not piece.border_check(
+                            current_col, actual_row
+                        ):
+                            raise ValueError(
+                                f"Invalid FEN: {char} cannot stand on "
+                                f"column {current_col} of rank {actual_row}"
+                            )
                         piece.add_to_board(current_col, actual_row)
                         current_col += 1
                     else:
                         raise ValueError(f"Unknown FEN character: {char}")
+            if current_col != 9:
+                raise ValueError(
+                    f"Invalid FEN: rank {actual_row} is not 9 squares wide"
+                )
+        if counts.get("red_king") != 1 or counts.get("black_king") != 1:
+            raise ValueError("Invalid FEN: each side needs exactly one king")
 
         # Calculate initial hash for FEN
         board.current_hash = board.zobrist.hash_board(board)
+        board.mirror_hash = board.zobrist.hash_board(board, mirror=True)
         board.hash_history = {board.current_hash: 1}
+        board.hash_stack = [board.current_hash]
 
         return board
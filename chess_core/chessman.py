@@ -1,13 +1,44 @@
 ﻿"""
 This module defines the Chessman class and its subclasses (Rook, Knight, Cannon, etc.),
 representing the pieces in Chinese Chess. It handles piece movement logic and validation.
+
+A piece's moves are kept as packed integers (see ``tables.encode_move``) in a
+buffer allocated the first time they are calculated, together with a bitmask
+of target squares for O(1) ``in_moving_list`` checks. ``Point`` objects are
+only built when the UI asks for ``moving_list``.
+
+Pieces use ``__slots__``. Everything that depends only on the piece class
+(piece type, placement bounds) is a class constant, the piece code and FEN
+character are computed once, and the board is held through a weak reference
+that all pieces of a board share, so pieces and boards do not form reference
+cycles and a finished game is freed as soon as it is dropped.
 """
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List, Optional
+import weakref
+from array import array
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 from my_chess.chess_core import point as point_lib
+from my_chess.chess_core.tables import (
+    BLACK_OFFSET,
+    CANNON,
+    CODE_TO_FEN,
+    ELEPHANT,
+    EMPTY,
+    KING,
+    KING_MOVES,
+    KNIGHT,
+    MANDARIN,
+    NUM_SQUARES,
+    PAWN,
+    RAYS,
+    ROOK,
+    col_of,
+    row_of,
+    square,
+)
 
 if TYPE_CHECKING:
     from my_chess.chess_core.chessboard import Chessboard
@@ -18,13 +49,11 @@ def num_between(max_num: int, min_num: int, current: int) -> bool:
     return current >= min_num and current <= max_num
 
 
-def creat_points(
-    list_points: List[point_lib.Point], list_vs: tuple, list_hs: tuple
-) -> None:
-    """Helper to create Point objects from coordinate tuples and add to list."""
-    for v in list_vs:
-        for h in list_hs:
-            list_points.append(point_lib.Point(v, h))
+# 车在空旷处最多 17 步，是单个棋子可走步数的上限
+MAX_PIECE_MOVES = 17
+
+# (top, bottom, left, right) of the area a piece may stand on
+FULL_BOARD = (9, 0, 0, 8)
 
 
 class Chessman:
@@ -33,20 +62,47 @@ class Chessman:
     Handles common properties like position, color, and movement validation.
     """
 
+    __slots__ = (
+        "__name",
+        "__name_cn",
+        "__is_red",
+        "__board",
+        "__moves",
+        "__move_count",
+        "__targets",
+        "__is_alive",
+        "_position",
+        "code",
+        "fen_char",
+    )
+
+    # Piece type (KING..PAWN); subclasses override it
+    PIECE_TYPE = ROOK
+    # Placement bounds for Red and for Black, as (top, bottom, left, right)
+    BOUNDS: Tuple[Tuple[int, int, int, int], Tuple[int, int, int, int]] = (
+        FULL_BOARD,
+        FULL_BOARD,
+    )
+
+    code: int
+    fen_char: str
+
     def __init__(
         self, name_cn: str, name: str, is_red: bool, chessboard: Chessboard
     ) -> None:
         self.__name = name
         self.__is_red = is_red
-        self.__chessboard = chessboard
+        # weakref.ref 对同一个棋盘返回同一个对象，整盘棋子共用它
+        self.__board = weakref.ref(chessboard)
         self._position = point_lib.Point(0, 0)  # Initialize with dummy values
-        self.__moving_list: List[point_lib.Point] = []
-        self._top = 9
-        self._bottom = 0
-        self._left = 0
-        self._right = 8
+        self.__moves: Optional[array] = None
+        self.__move_count = 0
+        self.__targets = 0  # 目标格位图，第 sq 位表示可走到 sq
         self.__is_alive = True
         self.__name_cn = name_cn
+        # Piece code (see ``tables``) and FEN character, fixed for the piece's life
+        self.code = self.PIECE_TYPE + (0 if is_red else BLACK_OFFSET)
+        self.fen_char = CODE_TO_FEN[self.code]
 
     @property
     def row_num(self) -> int:
@@ -60,8 +116,7 @@ class Chessman:
 
     def update_position(self, col: int, row: int) -> None:
         """Updates the position of the piece."""
-        self._position.x = col
-        self._position.y = row
+        self._position = point_lib.Point(col, row)
 
     @property
     def is_alive(self) -> bool:
@@ -76,7 +131,10 @@ class Chessman:
     @property
     def chessboard(self) -> Chessboard:
         """Returns the chessboard this piece belongs to."""
-        return self.__chessboard
+        board = self.__board()
+        if board is None:
+            raise ReferenceError("the chessboard of this piece no longer exists")
+        return board
 
     @property
     def is_red(self) -> bool:
@@ -88,11 +146,6 @@ class Chessman:
         """Returns the unique name of the piece."""
         return self.__name
 
-    @property
-    def fen_char(self) -> str:
-        """Returns the FEN character for this piece (Uppercase for Red, Lowercase for Black)"""
-        return ""
-
     @property
     def name_cn(self) -> str:
         """Returns the Chinese name of the piece."""
@@ -105,461 +158,166 @@ class Chessman:
 
     @property
     def moving_list(self) -> List[point_lib.Point]:
-        """Returns the list of valid moving points for the piece."""
-        return self.__moving_list
+        """Returns the valid moving points for the piece (built for the UI)."""
+        if not self.__move_count:
+            return []
+        return [
+            point_lib.Point(col_of(move & 0xFF), row_of(move & 0xFF))
+            for move in self.__moves[: self.__move_count]
+        ]
+
+    @property
+    def moves(self) -> List[int]:
+        """Returns the valid moves of the piece as packed integers."""
+        if not self.__move_count:
+            return []
+        return self.__moves[: self.__move_count].tolist()
+
+    def copy_to(self, chessboard: Chessboard) -> "Chessman":
+        """Returns a copy of the piece that belongs to ``chessboard``."""
+        piece = object.__new__(self.__class__)
+        piece.__name = self.__name
+        piece.__name_cn = self.__name_cn
+        piece.__is_red = self.__is_red
+        piece.__board = weakref.ref(chessboard)
+        piece.__moves = None if self.__moves is None else array("H", self.__moves)
+        piece.__move_count = self.__move_count
+        piece.__targets = self.__targets
+        piece.__is_alive = self.__is_alive
+        piece._position = self._position
+        piece.code = self.code
+        piece.fen_char = self.fen_char
+        return piece
 
     def clear_moving_list(self) -> None:
         """Clears the list of valid moving points."""
-        self.__moving_list = []
+        self.__move_count = 0
+        self.__targets = 0
 
     def add_to_board(self, col_num: int, row_num: int) -> None:
         """Adds the piece to the board at the specified position."""
         if self.border_check(col_num, row_num):
-            self._position.x = col_num
-            self._position.y = row_num
-            self.__chessboard.add_chessman(self, col_num, row_num)
+            self._position = point_lib.Point(col_num, row_num)
+            self.chessboard.add_chessman(self, col_num, row_num)
         else:
             print("the wrong position")
 
     def move(self, col_num: int, row_num: int) -> bool:
         """Moves the piece to the specified position if valid."""
         if self.in_moving_list(col_num, row_num):
-            self.__chessboard.remove_chessman_source(self._position.x, self._position.y)
-            self.__chessboard.update_history(self, col_num, row_num)
-            # 重要：先调用 move_chessman 记录 undo 和记谱（需要原始坐标），
-            # 之后再更新 _position
-            result = self.__chessboard.move_chessman(self, col_num, row_num)
-            if result:
-                self._position.x = col_num
-                self._position.y = row_num
-            return result
+            board = self.chessboard
+            board.update_history(self, col_num, row_num)
+            # move_chessman 负责记谱、哈希、攻击表并更新 _position
+            return board.move_chessman(self, col_num, row_num)
 
         print("the wrong target_position")
         return False
 
     def in_moving_list(self, col_num: int, row_num: int) -> bool:
         """Checks if the target position is in the piece's moving list."""
-        for pt in self.__moving_list:
-            if pt.x == col_num and pt.y == row_num:
-                return True
-        return False
+        if not (0 <= col_num <= 8 and 0 <= row_num <= 9):
+            return False
+        return bool(self.__targets >> square(col_num, row_num) & 1)
 
     def calc_moving_list(self) -> None:
-        """Calculates the list of valid moving points. To be implemented by subclasses."""
+        """
+        Calculates the valid moving points of the piece from the board's piece
+        codes and attack maps, without checking whether the own king is left
+        in check.
+        """
+        board = self.chessboard
+        codes = board.codes
+        sq = square(self._position.x, self._position.y)
+        code = codes[sq] if 0 <= sq < NUM_SQUARES else EMPTY
+        count = 0
+        targets = 0
+        if code != EMPTY:
+            moves = self.__moves
+            if moves is None:
+                moves = self.__moves = array("H", bytes(2 * MAX_PIECE_MOVES))
+            origin = sq << 8
+            is_red = code < BLACK_OFFSET
+            ptype = code % BLACK_OFFSET
+            candidates = (
+                KING_MOVES[0 if is_red else 1][sq]
+                if ptype == KING
+                else board.square_attacks(sq)
+            )
+            for target in candidates:
+                occupant = codes[target]
+                if occupant == EMPTY:
+                    if ptype == CANNON:
+                        continue  # 炮隔子打到的空格不能走
+                elif (occupant < BLACK_OFFSET) == is_red:
+                    continue
+                moves[count] = origin | target
+                count += 1
+                targets |= 1 << target
+            if ptype == CANNON:
+                for ray in RAYS[sq]:
+                    for target in ray:
+                        if codes[target] != EMPTY:
+                            break
+                        moves[count] = origin | target
+                        count += 1
+                        targets |= 1 << target
+        self.__move_count = count
+        self.__targets = targets
 
     def border_check(self, col_num: int, row_num: int) -> bool:
         """Checks if the given position is within the valid board area for this piece."""
-        return num_between(self._top, self._bottom, row_num) and num_between(
-            self._right, self._left, col_num
-        )
-
-    def calc_moving_path(
-        self,
-        direction_chessman: Optional[Chessman],
-        direction_vertical_coordinate: Optional[int],
-        current_vertical_coordinate: int,
-        direction_parallel_coordinate: int,
-        direction: int,
-        border_vertical_coordinate: int,
-        h_or_v: bool,
-        ignore_color: bool = False,
-    ) -> None:
-        """
-        Calculates moving path in a specific direction.
-        Helper method for calculating moves for linear pieces (Rook, Cannon).
-        """
-        if direction_chessman is not None:
-            if (
-                direction_chessman.is_red == self.is_red or ignore_color
-            ) and direction_vertical_coordinate is not None:
-                for i in range(
-                    direction_vertical_coordinate + direction,
-                    current_vertical_coordinate,
-                    direction,
-                ):
-                    self.__moving_list.append(
-                        point_lib.Point(i, direction_parallel_coordinate)
-                        if h_or_v
-                        else point_lib.Point(direction_parallel_coordinate, i)
-                    )
-
-            elif direction_vertical_coordinate is not None:
-                for i in range(
-                    direction_vertical_coordinate,
-                    current_vertical_coordinate,
-                    direction,
-                ):
-                    self.__moving_list.append(
-                        point_lib.Point(i, direction_parallel_coordinate)
-                        if h_or_v
-                        else point_lib.Point(direction_parallel_coordinate, i)
-                    )
-        else:
-            for i in range(
-                border_vertical_coordinate, current_vertical_coordinate, direction
-            ):
-                self.__moving_list.append(
-                    point_lib.Point(i, direction_parallel_coordinate)
-                    if h_or_v
-                    else point_lib.Point(direction_parallel_coordinate, i)
-                )
-
-    def add_from_probable_points(
-        self, probable_moving_points: List[point_lib.Point], current_color: bool
-    ) -> None:
-        """Filters probable points and adds valid ones to the moving list."""
-        for pt in probable_moving_points:
-            if self.border_check(pt.x, pt.y):
-                chessman = self.chessboard.get_chessman(pt.x, pt.y)
-                if chessman is None or chessman.is_red != current_color:
-                    self.moving_list.append(pt)
+        top, bottom, left, right = self.BOUNDS[0 if self.__is_red else 1]
+        return num_between(top, bottom, row_num) and num_between(right, left, col_num)
 
 
 class Rook(Chessman):
     """Represents the Rook (Chariot) piece."""
 
-    def __init__(
-        self, name_cn: str, name: str, is_red: bool, chessboard: Chessboard
-    ) -> None:
-        super().__init__(name_cn, name, is_red, chessboard)
-        self._top = 9
-        self._bottom = 0
-        self._left = 0
-        self._right = 8
-
-    @property
-    def fen_char(self) -> str:
-        return "R" if self.is_red else "r"
-
-    def calc_moving_list(self) -> None:
-        current_v_c = self.position.x
-        current_h_c = self.position.y
-        left = self.chessboard.get_left_first_chessman(current_v_c, current_h_c)
-        right = self.chessboard.get_right_first_chessman(current_v_c, current_h_c)
-        top = self.chessboard.get_top_first_chessman(current_v_c, current_h_c)
-        bottom = self.chessboard.get_bottom_first_chessman(current_v_c, current_h_c)
-
-        self.calc_moving_path(
-            left,
-            (left.position.x if left is not None else None),
-            current_v_c,
-            current_h_c,
-            1,
-            0,
-            True,
-        )
-        self.calc_moving_path(
-            right,
-            (right.position.x if right is not None else None),
-            current_v_c,
-            current_h_c,
-            -1,
-            8,
-            True,
-        )
-        self.calc_moving_path(
-            top,
-            (top.position.y if top is not None else None),
-            current_h_c,
-            current_v_c,
-            -1,
-            9,
-            False,
-        )
-        self.calc_moving_path(
-            bottom,
-            (bottom.position.y if bottom is not None else None),
-            current_h_c,
-            current_v_c,
-            1,
-            0,
-            False,
-        )
+    __slots__ = ()
+    PIECE_TYPE = ROOK
 
 
 class Knight(Chessman):
     """Represents the Knight (Horse) piece."""
 
-    def __init__(
-        self, name_cn: str, name: str, is_red: bool, chessboard: Chessboard
-    ) -> None:
-        super().__init__(name_cn, name, is_red, chessboard)
-        self._top = 9
-        self._bottom = 0
-        self._left = 0
-        self._right = 8
-
-    @property
-    def fen_char(self) -> str:
-        return "N" if self.is_red else "n"
-
-    def calc_moving_list(self) -> None:
-        current_v_c = self.position.x
-        current_h_c = self.position.y
-        probable_obstacle_points: List[point_lib.Point] = []
-        probable_moving_points: List[point_lib.Point] = []
-        vs1 = (current_v_c + 1, current_v_c - 1)
-        hs1 = (current_h_c,)
-        vs2 = (current_v_c,)
-        hs2 = (current_h_c + 1, current_h_c - 1)
-        creat_points(probable_obstacle_points, vs1, hs1)
-        creat_points(probable_obstacle_points, vs2, hs2)
-        current_color = self.is_red
-        for pt in probable_obstacle_points:
-            if self.border_check(pt.x, pt.y):
-                chessman = self.chessboard.get_chessman(pt.x, pt.y)
-                if chessman is None:
-                    if pt.x == current_v_c:
-                        probable_moving_points.append(
-                            point_lib.Point(pt.x + 1, 2 * pt.y - current_h_c)
-                        )
-                        probable_moving_points.append(
-                            point_lib.Point(pt.x - 1, 2 * pt.y - current_h_c)
-                        )
-                    else:
-                        probable_moving_points.append(
-                            point_lib.Point(2 * pt.x - current_v_c, pt.y + 1)
-                        )
-                        probable_moving_points.append(
-                            point_lib.Point(2 * pt.x - current_v_c, pt.y - 1)
-                        )
-        self.add_from_probable_points(probable_moving_points, current_color)
+    __slots__ = ()
+    PIECE_TYPE = KNIGHT
 
 
 class Cannon(Chessman):
     """Represents the Cannon piece."""
 
-    def __init__(
-        self, name_cn: str, name: str, is_red: bool, chessboard: Chessboard
-    ) -> None:
-        super().__init__(name_cn, name, is_red, chessboard)
-        self._top = 9
-        self._bottom = 0
-        self._left = 0
-        self._right = 8
-
-    @property
-    def fen_char(self) -> str:
-        return "C" if self.is_red else "c"
-
-    def calc_moving_list(self) -> None:
-        current_v_c = self.position.x
-        current_h_c = self.position.y
-        left = self.chessboard.get_left_first_chessman(current_v_c, current_h_c)
-        right = self.chessboard.get_right_first_chessman(current_v_c, current_h_c)
-        top = self.chessboard.get_top_first_chessman(current_v_c, current_h_c)
-        bottom = self.chessboard.get_bottom_first_chessman(current_v_c, current_h_c)
-        tar_left = self.chessboard.get_left_second_chessman(current_v_c, current_h_c)
-        tar_right = self.chessboard.get_right_second_chessman(current_v_c, current_h_c)
-        tar_top = self.chessboard.get_top_second_chessman(current_v_c, current_h_c)
-        tar_bottom = self.chessboard.get_bottom_second_chessman(
-            current_v_c, current_h_c
-        )
-        self.calc_moving_path(
-            left,
-            (left.position.x if left is not None else None),
-            current_v_c,
-            current_h_c,
-            1,
-            0,
-            True,
-            True,
-        )
-        self.calc_moving_path(
-            right,
-            (right.position.x if right is not None else None),
-            current_v_c,
-            current_h_c,
-            -1,
-            8,
-            True,
-            True,
-        )
-        self.calc_moving_path(
-            top,
-            (top.position.y if top is not None else None),
-            current_h_c,
-            current_v_c,
-            -1,
-            9,
-            False,
-            True,
-        )
-        self.calc_moving_path(
-            bottom,
-            (bottom.position.y if bottom is not None else None),
-            current_h_c,
-            current_v_c,
-            1,
-            0,
-            False,
-            True,
-        )
-        current_color = self.is_red
-        if tar_left is not None and tar_left.is_red != current_color:
-            self.moving_list.append(
-                point_lib.Point(tar_left.position.x, tar_left.position.y)
-            )
-        if tar_right is not None and tar_right.is_red != current_color:
-            self.moving_list.append(
-                point_lib.Point(tar_right.position.x, tar_right.position.y)
-            )
-        if tar_top is not None and tar_top.is_red != current_color:
-            self.moving_list.append(
-                point_lib.Point(tar_top.position.x, tar_top.position.y)
-            )
-        if tar_bottom is not None and tar_bottom.is_red != current_color:
-            self.moving_list.append(
-                point_lib.Point(tar_bottom.position.x, tar_bottom.position.y)
-            )
+    __slots__ = ()
+    PIECE_TYPE = CANNON
 
 
 class Mandarin(Chessman):
     """Represents the Mandarin (Advisor/Guard) piece."""
 
-    def __init__(
-        self, name_cn: str, name: str, is_red: bool, chessboard: Chessboard
-    ) -> None:
-        super().__init__(name_cn, name, is_red, chessboard)
-        if self.is_red:
-            self._top = 2
-            self._bottom = 0
-            self._left = 3
-            self._right = 5
-        else:
-            self._top = 9
-            self._bottom = 7
-            self._left = 3
-            self._right = 5
-
-    @property
-    def fen_char(self) -> str:
-        return "A" if self.is_red else "a"
-
-    def calc_moving_list(self) -> None:
-        current_v_c = self.position.x
-        current_h_c = self.position.y
-        probable_moving_points: List[point_lib.Point] = []
-        vs1 = (current_v_c + 1, current_v_c - 1)
-        hs1 = (current_h_c + 1, current_h_c - 1)
-        creat_points(probable_moving_points, vs1, hs1)
-        current_color = self.is_red
-
-        self.add_from_probable_points(probable_moving_points, current_color)
+    __slots__ = ()
+    PIECE_TYPE = MANDARIN
+    BOUNDS = ((2, 0, 3, 5), (9, 7, 3, 5))
 
 
 class Elephant(Chessman):
     """Represents the Elephant (Bishop) piece."""
 
-    def __init__(
-        self, name_cn: str, name: str, is_red: bool, chessboard: Chessboard
-    ) -> None:
-        super().__init__(name_cn, name, is_red, chessboard)
-        if self.is_red:
-            self._top = 4
-            self._bottom = 0
-            self._left = 0
-            self._right = 8
-        else:
-            self._top = 9
-            self._bottom = 5
-            self._left = 0
-            self._right = 8
-
-    @property
-    def fen_char(self) -> str:
-        return "B" if self.is_red else "b"
-
-    def calc_moving_list(self) -> None:
-        current_v_c = self.position.x
-        current_h_c = self.position.y
-        probable_obstacle_points: List[point_lib.Point] = []
-        probable_moving_points: List[point_lib.Point] = []
-        vs1 = (current_v_c + 1, current_v_c - 1)
-        hs1 = (current_h_c + 1, current_h_c - 1)
-        creat_points(probable_obstacle_points, vs1, hs1)
-        current_color = self.is_red
-        for pt in probable_obstacle_points:
-            if self.border_check(pt.x, pt.y):
-                chessman = self.chessboard.get_chessman(pt.x, pt.y)
-                if chessman is None:
-                    probable_moving_points.append(
-                        point_lib.Point(2 * pt.x - current_v_c, 2 * pt.y - current_h_c)
-                    )
-        self.add_from_probable_points(probable_moving_points, current_color)
+    __slots__ = ()
+    PIECE_TYPE = ELEPHANT
+    BOUNDS = ((4, 0, 0, 8), (9, 5, 0, 8))
 
 
 class Pawn(Chessman):
     """Represents the Pawn (Soldier) piece."""
 
-    def __init__(
-        self, name_cn: str, name: str, is_red: bool, chessboard: Chessboard
-    ) -> None:
-        super().__init__(name_cn, name, is_red, chessboard)
-        if self.is_red:
-            self._top = 9
-            self._bottom = 3
-            self._left = 0
-            self._right = 8
-            self.__direction = 1
-            self.__river = 5
-        else:
-            self._top = 6
-            self._bottom = 0
-            self._left = 0
-            self._right = 8
-            self.__direction = -1
-            self.__river = 4
-
-    @property
-    def fen_char(self) -> str:
-        return "P" if self.is_red else "p"
-
-    def calc_moving_list(self) -> None:
-        current_v_c = self.position.x
-        current_h_c = self.position.y
-        probable_moving_points: List[point_lib.Point] = []
-        current_color = self.is_red
-        probable_moving_points.append(
-            point_lib.Point(current_v_c, current_h_c + self.__direction)
-        )
-        if current_h_c * self.__direction >= self.__river * self.__direction:
-            probable_moving_points.append(point_lib.Point(current_v_c + 1, current_h_c))
-            probable_moving_points.append(point_lib.Point(current_v_c - 1, current_h_c))
-        self.add_from_probable_points(probable_moving_points, current_color)
+    __slots__ = ()
+    PIECE_TYPE = PAWN
+    BOUNDS = ((9, 3, 0, 8), (6, 0, 0, 8))
 
 
 class King(Chessman):
     """Represents the King (General) piece."""
 
-    def __init__(
-        self, name_cn: str, name: str, is_red: bool, chessboard: Chessboard
-    ) -> None:
-        super().__init__(name_cn, name, is_red, chessboard)
-        if self.is_red:
-            self._top = 2
-            self._bottom = 0
-            self._left = 3
-            self._right = 5
-        else:
-            self._top = 9
-            self._bottom = 7
-            self._left = 3
-            self._right = 5
-
-    @property
-    def fen_char(self) -> str:
-        return "K" if self.is_red else "k"
-
-    def calc_moving_list(self) -> None:
-        current_v_c = self.position.x
-        current_h_c = self.position.y
-        probable_moving_points: List[point_lib.Point] = []
-        vs1 = (current_v_c + 1, current_v_c - 1)
-        hs1 = (current_h_c,)
-        vs2 = (current_v_c,)
-        hs2 = (current_h_c + 1, current_h_c - 1)
-        creat_points(probable_moving_points, vs1, hs1)
-        creat_points(probable_moving_points, vs2, hs2)
-        current_color = self.is_red
-        self.add_from_probable_points(probable_moving_points, current_color)
+    __slots__ = ()
+    PIECE_TYPE = KING
+    BOUNDS = ((2, 0, 3, 5), (9, 7, 3, 5))
@@ -0,0 +1,147 @@
+"""
+This module defines the compact move stream used to follow many games live
+(e.g. self-play workers feeding the ``run.py watch`` spectator).
+
+Every frame is four bytes: the game id and a packed move (see
+``tables.encode_move``), both unsigned 16-bit big-endian. Move 0 is never a
+real move and starts a new game. Writers send frames over any byte stream
+(a pipe or a TCP connection); readers poll the stream without blocking and
+get back whole ``(game_id, move)`` frames.
+"""
+
+from __future__ import annotations
+
+import os
+import selectors
+import socket
+import struct
+from typing import Dict, List, Optional, Tuple
+
+NEW_GAME = 0
+FRAME = struct.Struct(">HH")
+DEFAULT_PORT = 9876
+READ_SIZE = 1 << 16
+
+Frame = Tuple[int, int]
+
+
+def encode_frame(game_id: int, move: int) -> bytes:
+    """Packs one (game id, move) frame."""
+    return FRAME.pack(game_id, move)
+
+
+class MoveStreamDecoder:
+    """
+    Splits a byte stream into frames, keeping partial frames between reads.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = b""
+
+    def feed(self, data: bytes) -> List[Frame]:
+        """Adds received bytes and returns every frame completed by them."""
+        buffer = self.buffer + data
+        usable = len(buffer) - len(buffer) % FRAME.size
+        self.buffer = buffer[usable:]
+        return list(FRAME.iter_unpack(buffer[:usable]))
+
+
+class MoveStreamWriter:
+    """
+    Writes frames to a socket or a file descriptor.
+    """
+
+    def __init__(self, target) -> None:
+        if isinstance(target, socket.socket):
+            self._write = target.sendall
+        else:
+            fd = target
+
+            def write(data: bytes) -> None:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view) :]
+
+            self._write = write
+
+    def new_game(self, game_id: int) -> None:
+        """Announces that ``game_id`` starts again from the initial position."""
+        self._write(encode_frame(game_id, NEW_GAME))
+
+    def send_moves(self, game_id: int, moves: List[int]) -> None:
+        """Sends moves of one game in a single write."""
+        self._write(b"".join(encode_frame(game_id, move) for move in moves))
+
+
+class MoveStreamReader:
+    """
+    Collects frames from a listening TCP socket (any number of writers can
+    connect) and/or a readable file descriptor such as a pipe or stdin.
+
+    ``poll()`` never blocks, so a UI can call it once per frame and apply the
+    whole batch of moves that arrived since the last frame.
+    """
+
+    def __init__(
+        self,
+        address: Optional[Tuple[str, int]] = None,
+        fd: Optional[int] = None,
+    ) -> None:
+        self.selector = selectors.DefaultSelector()
+        self.decoders: Dict[object, MoveStreamDecoder] = {}
+        self.server: Optional[socket.socket] = None
+        if address is not None:
+            self.server = socket.create_server(address)
+            self.server.setblocking(False)
+            self.selector.register(self.server, selectors.EVENT_READ)
+        if fd is not None:
+            os.set_blocking(fd, False)
+            self.selector.register(fd, selectors.EVENT_READ)
+            self.decoders[fd] = MoveStreamDecoder()
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        """The address the server listens on (useful with port 0)."""
+        return self.server.getsockname()[:2] if self.server is not None else None
+
+    def poll(self, timeout: float = 0) -> List[Frame]:
+        """Returns all frames received since the last call."""
+        frames: List[Frame] = []
+        for key, _ in self.selector.select(timeout):
+            source = key.fileobj
+            if source is self.server:
+                connection, _ = self.server.accept()
+                connection.setblocking(False)
+                self.selector.register(connection, selectors.EVENT_READ)
+                self.decoders[connection] = MoveStreamDecoder()
+                continue
+            try:
+                if isinstance(source, socket.socket):
+                    data = source.recv(READ_SIZE)
+                else:
+                    data = os.read(source, READ_SIZE)
+            except BlockingIOError:
+                continue
+            except OSError:
+                data = b""
+            if not data:
+                self._drop(source)
+                continue
+            frames.extend(self.decoders[source].feed(data))
+        return frames
+
+    def close(self) -> None:
+        """Closes the server and every connection."""
+        for source in list(self.decoders):
+            self._drop(source)
+        if self.server is not None:
+            self.selector.unregister(self.server)
+            self.server.close()
+            self.server = None
+        self.selector.close()
+
+    def _drop(self, source) -> None:
+        self.selector.unregister(source)
+        self.decoders.pop(source, None)
+        if isinstance(source, socket.socket):
+            source.close()
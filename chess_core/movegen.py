@@ -0,0 +1,126 @@
+"""
+This module generates pseudo-legal moves for the side to move as packed integers
+(see ``tables.encode_move``), reading the board's compact piece codes, piece
+lists and incremental attack maps instead of building ``Point`` lists.
+
+Captures and quiet moves are generated separately so that a search can stop
+before generating quiet moves when a capture already causes a cutoff.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List
+
+from my_chess.chess_core.tables import (
+    BLACK_OFFSET,
+    CANNON,
+    EMPTY,
+    KING,
+    KING_MOVES,
+    NUM_SQUARES,
+    RAYS,
+)
+
+if TYPE_CHECKING:
+    from my_chess.chess_core.chessboard import Chessboard
+
+
+def side_squares(board: Chessboard, is_red: bool) -> List[int]:
+    """Returns the squares of one side's pieces, read from the board's piece lists."""
+    first = 0 if is_red else BLACK_OFFSET
+    squares: List[int] = []
+    for code in range(first, first + BLACK_OFFSET):
+        squares.extend(board.piece_squares(code))
+    return squares
+
+
+def generate_captures(board: Chessboard, moves: List[int]) -> List[int]:
+    """Appends every pseudo-legal capture of the side to move to ``moves``."""
+    codes = board.codes
+    is_red = board.is_red_turn
+    for sq in side_squares(board, is_red):
+        origin = sq << 8
+        targets = (
+            KING_MOVES[0 if is_red else 1][sq]
+            if codes[sq] % BLACK_OFFSET == KING
+            else board.square_attacks(sq)
+        )
+        for target in targets:
+            occupant = codes[target]
+            if occupant != EMPTY and (occupant < BLACK_OFFSET) != is_red:
+                moves.append(origin | target)
+    return moves
+
+
+def generate_quiets(board: Chessboard, moves: List[int]) -> List[int]:
+    """Appends every pseudo-legal non-capturing move of the side to move."""
+    codes = board.codes
+    is_red = board.is_red_turn
+    for sq in side_squares(board, is_red):
+        origin = sq << 8
+        ptype = codes[sq] % BLACK_OFFSET
+        if ptype == CANNON:
+            # 炮不吃子时和车一样走到第一个棋子之前
+            for ray in RAYS[sq]:
+                for target in ray:
+                    if codes[target] != EMPTY:
+                        break
+                    moves.append(origin | target)
+            continue
+        targets = (
+            KING_MOVES[0 if is_red else 1][sq]
+            if ptype == KING
+            else board.square_attacks(sq)
+        )
+        for target in targets:
+            if codes[target] == EMPTY:
+                moves.append(origin | target)
+    return moves
+
+
+def generate_moves(board: Chessboard, moves: List[int]) -> List[int]:
+    """Appends every pseudo-legal move of the side to move, captures first."""
+    generate_captures(board, moves)
+    return generate_quiets(board, moves)
+
+
+def is_pseudo_legal(board: Chessboard, move: int) -> bool:
+    """Checks whether a move from elsewhere (hash table, killers) fits this position."""
+    codes = board.codes
+    from_sq, to_sq = move >> 8, move & 0xFF
+    if from_sq >= NUM_SQUARES or to_sq >= NUM_SQUARES:
+        return False
+    code = codes[from_sq]
+    is_red = board.is_red_turn
+    if code == EMPTY or (code < BLACK_OFFSET) != is_red:
+        return False
+    occupant = codes[to_sq]
+    if occupant != EMPTY and (occupant < BLACK_OFFSET) == is_red:
+        return False
+    ptype = code % BLACK_OFFSET
+    if ptype == KING:
+        return to_sq in KING_MOVES[0 if is_red else 1][from_sq]
+    if ptype == CANNON and occupant == EMPTY:
+        for ray in RAYS[from_sq]:
+            if to_sq in ray:
+                for target in ray:
+                    if target == to_sq:
+                        return True
+                    if codes[target] != EMPTY:
+                        return False
+        return False
+    return to_sq in board.square_attacks(from_sq)
+
+
+def is_legal(board: Chessboard, move: int) -> bool:
+    """Checks whether a pseudo-legal move leaves the mover's own king safe."""
+    is_red = board.is_red_turn
+    board.make_move(move >> 8, move & 0xFF)
+    legal = not board.in_check(is_red)
+    board.unmake_move()
+    return legal
+
+
+def legal_moves(board: Chessboard) -> List[int]:
+    """Returns all legal moves of the side to move."""
+    return [move for move in generate_moves(board, []) if is_legal(board, move)]
@@ -1,25 +1,68 @@
 """
 This module defines the Point class, representing coordinates on the chessboard.
 It also includes utility methods for converting between different coordinate systems (UCCI, ICCS).
+
+Points are immutable and use ``__slots__``. The 90 board squares are created
+once at import time with their UCCI strings, and ``Point(x, y)`` returns the
+shared instance, so points cost no allocation and work as dict/set keys.
 """
 
-import dataclasses
+from typing import Dict, List
 
 
-@dataclasses.dataclass
 class Point:
     """Represents a coordinate (x, y) on the chessboard."""
 
+    __slots__ = ("x", "y", "_ucci")
+
     x: int
     y: int
 
+    def __new__(cls, x: int, y: int) -> "Point":
+        if cls is Point and type(x) is int and type(y) is int:
+            if 0 <= x <= 8 and 0 <= y <= 9:
+                return _SQUARES[y * 9 + x]
+        return cls._create(x, y)
+
+    @classmethod
+    def _create(cls, x: int, y: int) -> "Point":
+        """Builds a new instance, bypassing the cache."""
+        point = object.__new__(cls)
+        object.__setattr__(point, "x", x)
+        object.__setattr__(point, "y", y)
+        object.__setattr__(point, "_ucci", f"{chr(ord('a') + x)}{y}")
+        return point
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"Point is immutable; cannot assign to '{name}'")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Point is immutable; cannot delete '{name}'")
+
+    def __reduce__(self):
+        return (self.__class__, (self.x, self.y))
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
+
+    def __repr__(self) -> str:
+        return f"Point(x={self.x}, y={self.y})"
+
     def to_ucci(self) -> str:
         """Converts the point to UCCI coordinate string (e.g., a0, i9)."""
-        return f"{chr(ord('a') + self.x)}{self.y}"
+        return self._ucci
 
     @classmethod
     def from_ucci(cls, ucci: str) -> "Point":
         """Creates a Point from a UCCI coordinate string."""
+        point = _UCCI_TO_POINT.get(ucci)
+        if point is not None and cls is Point:
+            return point
         if len(ucci) != 2:
             raise ValueError(f"Invalid UCCI coordinate: {ucci}")
         x = ord(ucci[0]) - ord("a")
@@ -27,3 +70,8 @@ class Point:
         if not (0 <= x <= 8 and 0 <= y <= 9):
             raise ValueError(f"Coordinate out of bounds: {ucci}")
         return cls(x, y)
+
+
+# 按 y * 9 + x 排列，与 tables.square 的编号一致
+_SQUARES: List[Point] = [Point._create(sq % 9, sq // 9) for sq in range(90)]
+_UCCI_TO_POINT: Dict[str, Point] = {point.to_ucci(): point for point in _SQUARES}
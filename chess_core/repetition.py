@@ -0,0 +1,198 @@
+"""
+本模块负责重复局面的裁决（长将、长捉判负）。
+
+A repeated position is ruled by classifying every move of the repeating cycle
+as a check, a chase, a mutual attack or an idle move, then applying either the
+Asian (AXF) or the Chinese rule set:
+
+1. 一方长打（每步都是将军或捉同一个子），另一方不是 → 长打方判负
+2. 双方都长打或都不长打 → 和棋
+3. Chinese rules only: perpetual check against perpetual chase → 长将方判负
+
+The cycle is taken back and replayed with ``Chessboard.make_move`` and
+``unmake_move``, and checks, chases and protection are read from the board's
+incremental attack maps, so the ruling is cheap enough to call whenever a
+search hits a repetition.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from my_chess.chess_core.tables import (
+    BLACK_OFFSET,
+    CANNON,
+    ELEPHANT,
+    EMPTY,
+    KING,
+    KNIGHT,
+    MANDARIN,
+    PAWN,
+    ROOK,
+    own_half,
+)
+
+if TYPE_CHECKING:
+    from my_chess.chess_core.chessboard import Chessboard
+
+# 着法分类
+IDLE = 0  # 闲着
+CHECK = 1  # 将军
+CHASE = 2  # 捉子
+MUTUAL = 3  # 互捉/兑子：被捉的子也能吃回捉子的一方
+
+# 捉子时比较子力大小用的等级（有根子只有被更小的子攻击才算捉）
+_CHASE_RANKS = {
+    ROOK: 3,
+    KNIGHT: 2,
+    CANNON: 2,
+    ELEPHANT: 1,
+    MANDARIN: 1,
+    PAWN: 1,
+}
+
+
+class RuleSet(NamedTuple):
+    """Describes how a repetition is ruled.
+
+    ``check_outranks_chase``: when one side perpetually checks and the other
+    perpetually chases, the checking side loses instead of the game being drawn.
+    """
+
+    name: str
+    check_outranks_chase: bool = False
+
+
+ASIAN_RULES = RuleSet("asian")
+CHINESE_RULES = RuleSet("chinese", check_outranks_chase=True)
+RULE_SETS = {rules.name: rules for rules in (ASIAN_RULES, CHINESE_RULES)}
+
+
+def _attack_pairs(board: Chessboard, is_red: bool) -> Set[Tuple[int, int]]:
+    """Returns (attacker, target) square pairs of ``is_red`` attacking enemy pieces."""
+    codes = board.codes
+    pairs = set()
+    for sq, code in enumerate(codes):
+        if code == EMPTY or (code < BLACK_OFFSET) != is_red:
+            continue
+        for target in board.square_attacks(sq):
+            occupant = codes[target]
+            if occupant != EMPTY and (occupant < BLACK_OFFSET) != is_red:
+                pairs.add((sq, target))
+    return pairs
+
+
+def _is_chase(board: Chessboard, attacker: int, target: int, is_red: bool) -> bool:
+    """Checks whether a new attack on ``target`` counts as a chase (捉)."""
+    codes = board.codes
+    attacker_type = codes[attacker] % BLACK_OFFSET
+    target_type = codes[target] % BLACK_OFFSET
+    # 将帅、兵卒捉子不算捉；捉未过河的兵卒不算捉
+    if attacker_type in (KING, PAWN):
+        return False
+    if target_type == PAWN and own_half(target, not is_red):
+        return False
+
+    # 吃子后己方被将军（被牵制的子）则不算捉
+    board.make_move(attacker, target)
+    legal = not board.in_check(is_red)
+    protected = board.is_square_attacked(target, not is_red)
+    board.unmake_move()
+    if not legal:
+        return False
+    if not protected:
+        return True
+    return _CHASE_RANKS[target_type] > _CHASE_RANKS[attacker_type]
+
+
+def classify_move(
+    board: Chessboard, from_sq: int, to_sq: int
+) -> Tuple[int, FrozenSet[int]]:
+    """Classifies a move and plays it on the board.
+
+    Returns the move kind (IDLE, CHECK, CHASE or MUTUAL) and the squares of the
+    chased pieces after the move.
+    """
+    is_red = board.codes[from_sq] < BLACK_OFFSET
+    before = _attack_pairs(board, is_red)
+    board.make_move(from_sq, to_sq)
+
+    if board.in_check(not is_red):
+        return CHECK, frozenset()
+
+    # 只看走棋后新产生的攻击（包括闪击）
+    moved_before = {
+        (to_sq if attacker == from_sq else attacker, target)
+        for attacker, target in before
+    }
+    chased = set()
+    mutual = False
+    for attacker, target in _attack_pairs(board, is_red) - moved_before:
+        if board.codes[target] % BLACK_OFFSET == KING:
+            continue
+        if attacker in board.square_attacks(target):
+            mutual = True
+        elif _is_chase(board, attacker, target, is_red):
+            chased.add(target)
+    if chased:
+        return CHASE, frozenset(chased)
+    return (MUTUAL if mutual else IDLE), frozenset()
+
+
+def adjudicate(board: Chessboard, rules: RuleSet = ASIAN_RULES) -> str:
+    """Rules the board's latest repetition cycle. Returns 'Red', 'Black' or 'Draw'.
+
+    The current position must have occurred before; the moves played since its
+    previous occurrence form the cycle. The board is restored afterwards.
+    """
+    start = None
+    for index in range(len(board.hash_stack) - 2, -1, -1):
+        if board.hash_stack[index] == board.current_hash:
+            start = index
+            break
+    if start is None:
+        # 没有可用的走棋记录时无法判定责任方
+        return "Draw"
+
+    cycle = board.move_stack[start:]
+    for _ in cycle:
+        board.unmake_move()
+
+    # 用起始格子作为棋子身份，跟踪被捉的是否始终是同一个子
+    ids: List[Optional[int]] = [
+        sq if code != EMPTY else None for sq, code in enumerate(board.codes)
+    ]
+    kinds: Tuple[List[int], List[int]] = ([], [])
+    targets: Tuple[List[Set[int]], List[Set[int]]] = ([], [])
+    for from_sq, to_sq in cycle:
+        side = 0 if board.is_red_turn else 1
+        kind, chased = classify_move(board, from_sq, to_sq)
+        ids[to_sq] = ids[from_sq]
+        ids[from_sq] = None
+        kinds[side].append(kind)
+        if kind == CHASE:
+            targets[side].append({ids[sq] for sq in chased})  # type: ignore[misc]
+
+    red_offends, red_checks = _perpetual(kinds[0], targets[0])
+    black_offends, black_checks = _perpetual(kinds[1], targets[1])
+
+    if red_offends and black_offends:
+        if rules.check_outranks_chase and red_checks != black_checks:
+            return "Black" if red_checks else "Red"
+        return "Draw"
+    if red_offends:
+        return "Black"
+    if black_offends:
+        return "Red"
+    return "Draw"
+
+
+def _perpetual(kinds: List[int], targets: List[Set[int]]) -> Tuple[bool, bool]:
+    """Returns (is 长打, is 长将) for one side's moves in a cycle."""
+    if not kinds or any(kind not in (CHECK, CHASE) for kind in kinds):
+        return False, False
+    if all(kind == CHECK for kind in kinds):
+        return True, True
+    # 长捉（含一将一捉）必须始终捉同一个子
+    common = set.intersection(*targets)
+    return bool(common), False
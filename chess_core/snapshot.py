@@ -0,0 +1,208 @@
+"""
+This module saves and restores complete game states, so that a long-running
+server can restart without losing games in progress.
+
+``to_fen`` only captures the current position. A ``GameSnapshot`` also keeps
+the position the game started from, every move as a packed move code, the
+repetition stack (the hash after every move), both clocks and the repetition
+rules, plus a short free-form ``meta`` string for the caller (the game server
+keeps its game id and engine settings there). Restoring replays the moves, which rebuilds the notation, the
+repetition counts and the attack maps exactly, and the stored hashes are
+checked against the replay.
+
+Snapshots have a compact binary form (``pack``/``unpack``) and a JSON form.
+``save_many`` writes thousands of them as one file with a single ``os.writev``
+pass; ``load_many`` maps the file with ``mmap`` and decodes it in place.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import mmap
+import os
+import struct
+from typing import TYPE_CHECKING, Iterable, List
+
+from my_chess.chess_core import repetition
+from my_chess.chess_core.tables import col_of, row_of
+
+if TYPE_CHECKING:
+    from my_chess.chess_core.chessboard import Chessboard
+
+START_FEN = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+
+FILE_MAGIC = b"XQSN"
+FILE_VERSION = 2
+# magic, version, number of records
+FILE_HEADER = struct.Struct("<4sHI")
+# offset and length of each record
+INDEX_ENTRY = struct.Struct("<QI")
+# FEN length, rules length, meta length, move count, hash count,
+# red clock (ms), black clock (ms)
+RECORD_HEADER = struct.Struct("<HBHIIqq")
+
+
+@dataclasses.dataclass
+class GameSnapshot:
+    """The full state of one game."""
+
+    fen: str
+    moves: List[int]
+    hashes: List[int]
+    red_ms: int = 0
+    black_ms: int = 0
+    rules: str = repetition.ASIAN_RULES.name
+    meta: str = ""
+
+    @classmethod
+    def capture(
+        cls, board: Chessboard, red_ms: int = 0, black_ms: int = 0, meta: str = ""
+    ) -> "GameSnapshot":
+        """Takes a snapshot of ``board`` (and the game clocks, in milliseconds)."""
+        moves = [from_sq << 8 | to_sq for from_sq, to_sq in board.move_stack]
+        for _ in moves:
+            board.unmake_move()
+        fen = board.to_fen()
+        for move in moves:
+            board.make_move(move >> 8, move & 0xFF)
+        hashes = list(board.hash_stack)
+        return cls(fen, moves, hashes, red_ms, black_ms, board.rules.name, meta)
+
+    def restore(self, name: str = "restored") -> Chessboard:
+        """Rebuilds the game; raises ValueError if the replay does not match."""
+        from my_chess.chess_core.chessboard import Chessboard
+
+        if self.fen == START_FEN:
+            # 标准开局用 init_board，棋子名字与新开的对局一致
+            board = Chessboard(name)
+            board.init_board()
+        else:
+            board = Chessboard.from_fen(self.fen)
+            board.name = name
+        rules = repetition.RULE_SETS.get(self.rules)
+        if rules is None:
+            raise ValueError(f"Unknown repetition rules: {self.rules}")
+        board.rules = rules
+        for move in self.moves:
+            from_sq, to_sq = move >> 8, move & 0xFF
+            piece = board.get_chessman(col_of(from_sq), row_of(from_sq))
+            if piece is None or piece.is_red != board.is_red_turn:
+                raise ValueError(f"Snapshot move does not fit the position: {move}")
+            board.move_chessman(piece, col_of(to_sq), row_of(to_sq))
+        if board.hash_stack != self.hashes:
+            raise ValueError("Snapshot repetition stack does not match its moves")
+        return board
+
+    def pack(self) -> bytes:
+        """Encodes the snapshot in the compact binary form."""
+        fen = self.fen.encode("ascii")
+        rules = self.rules.encode("ascii")
+        meta = self.meta.encode("utf-8")
+        count = len(self.moves)
+        return b"".join(
+            (
+                RECORD_HEADER.pack(
+                    len(fen),
+                    len(rules),
+                    len(meta),
+                    count,
+                    len(self.hashes),
+                    self.red_ms,
+                    self.black_ms,
+                ),
+                fen,
+                rules,
+                meta,
+                struct.pack(f"<{count}H", *self.moves),
+                struct.pack(f"<{len(self.hashes)}Q", *self.hashes),
+            )
+        )
+
+    @classmethod
+    def unpack(cls, data) -> "GameSnapshot":
+        """Decodes ``pack`` output (any bytes-like object)."""
+        header = RECORD_HEADER.unpack_from(data)
+        fen_len, rules_len, meta_len, count, hash_count, red_ms, black_ms = header
+        offset = RECORD_HEADER.size
+        fen = bytes(data[offset : offset + fen_len]).decode("ascii")
+        offset += fen_len
+        rules = bytes(data[offset : offset + rules_len]).decode("ascii")
+        offset += rules_len
+        meta = bytes(data[offset : offset + meta_len]).decode("utf-8")
+        offset += meta_len
+        moves = list(struct.unpack_from(f"<{count}H", data, offset))
+        offset += 2 * count
+        hashes = list(struct.unpack_from(f"<{hash_count}Q", data, offset))
+        return cls(fen, moves, hashes, red_ms, black_ms, rules, meta)
+
+    def to_json(self) -> str:
+        """Encodes the snapshot as JSON."""
+        return json.dumps(dataclasses.asdict(self), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: str) -> "GameSnapshot":
+        """Decodes ``to_json`` output."""
+        return cls(**json.loads(text))
+
+
+def _write_all(fd: int, buffers: List[bytes]) -> None:
+    """Writes every buffer with as few ``os.writev`` calls as the OS allows."""
+    if not hasattr(os, "writev"):
+        os.write(fd, b"".join(buffers))
+        return
+    limit = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") else 1024
+    pending = [memoryview(buffer) for buffer in buffers if buffer]
+    while pending:
+        written = os.writev(fd, pending[:limit])
+        # 处理部分写入：丢掉已写完的缓冲区，截断写了一半的那个
+        while pending and written >= len(pending[0]):
+            written -= len(pending[0])
+            pending.pop(0)
+        if written:
+            pending[0] = pending[0][written:]
+
+
+def save_many(path: str, snapshots: Iterable[GameSnapshot]) -> int:
+    """Writes snapshots to one file; returns how many were written."""
+    records = [snapshot.pack() for snapshot in snapshots]
+    offset = FILE_HEADER.size + INDEX_ENTRY.size * len(records)
+    index = bytearray()
+    for record in records:
+        index += INDEX_ENTRY.pack(offset, len(record))
+        offset += len(record)
+    header = FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, len(records))
+    temp_path = f"{path}.tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        _write_all(fd, [header, bytes(index), *records])
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    # 先写临时文件再替换，服务器中途崩溃也不会留下半个快照文件
+    os.replace(temp_path, path)
+    return len(records)
+
+
+def load_many(path: str) -> List[GameSnapshot]:
+    """Reads a file written by ``save_many``; raises ValueError if it is not one."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size < FILE_HEADER.size:
+            raise ValueError(f"Not a snapshot file: {path}")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, count = FILE_HEADER.unpack_from(data)
+            if magic != FILE_MAGIC or version != FILE_VERSION:
+                raise ValueError(f"Not a snapshot file: {path}")
+            view = memoryview(data)
+            try:
+                snapshots = []
+                for i in range(count):
+                    offset, length = INDEX_ENTRY.unpack_from(
+                        data, FILE_HEADER.size + i * INDEX_ENTRY.size
+                    )
+                    snapshots.append(
+                        GameSnapshot.unpack(view[offset : offset + length])
+                    )
+            finally:
+                view.release()
+    return snapshots
@@ -0,0 +1,102 @@
+"""
+This module keeps precomputed tables in a versioned on-disk cache, so a fresh
+engine process can map them in with ``mmap`` instead of rebuilding them.
+
+A cache file holds ``marshal.dumps((key, tables))``. The key combines the
+cache format version, the marshal format version, the Python version and the
+size and modification time of the module that builds the tables, so editing
+the builder or switching interpreters rebuilds the file. Any problem with the
+cache (no writable directory, a truncated or stale file) falls back to
+building the tables in memory; the cache is only ever a speed-up.
+
+The directory is ``$MY_CHESS_CACHE_DIR`` if set (an empty value disables the
+cache), else ``$XDG_CACHE_HOME/my_chess`` or ``~/.cache/my_chess``.
+"""
+
+import marshal
+import mmap
+import os
+import sys
+from typing import Any, Callable, Dict, Optional, Tuple
+
+CACHE_ENV = "MY_CHESS_CACHE_DIR"
+FORMAT_VERSION = 1
+
+# 每张表最近一次的来源："hit"（读缓存）、"miss"（重建并写入）或 "off"（未启用缓存）
+STATS: Dict[str, str] = {}
+
+
+def cache_dir() -> Optional[str]:
+    """Returns the cache directory, or None when caching is disabled."""
+    path = os.environ.get(CACHE_ENV)
+    if path is not None:
+        return path or None
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "my_chess")
+
+
+def cache_key(source: str) -> Tuple[int, ...]:
+    """Returns the version key for tables built by the module at ``source``."""
+    stat = os.stat(source)
+    return (
+        FORMAT_VERSION,
+        marshal.version,
+        sys.version_info[0],
+        sys.version_info[1],
+        stat.st_size,
+        stat.st_mtime_ns,
+    )
+
+
+def _read(path: str, key: Tuple[int, ...]) -> Optional[Any]:
+    try:
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            stored_key, tables = marshal.loads(mm)
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+    return tables if stored_key == key else None
+
+
+def _write(path: str, key: Tuple[int, ...], tables: Any) -> None:
+    # 每个进程写自己的临时文件再原子替换，并发启动的进程只会看到完整的文件
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp_path, "wb") as f:
+            f.write(marshal.dumps((key, tables)))
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+
+
+def load_or_build(name: str, source: str, build: Callable[[], Any]) -> Any:
+    """
+    Returns the tables cached under ``name``, building (and caching) them
+    with ``build`` when there is no valid cache file. ``source`` is the path
+    of the module that defines ``build``; the tables must be marshallable.
+    """
+    directory = cache_dir()
+    if directory is None:
+        STATS[name] = "off"
+        return build()
+    try:
+        key = cache_key(source)
+    except OSError:
+        STATS[name] = "off"
+        return build()
+    path = os.path.join(directory, f"{name}.marshal")
+    tables = _read(path, key)
+    if tables is not None:
+        STATS[name] = "hit"
+        return tables
+    tables = build()
+    _write(path, key, tables)
+    STATS[name] = "miss"
+    return tables
@@ -0,0 +1,315 @@
+"""
+This module holds the precomputed board geometry shared by the rule engine:
+square indexing, integer piece codes and per-square step/ray tables.
+
+Squares are numbered ``row * 9 + col`` (0..89), the same layout that
+``Zobrist.get_position_index`` uses, so a square index can be used directly as a
+hash key offset.
+
+The step and ray tables are built once and then kept in the on-disk cache of
+``table_cache``, so engine processes load them instead of rebuilding them.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from my_chess.chess_core import table_cache
+
+BOARD_COLS = 9
+BOARD_ROWS = 10
+NUM_SQUARES = BOARD_COLS * BOARD_ROWS
+
+# Piece types, in the same order as the Zobrist piece indices
+KING = 0
+MANDARIN = 1
+ELEPHANT = 2
+KNIGHT = 3
+ROOK = 4
+CANNON = 5
+PAWN = 6
+
+# Piece codes: red = type, black = type + 7, empty square = -1
+EMPTY = -1
+BLACK_OFFSET = 7
+
+FEN_TO_CODE: Dict[str, int] = {
+    "K": 0,
+    "A": 1,
+    "B": 2,
+    "N": 3,
+    "R": 4,
+    "C": 5,
+    "P": 6,
+    "k": 7,
+    "a": 8,
+    "b": 9,
+    "n": 10,
+    "r": 11,
+    "c": 12,
+    "p": 13,
+}
+CODE_TO_FEN = "KABNRCPkabnrcp"
+
+# Ray directions, in the order used by RAYS: left, right, top (up), bottom (down)
+LEFT = 0
+RIGHT = 1
+TOP = 2
+BOTTOM = 3
+
+
+def square(col: int, row: int) -> int:
+    """Maps board coordinates (col, row) to a square index (0-89)."""
+    return row * BOARD_COLS + col
+
+
+def col_of(sq: int) -> int:
+    """Returns the column of a square index."""
+    return sq % BOARD_COLS
+
+
+def row_of(sq: int) -> int:
+    """Returns the row of a square index."""
+    return sq // BOARD_COLS
+
+
+def piece_type(code: int) -> int:
+    """Returns the piece type (KING..PAWN) of a piece code."""
+    return code % BLACK_OFFSET
+
+
+def is_red_code(code: int) -> bool:
+    """Returns True if the piece code belongs to Red."""
+    return 0 <= code < BLACK_OFFSET
+
+
+def in_palace(sq: int, is_red: bool) -> bool:
+    """Checks whether a square lies inside the given side's palace."""
+    col, row = col_of(sq), row_of(sq)
+    if not 3 <= col <= 5:
+        return False
+    return row <= 2 if is_red else row >= 7
+
+
+def own_half(sq: int, is_red: bool) -> bool:
+    """Checks whether a square lies on the given side's half of the river."""
+    return row_of(sq) <= 4 if is_red else row_of(sq) >= 5
+
+
+def _on_board(col: int, row: int) -> bool:
+    return 0 <= col < BOARD_COLS and 0 <= row < BOARD_ROWS
+
+
+def _build_rays() -> List[Tuple[Tuple[int, ...], ...]]:
+    rays = []
+    for sq in range(NUM_SQUARES):
+        col, row = col_of(sq), row_of(sq)
+        rays.append(
+            (
+                tuple(square(c, row) for c in range(col - 1, -1, -1)),
+                tuple(square(c, row) for c in range(col + 1, BOARD_COLS)),
+                tuple(square(col, r) for r in range(row + 1, BOARD_ROWS)),
+                tuple(square(col, r) for r in range(row - 1, -1, -1)),
+            )
+        )
+    return rays
+
+
+def _build_knight_moves() -> List[Tuple[Tuple[int, int], ...]]:
+    """(target, leg) pairs for a knight standing on each square."""
+    table = []
+    for sq in range(NUM_SQUARES):
+        col, row = col_of(sq), row_of(sq)
+        entries = []
+        for dc, dr, lc, lr in (
+            (1, 2, 0, 1),
+            (-1, 2, 0, 1),
+            (1, -2, 0, -1),
+            (-1, -2, 0, -1),
+            (2, 1, 1, 0),
+            (2, -1, 1, 0),
+            (-2, 1, -1, 0),
+            (-2, -1, -1, 0),
+        ):
+            if _on_board(col + dc, row + dr):
+                target = square(col + dc, row + dr)
+                entries.append((target, square(col + lc, row + lr)))
+        table.append(tuple(entries))
+    return table
+
+
+def _build_knight_attackers(
+    moves: List[Tuple[Tuple[int, int], ...]],
+) -> List[Tuple[Tuple[int, int], ...]]:
+    """(knight square, leg) pairs for every knight that could attack each square."""
+    table: List[List[Tuple[int, int]]] = [[] for _ in range(NUM_SQUARES)]
+    for sq, entries in enumerate(moves):
+        for target, leg in entries:
+            table[target].append((sq, leg))
+    return [tuple(entries) for entries in table]
+
+
+def _build_elephant_moves(is_red: bool) -> List[Tuple[Tuple[int, int], ...]]:
+    """(target, eye) pairs for an elephant on each square of its own half."""
+    table = []
+    for sq in range(NUM_SQUARES):
+        col, row = col_of(sq), row_of(sq)
+        entries = []
+        if own_half(sq, is_red):
+            for dc, dr in ((2, 2), (2, -2), (-2, 2), (-2, -2)):
+                if _on_board(col + dc, row + dr):
+                    target = square(col + dc, row + dr)
+                    if own_half(target, is_red):
+                        eye = square(col + dc // 2, row + dr // 2)
+                        entries.append((target, eye))
+        table.append(tuple(entries))
+    return table
+
+
+def _build_palace_steps(
+    deltas: Tuple[Tuple[int, int], ...], is_red: bool
+) -> List[Tuple[int, ...]]:
+    """One-step moves that start and end inside the given side's palace."""
+    table = []
+    for sq in range(NUM_SQUARES):
+        col, row = col_of(sq), row_of(sq)
+        targets = []
+        if in_palace(sq, is_red):
+            for dc, dr in deltas:
+                if _on_board(col + dc, row + dr):
+                    target = square(col + dc, row + dr)
+                    if in_palace(target, is_red):
+                        targets.append(target)
+        table.append(tuple(targets))
+    return table
+
+
+def _build_diagonal_neighbors() -> List[Tuple[int, ...]]:
+    table = []
+    for sq in range(NUM_SQUARES):
+        col, row = col_of(sq), row_of(sq)
+        table.append(
+            tuple(
+                square(col + dc, row + dr)
+                for dc, dr in ((1, 1), (1, -1), (-1, 1), (-1, -1))
+                if _on_board(col + dc, row + dr)
+            )
+        )
+    return table
+
+
+def _build_pawn_moves(is_red: bool) -> List[Tuple[int, ...]]:
+    forward = 1 if is_red else -1
+    table = []
+    for sq in range(NUM_SQUARES):
+        col, row = col_of(sq), row_of(sq)
+        targets = []
+        if _on_board(col, row + forward):
+            targets.append(square(col, row + forward))
+        if not own_half(sq, is_red):
+            for dc in (-1, 1):
+                if _on_board(col + dc, row):
+                    targets.append(square(col + dc, row))
+        table.append(tuple(targets))
+    return table
+
+
+def _build_pawn_attackers(moves: List[Tuple[int, ...]]) -> List[Tuple[int, ...]]:
+    """Squares from which a pawn of one side attacks each square."""
+    table: List[List[int]] = [[] for _ in range(NUM_SQUARES)]
+    for sq, targets in enumerate(moves):
+        for target in targets:
+            table[target].append(sq)
+    return [tuple(sources) for sources in table]
+
+
+def _build_mirror_squares() -> Tuple[int, ...]:
+    """The square each square maps to under the left-right mirror."""
+    return tuple(
+        square(BOARD_COLS - 1 - col_of(sq), row_of(sq)) for sq in range(NUM_SQUARES)
+    )
+
+
+def _build_tables() -> Dict[str, Any]:
+    knight_moves = _build_knight_moves()
+    pawn_moves = (_build_pawn_moves(True), _build_pawn_moves(False))
+    orthogonal = ((1, 0), (-1, 0), (0, 1), (0, -1))
+    diagonal = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+    return {
+        "RAYS": _build_rays(),
+        "KNIGHT_MOVES": knight_moves,
+        "KNIGHT_ATTACKERS": _build_knight_attackers(knight_moves),
+        "DIAGONAL_NEIGHBORS": _build_diagonal_neighbors(),
+        "ELEPHANT_MOVES": (_build_elephant_moves(True), _build_elephant_moves(False)),
+        "KING_MOVES": (
+            _build_palace_steps(orthogonal, True),
+            _build_palace_steps(orthogonal, False),
+        ),
+        "MANDARIN_MOVES": (
+            _build_palace_steps(diagonal, True),
+            _build_palace_steps(diagonal, False),
+        ),
+        "PAWN_MOVES": pawn_moves,
+        "PAWN_ATTACKERS": (
+            _build_pawn_attackers(pawn_moves[0]),
+            _build_pawn_attackers(pawn_moves[1]),
+        ),
+        "MIRROR_SQUARES": _build_mirror_squares(),
+    }
+
+
+# 表只依赖本文件，所以按本文件的版本缓存到磁盘，新进程直接读入
+_TABLES = table_cache.load_or_build("tables", __file__, _build_tables)
+
+RAYS: List[Tuple[Tuple[int, ...], ...]] = _TABLES["RAYS"]
+KNIGHT_MOVES: List[Tuple[Tuple[int, int], ...]] = _TABLES["KNIGHT_MOVES"]
+KNIGHT_ATTACKERS: List[Tuple[Tuple[int, int], ...]] = _TABLES["KNIGHT_ATTACKERS"]
+DIAGONAL_NEIGHBORS: List[Tuple[int, ...]] = _TABLES["DIAGONAL_NEIGHBORS"]
+# Per-color tables: index 0 is Red, index 1 is Black
+ELEPHANT_MOVES = _TABLES["ELEPHANT_MOVES"]
+KING_MOVES = _TABLES["KING_MOVES"]
+MANDARIN_MOVES = _TABLES["MANDARIN_MOVES"]
+PAWN_MOVES = _TABLES["PAWN_MOVES"]
+PAWN_ATTACKERS = _TABLES["PAWN_ATTACKERS"]
+MIRROR_SQUARES: Tuple[int, ...] = _TABLES["MIRROR_SQUARES"]
+del _TABLES
+
+
+def encode_move(from_sq: int, to_sq: int) -> int:
+    """Packs a move into 16 bits: source square in the high byte, target low."""
+    return from_sq << 8 | to_sq
+
+
+def move_from(move: int) -> int:
+    """Returns the source square of a packed move."""
+    return move >> 8
+
+
+def move_to(move: int) -> int:
+    """Returns the target square of a packed move."""
+    return move & 0xFF
+
+
+def mirror_move(move: int) -> int:
+    """Returns the packed move mirrored left to right (e.g. h2e2 -> b2e2)."""
+    return MIRROR_SQUARES[move >> 8] << 8 | MIRROR_SQUARES[move & 0xFF]
+
+
+def move_to_ucci(move: int) -> str:
+    """Formats a packed move as a UCCI string (e.g. 'h2e2')."""
+    from_sq, to_sq = move >> 8, move & 0xFF
+    return (
+        f"{chr(ord('a') + col_of(from_sq))}{row_of(from_sq)}"
+        f"{chr(ord('a') + col_of(to_sq))}{row_of(to_sq)}"
+    )
+
+
+def move_from_ucci(ucci: str) -> int:
+    """Parses a UCCI move string (e.g. 'h2e2') into a packed move."""
+    if len(ucci) != 4:
+        raise ValueError(f"Invalid UCCI move: {ucci}")
+    squares = []
+    for letter, digit in (ucci[0:2], ucci[2:4]):
+        col = ord(letter) - ord("a")
+        if not (0 <= col < BOARD_COLS and digit.isdigit()):
+            raise ValueError(f"Invalid UCCI move: {ucci}")
+        squares.append(square(col, int(digit)))
+    return encode_move(squares[0], squares[1])
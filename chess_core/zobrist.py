@@ -2,82 +2,140 @@
 This module implements Zobrist Hashing for Chinese Chess.
 It provides a way to hash the board state into a unique integer to efficiently check for
 repeated positions (draws) and enabling transposition tables for AI.
+
+The keys are drawn from a fixed seed, so every board and every process hashes
+the same position to the same value. Parallel search workers rely on this to
+share one transposition table. The drawn keys are kept in the on-disk cache
+of ``table_cache``.
+
+Keys are looked up by integer piece code in one flat table indexed by
+``code * 90 + square``. ``hash_many`` hashes whole batches of positions
+with NumPy when it is installed.
+
+The hash of a position's left-right mirror image uses the same keys through
+``tables.MIRROR_SQUARES``. The smaller of the two hashes is the position's
+canonical hash, which both mirror images share.
 """
 
-import random
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Sequence, Tuple
+
+from my_chess.chess_core import table_cache
+from my_chess.chess_core.tables import (
+    BLACK_OFFSET,
+    EMPTY,
+    MIRROR_SQUARES,
+    NUM_SQUARES,
+)
 
 if TYPE_CHECKING:
     from my_chess.chess_core import chessboard, chessman
 
+ZOBRIST_SEED = 0x5851_F42D_4C95_7F2D
+
+
+def _build_keys() -> Tuple[Tuple[Tuple[int, ...], ...], int]:
+    import random  # 只有重建缓存时才需要
+
+    rng = random.Random(ZOBRIST_SEED)
+    piece_keys = tuple(tuple(rng.getrandbits(64) for _ in range(90)) for _ in range(14))
+    return piece_keys, rng.getrandbits(64)
+
+
+# 种子写在本文件里，改动种子会改变文件版本，缓存随之失效
+PIECE_KEYS, TURN_KEY = table_cache.load_or_build("zobrist", __file__, _build_keys)
+
+# Flat key table indexed by ``code * NUM_SQUARES + square``
+KEYS: Tuple[int, ...] = tuple(key for row in PIECE_KEYS for key in row)
+
+_numpy_keys = None
+
+
+def piece_key(code: int, sq: int) -> int:
+    """Returns the key of the piece ``code`` standing on square ``sq``."""
+    return KEYS[code * NUM_SQUARES + sq]
+
+
+def hash_codes(codes: Sequence[int], is_red_turn: bool) -> int:
+    """Hashes a position given as 90 piece codes and the side to move."""
+    h = TURN_KEY if is_red_turn else 0
+    keys = KEYS
+    for sq, code in enumerate(codes):
+        if code != EMPTY:
+            h ^= keys[code * NUM_SQUARES + sq]
+    return h
+
+
+def hash_many(codes, red_to_move=None):
+    """
+    Hashes many positions at once, e.g. to deduplicate a dataset.
+
+    ``codes`` holds one row of 90 piece codes per position (a NumPy array of
+    shape (n, 90), or any nested sequence such as ``Chessboard.to_codes()``
+    rows); ``red_to_move`` holds one flag per position and defaults to Red.
+    With NumPy installed the keys are gathered and XOR-reduced in one
+    vectorized pass and a ``uint64`` array is returned; without it the
+    positions are hashed one by one into a list of ints.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        if red_to_move is None:
+            return [hash_codes(row, True) for row in codes]
+        return [hash_codes(row, red) for row, red in zip(codes, red_to_move)]
+
+    global _numpy_keys
+    if _numpy_keys is None:
+        # 第 0 行全零给空格子用（编码 -1 + 1），其余按 (code + 1) * 90 + sq 排列
+        _numpy_keys = np.array((0,) * NUM_SQUARES + KEYS, dtype=np.uint64)
+    board = np.asarray(codes, dtype=np.intp).reshape(-1, NUM_SQUARES)
+    index = (board + 1) * NUM_SQUARES + np.arange(NUM_SQUARES)
+    hashes = np.bitwise_xor.reduce(_numpy_keys[index], axis=1)
+    if red_to_move is None:
+        red = np.ones(len(hashes), dtype=bool)
+    else:
+        red = np.asarray(red_to_move, dtype=bool)
+    return np.where(red, hashes ^ np.uint64(TURN_KEY), hashes)
+
 
 class Zobrist:
     """
     Implements Zobrist Hashing for Chinese Chess board states.
+
+    The keys live in module-level tables shared by every board; an instance
+    only exposes them under the historical attribute names.
     """
 
-    def __init__(self):
-        """Initializes Zobrist keys for pieces and turn."""
-        # 14 piece types (7 * 2 colors)
-        # Positions 0..89 (9x10)
-        # piece_keys[piece_index][position_index]
-        self.piece_keys = [
-            [random.getrandbits(64) for _ in range(90)] for _ in range(14)
-        ]
-        self.turn_key = random.getrandbits(64)
-
-        # Map piece name/type to index 0..13
-        # Red: K=0, A=1, B=2, N=3, R=4, C=5, P=6
-        # Black: k=7, a=8, b=9, n=10, r=11, c=12, p=13
-        self.piece_map = {
-            "red_king": 0,
-            "red_mandarin": 1,
-            "red_elephant": 2,
-            "red_knight": 3,
-            "red_rook": 4,
-            "red_cannon": 5,
-            "red_pawn": 6,
-            "black_king": 7,
-            "black_mandarin": 8,
-            "black_elephant": 9,
-            "black_knight": 10,
-            "black_rook": 11,
-            "black_cannon": 12,
-            "black_pawn": 13,
-        }
+    # 14 piece types (7 * 2 colors), positions 0..89 (9x10):
+    # piece_keys[piece_index][position_index] == KEYS[piece_index * 90 + position_index]
+    piece_keys = PIECE_KEYS
+    turn_key = TURN_KEY
+
+    # Map piece name/type to index 0..13, the same as the piece codes in ``tables``
+    # Red: K=0, A=1, B=2, N=3, R=4, C=5, P=6
+    # Black: k=7, a=8, b=9, n=10, r=11, c=12, p=13
+    piece_map = {
+        "red_king": 0,
+        "red_mandarin": 1,
+        "red_elephant": 2,
+        "red_knight": 3,
+        "red_rook": 4,
+        "red_cannon": 5,
+        "red_pawn": 6,
+        "black_king": 7,
+        "black_mandarin": 8,
+        "black_elephant": 9,
+        "black_knight": 10,
+        "black_rook": 11,
+        "black_cannon": 12,
+        "black_pawn": 13,
+    }
 
     def get_piece_index(self, piece: "chessman.Chessman") -> int:
         """
-        Calculates the unique index (0-13) for a piece type and color.
+        Returns the unique index (0-13) for a piece type and color, which is
+        the piece's code.
         """
-        # Determine index based on piece name or type
-        # Assuming piece.name contains standard identifiers
-        # But piece.name_en is "red_rook_1", etc.
-        # We need the base name.
-        # Let's rely on type and color.
-
-        base_idx = 0
-        if not piece.is_red:
-            base_idx = 7
-
-        p_char = piece.fen_char.upper()
-        type_offset = 0
-        if p_char == "K":
-            type_offset = 0
-        elif p_char == "A":
-            type_offset = 1
-        elif p_char == "B":
-            type_offset = 2
-        elif p_char == "N":
-            type_offset = 3
-        elif p_char == "R":
-            type_offset = 4
-        elif p_char == "C":
-            type_offset = 5
-        elif p_char == "P":
-            type_offset = 6
-
-        return base_idx + type_offset
+        return piece.code
 
     def get_position_index(self, col: int, row: int) -> int:
         """
@@ -86,23 +144,35 @@ class Zobrist:
         # Row 0..9, Col 0..8
         return row * 9 + col
 
-    def hash_board(self, chessboard: "chessboard.Chessboard") -> int:
+    def hash_board(
+        self, chessboard: "chessboard.Chessboard", mirror: bool = False
+    ) -> int:
         """
-        Computes the Zobrist hash for the entire board state.
+        Computes the Zobrist hash for the entire board state, or with
+        ``mirror`` the hash of its left-right mirror image.
         """
-        h = 0
-        if chessboard.is_red_turn:
-            h ^= self.turn_key
-
-        for col in range(9):
-            for row in range(10):
-                piece = chessboard.chessmans[col][row]
-                if piece:
-                    p_idx = self.get_piece_index(piece)
-                    pos_idx = self.get_position_index(col, row)
-                    h ^= self.piece_keys[p_idx][pos_idx]
+        h = TURN_KEY if chessboard.is_red_turn else 0
+        keys = KEYS
+        for code in range(2 * BLACK_OFFSET):
+            base = code * NUM_SQUARES
+            for sq in chessboard.piece_squares(code):
+                h ^= keys[base + (MIRROR_SQUARES[sq] if mirror else sq)]
         return h
 
+    def move_hash(
+        self, current_hash: int, code: int, from_sq: int, to_sq: int, captured: int
+    ) -> int:
+        """
+        Incrementally updates the hash for piece ``code`` moving between two
+        squares, capturing the piece code ``captured`` (or ``EMPTY``).
+        """
+        keys = KEYS
+        base = code * NUM_SQUARES
+        current_hash ^= keys[base + from_sq] ^ keys[base + to_sq] ^ TURN_KEY
+        if captured != EMPTY:
+            current_hash ^= keys[captured * NUM_SQUARES + to_sq]
+        return current_hash
+
     def update_hash(
         self,
         current_hash,
@@ -116,22 +186,10 @@ class Zobrist:
         """
         Incrementally updates the hash based on a move.
         """
-        # XOR out old position
-        p_idx = self.get_piece_index(piece)
-        old_pos_idx = self.get_position_index(old_col, old_row)
-        current_hash ^= self.piece_keys[p_idx][old_pos_idx]
-
-        # XOR in new position
-        new_pos_idx = self.get_position_index(new_col, new_row)
-        current_hash ^= self.piece_keys[p_idx][new_pos_idx]
-
-        # If capture, XOR out captured piece
-        if captured_piece:
-            cap_idx = self.get_piece_index(captured_piece)
-            # Captured piece is at new_col, new_row
-            current_hash ^= self.piece_keys[cap_idx][new_pos_idx]
-
-        # Toggle turn
-        current_hash ^= self.turn_key
-
-        return current_hash
+        return self.move_hash(
+            current_hash,
+            piece.code,
+            old_row * 9 + old_col,
+            new_row * 9 + new_col,
+            EMPTY if captured_piece is None else captured_piece.code,
+        )
@@ -0,0 +1,444 @@
+"""
+This module implements a headless game server: one asyncio process that
+hosts many concurrent games (human vs. human or human vs. engine) as in-memory
+``Chessboard`` instances.
+
+Clients talk JSON lines over TCP: each request is one JSON object on its
+own line, and each response is one JSON object carrying the same ``id``.
+Requests:
+
+- ``{"op": "new", "fen": ..., "engine": "black", "depth": 3}`` starts a game
+  (``fen`` and ``engine`` are optional; ``engine`` is the side it plays)
+- ``{"op": "move", "game": 1, "move": "h2e2"}`` plays a move, answered with
+  the engine's reply when it is the engine's turn
+- ``{"op": "state", "game": 1}``, ``{"op": "legal", "game": 1}``
+- ``{"op": "analyze", "game": 1, "depth": 3}`` asks the engine for a move
+- ``{"op": "watch", "game": 1}`` subscribes to the game's move events
+- ``{"op": "close", "game": 1}``, ``{"op": "metrics"}``
+
+Moves are checked against the rule engine's legal moves. Engine searches run
+in a process pool so they never block the event loop. Every game records
+the latency of the requests it served and the thinking time of each side.
+
+Run it with ``python run.py serve [--port 9877] [--workers N] [--snapshot FILE]``.
+With ``--snapshot`` the games in progress are saved to FILE on shutdown
+(see ``chess_core.snapshot``) and resumed from it on the next start.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Optional, Set, Tuple
+
+from my_chess.chess_ai.search import Searcher
+from my_chess.chess_core.chessboard import Chessboard
+from my_chess.chess_core.snapshot import GameSnapshot, load_many, save_many
+from my_chess.chess_core.tables import col_of, move_from_ucci, move_to_ucci, row_of
+
+DEFAULT_PORT = 9877
+DEFAULT_DEPTH = 3
+MAX_DEPTH = 8
+LATENCY_SAMPLES = 256
+
+
+class RequestError(Exception):
+    """A request that cannot be served; its message is sent back to the client."""
+
+
+class LatencyStats:
+    """
+    Keeps request latencies: totals plus a window of recent samples for percentiles.
+    """
+
+    def __init__(self, samples: int = LATENCY_SAMPLES) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: deque = deque(maxlen=samples)
+
+    def add(self, seconds: float) -> None:
+        """Records one latency."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Returns a percentile (0..1) of the recent samples."""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def to_dict(self) -> Dict[str, float]:
+        """Summarizes the latencies in milliseconds."""
+        return {
+            "count": self.count,
+            "mean_ms": round(1000 * self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(1000 * self.percentile(0.5), 3),
+            "p95_ms": round(1000 * self.percentile(0.95), 3),
+            "max_ms": round(1000 * self.max, 3),
+        }
+
+
+def engine_move(board_data: bytes, depth: int) -> Tuple[Optional[int], int]:
+    """Searches a position in a pool worker; returns (move, score)."""
+    return Searcher(Chessboard.from_bytes(board_data)).search(depth)
+
+
+class GameSession:
+    """
+    One hosted game: its board, engine settings, clocks, watchers and latency
+    metrics.
+    """
+
+    def __init__(
+        self, game_id: int, board: Chessboard, engine_is_red: Optional[bool], depth: int
+    ) -> None:
+        self.game_id = game_id
+        self.board = board
+        self.engine_is_red = engine_is_red
+        self.depth = depth
+        self.lock = asyncio.Lock()
+        self.watchers: Set[asyncio.StreamWriter] = set()
+        self.latency = LatencyStats()
+        self.engine_latency = LatencyStats()
+        self.red_ms = 0
+        self.black_ms = 0
+        self.turn_started = time.monotonic()
+
+    @property
+    def engine_to_move(self) -> bool:
+        """True when the engine plays the side to move and the game is not over."""
+        return (
+            self.engine_is_red == self.board.is_red_turn
+            and self.board.get_winner() is None
+        )
+
+    def play(self, move: int) -> None:
+        """Plays a move, recording its notation; raises RequestError if illegal."""
+        board = self.board
+        if board.get_winner() is not None:
+            raise RequestError("game is over")
+        if move not in board.legal_moves():
+            raise RequestError(f"illegal move: {move_to_ucci(move)}")
+        from_sq, to_sq = move >> 8, move & 0xFF
+        piece = board.get_chessman(col_of(from_sq), row_of(from_sq))
+        now = time.monotonic()
+        elapsed = int((now - self.turn_started) * 1000)
+        if board.is_red_turn:
+            self.red_ms += elapsed
+        else:
+            self.black_ms += elapsed
+        self.turn_started = now
+        board.move_chessman(piece, col_of(to_sq), row_of(to_sq))
+
+    def state(self) -> Dict:
+        """Describes the game for clients."""
+        board = self.board
+        return {
+            "game": self.game_id,
+            "fen": board.to_fen(),
+            "turn": "red" if board.is_red_turn else "black",
+            "moves": [move_to_ucci(f << 8 | t) for f, t in board.move_stack],
+            "notation": list(board.moves_history),
+            "status": board.get_winner(),
+            "clock": {"red": self.red_ms, "black": self.black_ms},
+        }
+
+    def snapshot(self) -> GameSnapshot:
+        """Captures the game, keeping the session settings in the snapshot meta."""
+        engine = None
+        if self.engine_is_red is not None:
+            engine = "red" if self.engine_is_red else "black"
+        meta = json.dumps({"game": self.game_id, "engine": engine, "depth": self.depth})
+        return GameSnapshot.capture(self.board, self.red_ms, self.black_ms, meta)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: GameSnapshot) -> "GameSession":
+        """Resumes a game saved by ``snapshot``."""
+        meta = json.loads(snapshot.meta)
+        game_id = meta["game"]
+        engine = meta["engine"]
+        board = snapshot.restore(str(game_id))
+        engine_is_red = None if engine is None else engine == "red"
+        session = cls(game_id, board, engine_is_red, meta["depth"])
+        session.red_ms = snapshot.red_ms
+        session.black_ms = snapshot.black_ms
+        return session
+
+
+class GameServer:
+    """
+    Holds the games and serves JSON-lines clients.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None) -> None:
+        self.executor = executor if executor is not None else ProcessPoolExecutor()
+        self.games: Dict[int, GameSession] = {}
+        self.next_id = 1
+        self.latency = LatencyStats()
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        """Starts listening; returns the asyncio server."""
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server
+
+    async def close(self) -> None:
+        """Stops listening and shuts the engine pool down."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    def save_games(self, path: str) -> int:
+        """Saves every game in progress to ``path``; returns how many."""
+        return save_many(path, [s.snapshot() for s in self.games.values()])
+
+    def restore_games(self, path: str) -> int:
+        """Resumes the games saved in ``path``; returns how many."""
+        sessions = [GameSession.from_snapshot(s) for s in load_many(path)]
+        for session in sessions:
+            self.games[session.game_id] = session
+            self.next_id = max(self.next_id, session.game_id + 1)
+        return len(sessions)
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serves one connection until it closes."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self.handle_line(line, writer)
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for session in self.games.values():
+                session.watchers.discard(writer)
+            writer.close()
+
+    async def handle_line(self, line: bytes, writer=None) -> Dict:
+        """Decodes, serves and times one request; never raises."""
+        start = time.perf_counter()
+        request_id = None
+        session = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+            request_id = request.get("id")
+            if "game" in request:
+                session = self.session(request["game"])
+            response = await self.dispatch(request, session, writer)
+            response["ok"] = True
+        except (RequestError, ValueError, TypeError) as error:
+            response = {"ok": False, "error": str(error)}
+        except KeyError as error:
+            response = {"ok": False, "error": f"missing field: {error.args[0]}"}
+        if request_id is not None:
+            response["id"] = request_id
+        elapsed = time.perf_counter() - start
+        self.latency.add(elapsed)
+        if session is None and response["ok"] and "game" in response:
+            session = self.games.get(response["game"])  # 新建的对局
+        if session is not None:
+            session.latency.add(elapsed)
+        return response
+
+    def session(self, game_id) -> GameSession:
+        """Looks a game up by id."""
+        session = self.games.get(game_id)
+        if session is None:
+            raise RequestError(f"unknown game: {game_id}")
+        return session
+
+    async def dispatch(
+        self, request: Dict, session: Optional[GameSession], writer
+    ) -> Dict:
+        """Serves one decoded request."""
+        op = request.get("op")
+        if op == "new":
+            return await self.new_game(request)
+        if op == "metrics":
+            return self.metrics()
+        if session is None:
+            raise RequestError(f"'{op}' needs a game")
+        if op == "state":
+            return session.state()
+        if op == "legal":
+            return {
+                "game": session.game_id,
+                "legal": [move_to_ucci(m) for m in session.board.legal_moves()],
+            }
+        if op == "move":
+            return await self.play_move(session, move_from_ucci(str(request["move"])))
+        if op == "analyze":
+            depth = clamp_depth(request.get("depth", session.depth))
+            async with session.lock:
+                move, score = await self.search(session, depth)
+            return {
+                "game": session.game_id,
+                "best": move_to_ucci(move) if move else None,
+                "score": score,
+            }
+        if op == "watch":
+            if writer is not None:
+                session.watchers.add(writer)
+            return session.state()
+        if op == "close":
+            self.games.pop(session.game_id, None)
+            return {"game": session.game_id}
+        raise RequestError(f"unknown op: {op}")
+
+    async def new_game(self, request: Dict) -> Dict:
+        """Creates a game, letting the engine move first if it plays that side."""
+        fen = request.get("fen")
+        if fen:
+            board = Chessboard.from_fen(str(fen))
+        else:
+            board = Chessboard(str(self.next_id))
+            board.init_board()
+        engine = request.get("engine")
+        if engine not in (None, "red", "black"):
+            raise RequestError("engine must be 'red', 'black' or null")
+        engine_is_red = None if engine is None else engine == "red"
+        depth = clamp_depth(request.get("depth", DEFAULT_DEPTH))
+        session = GameSession(self.next_id, board, engine_is_red, depth)
+        self.games[session.game_id] = session
+        self.next_id += 1
+        async with session.lock:
+            reply = await self.engine_reply(session)
+        response = session.state()
+        response["reply"] = reply
+        return response
+
+    async def play_move(self, session: GameSession, move: int) -> Dict:
+        """Plays a client's move and, on the engine's turn, the engine's reply."""
+        async with session.lock:
+            if session.engine_to_move:
+                raise RequestError("it is the engine's turn")
+            session.play(move)
+            self.broadcast(session, move)
+            reply = await self.engine_reply(session)
+        response = session.state()
+        response["reply"] = reply
+        return response
+
+    async def engine_reply(self, session: GameSession) -> Optional[Dict]:
+        """Plays the engine's move if it is its turn (caller holds the lock)."""
+        if not session.engine_to_move:
+            return None
+        move, score = await self.search(session, session.depth)
+        if not move:
+            return None
+        session.play(move)
+        self.broadcast(session, move)
+        return {"move": move_to_ucci(move), "score": score}
+
+    async def search(
+        self, session: GameSession, depth: int
+    ) -> Tuple[Optional[int], int]:
+        """Runs a search in the process pool."""
+        # 提交时就编码棋盘，工作进程拿到的是这一刻的局面
+        board_data = session.board.to_bytes()
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            self.executor, engine_move, board_data, depth
+        )
+        session.engine_latency.add(time.perf_counter() - start)
+        return result
+
+    def broadcast(self, session: GameSession, move: int) -> None:
+        """Sends a move event to the game's watchers."""
+        if not session.watchers:
+            return
+        event = {
+            "event": "move",
+            "game": session.game_id,
+            "move": move_to_ucci(move),
+            "status": session.board.get_winner(),
+        }
+        data = json.dumps(event).encode() + b"\n"
+        for watcher in list(session.watchers):
+            if watcher.is_closing():
+                session.watchers.discard(watcher)
+            else:
+                watcher.write(data)
+
+    def metrics(self) -> Dict:
+        """Reports server-wide and per-game latency metrics."""
+        return {
+            "games": len(self.games),
+            "requests": self.latency.to_dict(),
+            "per_game": {
+                str(game_id): {
+                    "requests": session.latency.to_dict(),
+                    "engine": session.engine_latency.to_dict(),
+                }
+                for game_id, session in self.games.items()
+            },
+        }
+
+
+def clamp_depth(depth) -> int:
+    """Validates a requested search depth."""
+    if not isinstance(depth, int):
+        raise RequestError("depth must be an integer")
+    return max(1, min(depth, MAX_DEPTH))
+
+
+async def serve(
+    host: str, port: int, workers: Optional[int], snapshot: Optional[str] = None
+) -> None:
+    """Runs the server until it is cancelled."""
+    game_server = GameServer(ProcessPoolExecutor(max_workers=workers))
+    if snapshot is not None and os.path.exists(snapshot):
+        count = game_server.restore_games(snapshot)
+        print(f"Resumed {count} games from {snapshot}")
+    server = await game_server.start(host, port)
+    print(f"Serving games on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await game_server.close()
+        if snapshot is not None:
+            count = game_server.save_games(snapshot)
+            print(f"Saved {count} games to {snapshot}")
+
+
+def main(argv=None) -> None:
+    """Command-line entry point for the game server."""
+    parser = argparse.ArgumentParser(description="my_chess headless game server")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="engine processes (default: CPUs)"
+    )
+    parser.add_argument(
+        "--snapshot", default=None, help="file to resume games from and save them to"
+    )
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.snapshot))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+This module is the multi-board spectator: a Pygame window that tiles 4-16 small
+boards and follows live games (e.g. self-play) from a compact move stream
+(see ``chess_core.move_stream``).
+
+Moves arrive over a local TCP socket and/or a pipe on stdin. Once per frame
+the window drains everything that arrived, applies the whole batch to the
+boards' piece codes, and then redraws only the boards that changed. Piece
+images come from the shared ``ASSETS`` cache and are scaled once to the tile
+size. All boards share them.
+
+Run it with ``python run.py watch [--boards 9] [--port 9876] [--stdin]``, or
+``python run.py watch --demo`` to watch random games played by a local feeder.
+"""
+
+# pylint: disable=no-member
+import argparse
+import math
+import multiprocessing
+import random
+import socket
+import sys
+
+import pygame
+from my_chess.chess_core import movegen
+from my_chess.chess_core.chessboard import Chessboard
+from my_chess.chess_core.move_stream import (
+    DEFAULT_PORT,
+    NEW_GAME,
+    MoveStreamReader,
+    MoveStreamWriter,
+)
+from my_chess.chess_core.tables import (
+    CODE_TO_FEN,
+    EMPTY,
+    NUM_SQUARES,
+    col_of,
+    row_of,
+)
+from my_chess.chess_ui.win_game import ASSETS, BOARD_FILE, TEXT_CACHE, piece_file
+from pygame.locals import Rect
+
+WINDOW_SIZE = (1200, 900)
+CAPTION_HEIGHT = 22
+TILE_MARGIN = 6
+FRAME_RATE = 30
+MIN_BOARDS = 4
+MAX_BOARDS = 16
+
+
+def initial_codes():
+    """
+    Returns the piece codes of the standard starting position.
+    """
+    board = Chessboard("watch")
+    board.init_board()
+    return board.to_codes()
+
+
+def load_piece_images(cell):
+    """
+    Returns every piece image scaled to ``cell`` pixels, as a list indexed
+    by piece code.
+    """
+    return [
+        ASSETS.scaled(piece_file(fen_char), (cell, cell)) for fen_char in CODE_TO_FEN
+    ]
+
+
+class BoardTile:
+    """
+    One small board on the dashboard, following one game by its piece codes.
+    """
+
+    def __init__(self, rect, cell, start_codes):
+        self.rect = rect
+        self.cell = cell
+        self.start_codes = start_codes
+        self.codes = list(start_codes)
+        self.game_id = None
+        self.moves = 0
+        self.dirty = True
+
+    def reset(self, game_id):
+        """
+        Starts following ``game_id`` from the initial position.
+        """
+        self.game_id = game_id
+        self.codes = list(self.start_codes)
+        self.moves = 0
+        self.dirty = True
+
+    def apply(self, move):
+        """
+        Plays a packed move on the tile's codes.
+        """
+        from_sq, to_sq = move >> 8, move & 0xFF
+        if from_sq >= NUM_SQUARES or to_sq >= NUM_SQUARES:
+            return
+        codes = self.codes
+        if codes[from_sq] == EMPTY:
+            return  # 丢帧或不同步，忽略
+        codes[to_sq] = codes[from_sq]
+        codes[from_sq] = EMPTY
+        self.moves += 1
+        self.dirty = True
+
+    def draw(self, screen, board_image, piece_images, font):
+        """
+        Draws the tile and returns its rect.
+        """
+        x, y = self.rect.topleft
+        pygame.draw.rect(screen, (240, 230, 210), self.rect)
+        caption = f"#{self.game_id}  {self.moves}" if self.game_id is not None else "-"
+        screen.blit(TEXT_CACHE.render(font, caption, (0, 0, 0)), (x + 4, y + 2))
+        top = y + CAPTION_HEIGHT
+        screen.blit(board_image, (x, top))
+        cell = self.cell
+        for sq, code in enumerate(self.codes):
+            if code != EMPTY:
+                screen.blit(
+                    piece_images[code],
+                    (x + col_of(sq) * cell, top + (9 - row_of(sq)) * cell),
+                )
+        self.dirty = False
+        return self.rect
+
+
+def layout_tiles(count, size=WINDOW_SIZE):
+    """
+    Splits the window into a grid of ``count`` tiles; returns (rects, cell size).
+    """
+    columns = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+    tile_w = size[0] // columns
+    tile_h = size[1] // rows
+    cell = min(
+        (tile_w - TILE_MARGIN) // 9, (tile_h - TILE_MARGIN - CAPTION_HEIGHT) // 10
+    )
+    rects = [
+        Rect(
+            (i % columns) * tile_w,
+            (i // columns) * tile_h,
+            cell * 9,
+            cell * 10 + CAPTION_HEIGHT,
+        )
+        for i in range(count)
+    ]
+    return rects, cell
+
+
+def demo_feeder(address, games, seed=None, max_moves=150):
+    """
+    Plays random legal games forever and streams them to the spectator at ``address``.
+    """
+    rng = random.Random(seed)
+    connection = socket.create_connection(address)
+    writer = MoveStreamWriter(connection)
+    boards = {}
+    for game_id in range(games):
+        boards[game_id] = Chessboard("demo")
+        boards[game_id].init_board()
+        writer.new_game(game_id)
+    try:
+        while True:
+            for game_id, board in boards.items():
+                moves = movegen.legal_moves(board)
+                if not moves or len(board.move_stack) >= max_moves:
+                    board = boards[game_id] = Chessboard("demo")
+                    board.init_board()
+                    writer.new_game(game_id)
+                    continue
+                move = rng.choice(moves)
+                board.make_move(move >> 8, move & 0xFF)
+                writer.send_moves(game_id, [move])
+    except (OSError, KeyboardInterrupt):
+        pass
+    finally:
+        connection.close()
+
+
+def main(argv=None):
+    """
+    Runs the spectator dashboard.
+    """
+    parser = argparse.ArgumentParser(description="my_chess multi-board spectator")
+    parser.add_argument("--boards", type=int, default=9, help="boards to show (4-16)")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help="TCP port for move streams"
+    )
+    parser.add_argument(
+        "--stdin", action="store_true", help="also read a move stream from stdin"
+    )
+    parser.add_argument(
+        "--demo", action="store_true", help="watch random games from a local feeder"
+    )
+    args = parser.parse_args(argv)
+    count = max(MIN_BOARDS, min(args.boards, MAX_BOARDS))
+
+    fd = sys.stdin.fileno() if args.stdin else None
+    reader = MoveStreamReader((args.host, args.port), fd)
+    print(f"Watching move streams on {args.host}:{args.port}")
+    feeder = None
+    if args.demo:
+        feeder = multiprocessing.Process(
+            target=demo_feeder, args=(reader.address, count), daemon=True
+        )
+        feeder.start()
+
+    pygame.init()
+    # 观战窗口不播放音效，也不初始化混音器，只预读图片
+    ASSETS.preload(sounds=False)
+    screen = pygame.display.set_mode(WINDOW_SIZE)
+    pygame.display.set_caption("中国象棋 对局观战")
+    font = pygame.font.SysFont("arial", 16)
+
+    rects, cell = layout_tiles(count)
+    board_image = ASSETS.scaled(BOARD_FILE, (cell * 9, cell * 10))
+    piece_images = load_piece_images(cell)
+    start_codes = initial_codes()
+    tiles = [BoardTile(rect, cell, start_codes) for rect in rects]
+    tiles_by_game = {}
+
+    screen.fill((60, 60, 60))
+    pygame.display.update()
+    framerate = pygame.time.Clock()
+    try:
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+
+            # 一帧内到达的所有走法一次性应用，之后每个棋盘最多重绘一次
+            for game_id, move in reader.poll():
+                tile = tiles_by_game.get(game_id)
+                if tile is None:
+                    free = [t for t in tiles if t.game_id is None]
+                    if not free:
+                        continue  # 只观看前几局
+                    tile = tiles_by_game[game_id] = free[0]
+                    tile.reset(game_id)
+                if move == NEW_GAME:
+                    tile.reset(game_id)
+                else:
+                    tile.apply(move)
+
+            dirty_rects = [
+                tile.draw(screen, board_image, piece_images, font)
+                for tile in tiles
+                if tile.dirty
+            ]
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+            framerate.tick(FRAME_RATE)
+    finally:
+        reader.close()
+        if feeder is not None:
+            feeder.terminate()
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
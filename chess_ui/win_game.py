@@ -2,14 +2,36 @@
 This module handles the main game window and UI logic for the Chinese Chess game using Pygame.
 It manages the game loop, event handling (mouse clicks), rendering of the board and pieces,
 and the sidebar UI.
+
+Frames are drawn with dirty rectangles: the pieces live in a ``LayeredDirty``
+group that only redraws sprites that moved or changed, the sidebar is only
+redrawn when something shown on it changes (with rendered text cached in
+``TEXT_CACHE``), and only those regions are pushed to the display.
+
+Images and sounds come from ``ASSETS``, a process-wide cache that reads each
+file from disk once (optionally in a background thread at startup) and keeps
+converted and scaled surfaces, so restarting a game costs no disk I/O.
+
+In "play vs. engine" mode the engine plays Black. Its search runs in a
+``BackgroundSearch`` worker process, which the loop polls once per frame, so
+the window keeps drawing at a steady frame rate while the engine thinks.
+The engine plays on a sudden-death clock of ``ENGINE_CLOCK_MS``: Black's
+clock time left is handed to the search's time manager on every move.
+While Red thinks, the engine ponders the reply its principal variation
+expects; when Red plays it, the same search goes on under Black's clock and
+the engine usually answers at once.
 """
 
 # pylint: disable=no-member
 import sys
 import os
+import threading
 import pygame
 from pygame.locals import Rect
+from my_chess.chess_ai.background import BackgroundSearch
+from my_chess.chess_ai.time_manager import TimeControl
 from my_chess.chess_core import chessboard, chessman
+from my_chess.chess_core.tables import col_of, move_to_ucci, row_of
 
 main_dir = os.path.split(os.path.abspath(__file__))[0]
 BOARD_WIDTH = 720
@@ -23,22 +45,90 @@ BUTTON_HEIGHT = 45
 BUTTON_X = BOARD_WIDTH + (SIDEBAR_WIDTH - BUTTON_WIDTH) // 2
 BTN_RESTART_RECT = Rect(BUTTON_X, 700, BUTTON_WIDTH, BUTTON_HEIGHT)
 BTN_SAVE_RECT = Rect(BUTTON_X, 640, BUTTON_WIDTH, BUTTON_HEIGHT)
+BTN_ENGINE_RECT = Rect(BUTTON_X, 580, BUTTON_WIDTH, BUTTON_HEIGHT)
 
+# 引擎（黑方）的包干制用时，单位毫秒
+ENGINE_CLOCK_MS = 10 * 60 * 1000
 
-def load_image(file, name=None):
+
+class TextCache:
     """
-    Loads an image from the disk.
+    Caches rendered text surfaces, keyed by font, text and color.
+    """
+
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.surfaces = {}
+
+    def render(self, font, text, color):
+        """
+        Returns the rendered surface for ``text``, rendering it only once.
+        """
+        key = (id(font), text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if len(self.surfaces) >= self.max_size:
+                self.surfaces.clear()
+            surface = font.render(text, True, color)
+            self.surfaces[key] = surface
+        return surface
+
+
+TEXT_CACHE = TextCache()
+
+
+PIECE_FILES = {
+    "k": "king",
+    "a": "mandarin",
+    "b": "elephant",
+    "n": "knight",
+    "r": "rook",
+    "c": "cannon",
+    "p": "pawn",
+}
+TRANSPARENT_FILE = "transparent.gif"
+BOARD_FILE = "boardchess.gif"
+SOUND_FILES = ("move.mp3", "lowtime.mp3", "explosion.mp3", "berserk.mp3", "dong.mp3")
+
+
+def piece_file(fen_char):
+    """
+    Returns the image file name of the piece with the given FEN character.
+    """
+    color = "red" if fen_char.isupper() else "black"
+    return f"{color}_{PIECE_FILES[fen_char.lower()]}.gif"
+
+
+def decode_image(file, name=None):
+    """
+    Reads an image from the disk without converting it to the display format.
     """
     if name is None:
-        # loads an image, prepares it for play
         file = os.path.join(main_dir, "img", file)
     try:
-        surface = pygame.image.load(file)
+        return pygame.image.load(file)
     except pygame.error:
         # Fallback for systems without image support or missing files
         surface = pygame.Surface((80, 80))
         surface.fill((255, 0, 255))
-    return surface.convert()
+        return surface
+
+
+def load_image(file, name=None):
+    """
+    Loads an image from the disk.
+    """
+    # loads an image, prepares it for play
+    return decode_image(file, name).convert()
+
+
+class MockSound:
+    """
+    A mock sound class for when the mixer module is not initialized.
+    """
+
+    def play(self):
+        """Mock play method."""
 
 
 def load_sound(filename):
@@ -49,32 +139,110 @@ def load_sound(filename):
     try:
         sound = pygame.mixer.Sound(filename)
     except pygame.error:
-
-        class MockSound:
-            """
-            A mock sound class for when the mixer module is not initialized.
-            """
-
-            def play(self):
-                """Mock play method."""
-
         sound = MockSound()
     return sound
 
 
 def load_images(*files):
     """
-    Loads multiple images from the disk.
+    Loads multiple images through the asset cache.
+    """
+    return [ASSETS.image(file) for file in files]
+
+
+class AssetCache:
+    """
+    Process-wide registry of images and sounds. Each file is read from disk
+    once; converted surfaces, scaled variants and each piece's image pair
+    are kept for the life of the process and shared by every board.
     """
-    imgs = []
-    for file in files:
-        imgs.append(load_image(file))
-    return imgs
+
+    def __init__(self):
+        self.images = {}
+        self.scaled_images = {}
+        self.sounds = {}
+        # 后台线程解码好、还没转换成显示格式的图片
+        self.decoded = {}
+        self.lock = threading.Lock()
+        self.preload_thread = None
+
+    def image(self, file):
+        """
+        Returns the converted surface for an image file.
+        """
+        surface = self.images.get(file)
+        if surface is None:
+            with self.lock:
+                raw = self.decoded.pop(file, None)
+            if raw is None:
+                raw = decode_image(file)
+            # convert() 需要显示窗口，所以留到主线程第一次使用时再做
+            surface = self.images[file] = raw.convert()
+        return surface
+
+    def scaled(self, file, size):
+        """
+        Returns an image scaled to ``size``, scaling it only once.
+        """
+        key = (file, size)
+        surface = self.scaled_images.get(key)
+        if surface is None:
+            surface = pygame.transform.smoothscale(self.image(file), size)
+            self.scaled_images[key] = surface
+        return surface
+
+    def sound(self, file):
+        """
+        Returns the sound for a sound file.
+        """
+        sound = self.sounds.get(file)
+        if sound is None:
+            sound = load_sound(file)
+            with self.lock:
+                sound = self.sounds.setdefault(file, sound)
+        return sound
+
+    def piece_images(self, piece):
+        """
+        Returns the (piece image, transparent image) pair for a piece.
+        """
+        return [self.image(piece_file(piece.fen_char)), self.image(TRANSPARENT_FILE)]
+
+    def preload(self, sounds=True):
+        """
+        Starts reading every image and sound in a background thread.
+        Pass ``sounds=False`` when the mixer is not initialized, otherwise
+        every sound would be cached as a ``MockSound``.
+        """
+        if self.preload_thread is None:
+            self.preload_thread = threading.Thread(
+                target=self._preload,
+                args=(sounds,),
+                name="asset-preload",
+                daemon=True,
+            )
+            self.preload_thread.start()
+
+    def _preload(self, sounds):
+        files = [BOARD_FILE, TRANSPARENT_FILE]
+        files.extend(piece_file(char) for char in "KABNRCPkabnrcp")
+        for file in files:
+            if file not in self.images:
+                raw = decode_image(file)
+                with self.lock:
+                    self.decoded.setdefault(file, raw)
+        if sounds:
+            for file in SOUND_FILES:
+                self.sound(file)
 
 
-class ChessmanSprite(pygame.sprite.Sprite):
+ASSETS = AssetCache()
+
+
+class ChessmanSprite(pygame.sprite.DirtySprite):
     """
     Represents a chess piece sprite for Pygame.
+    It marks itself dirty whenever its image or position changes.
     """
 
     is_selected = False
@@ -82,12 +250,12 @@ class ChessmanSprite(pygame.sprite.Sprite):
     is_transparent = False
 
     def __init__(self, images, kill_sound, piece):
-        pygame.sprite.Sprite.__init__(self)
+        pygame.sprite.DirtySprite.__init__(self)
         self.chessman = piece
         self.images = images
         self.image = self.images[0]
         self.rect = Rect(piece.col_num * 80, (9 - piece.row_num) * 80, 80, 80)
-        self.move_sound = load_sound("move.mp3")
+        self.move_sound = ASSETS.sound("move.mp3")
         self.kill_sound = kill_sound
 
     def move(self, col_num, row_num):
@@ -102,10 +270,11 @@ class ChessmanSprite(pygame.sprite.Sprite):
                 (col_num - old_col_num) * 80, (old_row_num - row_num) * 80
             )
             self.rect = self.rect.clamp(SCREENRECT)
+            self.dirty = 1
             self.chessman.chessboard.clear_chessmans_moving_list()
             self.chessman.chessboard.calc_chessmans_moving_list()
             return True
-        load_sound("lowtime.mp3").play()
+        ASSETS.sound("lowtime.mp3").play()
         return False
 
     def update(self):
@@ -118,8 +287,10 @@ class ChessmanSprite(pygame.sprite.Sprite):
             else:
                 self.image = self.images[0]
             self.is_transparent = not self.is_transparent
-        else:
+            self.dirty = 1
+        elif self.image is not self.images[0]:
             self.image = self.images[0]
+            self.dirty = 1
 
 
 def creat_sprite_group(sprite_group, chessmans_hash):
@@ -127,40 +298,11 @@ def creat_sprite_group(sprite_group, chessmans_hash):
     Creates sprite groups for all pieces on the board.
     """
     for piece in chessmans_hash.values():
-        if piece.is_red:
-            if isinstance(piece, chessman.Rook):
-                images = load_images("red_rook.gif", "transparent.gif")
-            elif isinstance(piece, chessman.Cannon):
-                images = load_images("red_cannon.gif", "transparent.gif")
-            elif isinstance(piece, chessman.Knight):
-                images = load_images("red_knight.gif", "transparent.gif")
-            elif isinstance(piece, chessman.King):
-                images = load_images("red_king.gif", "transparent.gif")
-            elif isinstance(piece, chessman.Elephant):
-                images = load_images("red_elephant.gif", "transparent.gif")
-            elif isinstance(piece, chessman.Mandarin):
-                images = load_images("red_mandarin.gif", "transparent.gif")
-            else:
-                images = load_images("red_pawn.gif", "transparent.gif")
-        else:
-            if isinstance(piece, chessman.Rook):
-                images = load_images("black_rook.gif", "transparent.gif")
-            elif isinstance(piece, chessman.Cannon):
-                images = load_images("black_cannon.gif", "transparent.gif")
-            elif isinstance(piece, chessman.Knight):
-                images = load_images("black_knight.gif", "transparent.gif")
-            elif isinstance(piece, chessman.King):
-                images = load_images("black_king.gif", "transparent.gif")
-            elif isinstance(piece, chessman.Elephant):
-                images = load_images("black_elephant.gif", "transparent.gif")
-            elif isinstance(piece, chessman.Mandarin):
-                images = load_images("black_mandarin.gif", "transparent.gif")
-            else:
-                images = load_images("black_pawn.gif", "transparent.gif")
+        images = ASSETS.piece_images(piece)
         if isinstance(piece, chessman.Cannon):
-            kill_sound = load_sound("explosion.mp3")
+            kill_sound = ASSETS.sound("explosion.mp3")
         else:
-            kill_sound = load_sound("berserk.mp3")
+            kill_sound = ASSETS.sound("berserk.mp3")
         chessman_sprite = ChessmanSprite(images, kill_sound, piece)
         sprite_group.add(chessman_sprite)
 
@@ -174,6 +316,24 @@ def select_sprite_from_group(sprite_group, col_num, row_num):
             return sprite
 
 
+def apply_engine_move(sprite_group, move):
+    """
+    Plays a packed engine move on the board through its sprites.
+    """
+    from_sq, to_sq = move >> 8, move & 0xFF
+    mover = select_sprite_from_group(sprite_group, col_of(from_sq), row_of(from_sq))
+    target = select_sprite_from_group(sprite_group, col_of(to_sq), row_of(to_sq))
+    if mover is None or not mover.move(col_of(to_sq), row_of(to_sq)):
+        return False
+    if target is not None:
+        mover.kill_sound.play()
+        sprite_group.remove(target)
+        target.kill()
+    else:
+        mover.move_sound.play()
+    return True
+
+
 def translate_hit_area(cursor):
     """
     Translates screen coordinates to board coordinates (col, row).
@@ -199,7 +359,7 @@ def draw_button(screen, rect, text, font):
     pygame.draw.rect(screen, (100, 100, 100), rect, 2)  # Border
 
     # Text
-    text_surf = font.render(text, True, (0, 0, 0))
+    text_surf = TEXT_CACHE.render(font, text, (0, 0, 0))
     text_rect = text_surf.get_rect(center=rect.center)
     screen.blit(text_surf, text_rect)
 
@@ -213,11 +373,53 @@ def get_sidebar_rect():
     return sidebar_rect
 
 
+def format_time(ms):
+    """
+    Formats a clock time in milliseconds as MM:SS.
+    """
+    seconds = int(ms / 1000)
+    minutes = seconds // 60
+    seconds = seconds % 60
+    return f"{minutes:02}:{seconds:02}"
+
+
+def sidebar_state(board, red_time, black_time, game_over_text="", engine=None):
+    """
+    Returns everything the sidebar shows; it only needs redrawing when this changes.
+    """
+    engine_state = None
+    if engine is not None:
+        engine_state = (
+            engine.thinking,
+            engine.pondering,
+            engine.depth,
+            engine.score,
+            tuple(engine.pv[:5]),
+        )
+    return (
+        game_over_text,
+        board.is_red_turn,
+        int(red_time / 1000),
+        int(black_time / 1000),
+        len(board.moves_history),
+        engine_state,
+    )
+
+
 def draw_sidebar(
-    screen, board, font, small_font, red_time, black_time, game_over_text=""
+    screen,
+    board,
+    font,
+    small_font,
+    red_time,
+    black_time,
+    game_over_text="",
+    engine=None,
 ):
     """
     Draws the sidebar, including the undo button and move history.
+    When playing against ``engine``, also shows its search depth, score and
+    principal variation.
     """
     sidebar_rect = get_sidebar_rect()
     SIDEBAR_COLOR = (240, 230, 210)
@@ -239,15 +441,9 @@ def draw_sidebar(
         text = "黑方走棋"
         color = (0, 0, 0)
 
-    def format_time(ms):
-        seconds = int(ms / 1000)
-        minutes = seconds // 60
-        seconds = seconds % 60
-        return f"{minutes:02}:{seconds:02}"
-
     try:
         # Render turn text
-        text_surface = font.render(text, True, color)
+        text_surface = TEXT_CACHE.render(font, text, color)
         text_rect = text_surface.get_rect(center=(BOARD_WIDTH + SIDEBAR_WIDTH // 2, 50))
         screen.blit(text_surface, text_rect)
 
@@ -255,31 +451,55 @@ def draw_sidebar(
         red_time_str = f"红: {format_time(red_time)}"
         black_time_str = f"黑: {format_time(black_time)}"
 
-        red_time_surf = font.render(
-            red_time_str, True, (200, 0, 0)
+        red_time_surf = TEXT_CACHE.render(
+            font, red_time_str, (200, 0, 0)
         )  # Larger font for time
-        black_time_surf = font.render(black_time_str, True, (0, 0, 0))
+        black_time_surf = TEXT_CACHE.render(font, black_time_str, (0, 0, 0))
 
         screen.blit(red_time_surf, (BOARD_WIDTH + 20, 80))
         screen.blit(black_time_surf, (BOARD_WIDTH + 20, 130))
 
+        history_y = 180
+        max_moves = 15
+        if engine is not None:
+            # 引擎搜索信息：深度、分数（黑方视角）和主要变例
+            if engine.pondering:
+                status = "后台思考"
+            else:
+                status = "思考中" if engine.thinking else "引擎"
+            info_text = f"{status} 深度 {engine.depth} 分数 {engine.score}"
+            info_surf = TEXT_CACHE.render(small_font, info_text, (0, 0, 150))
+            screen.blit(info_surf, (BOARD_WIDTH + 20, 180))
+            pv_text = " ".join(move_to_ucci(move) for move in engine.pv[:5])
+            pv_surf = TEXT_CACHE.render(small_font, pv_text, (0, 0, 150))
+            screen.blit(pv_surf, (BOARD_WIDTH + 20, 205))
+            history_y = 240
+            max_moves = 12
+
         # Render Move History Header
-        history_title = small_font.render("招法记录:", True, (0, 0, 0))
-        screen.blit(history_title, (BOARD_WIDTH + 20, 180))
+        history_title = TEXT_CACHE.render(small_font, "招法记录:", (0, 0, 0))
+        screen.blit(history_title, (BOARD_WIDTH + 20, history_y))
 
-        start_y = 210
-        # Show last 15 moves to save space
-        recent_moves = board.moves_history[-15:]
+        start_y = history_y + 30
+        # Show the last moves that fit to save space
+        recent_moves = board.moves_history[-max_moves:]
         for i, move in enumerate(recent_moves):
             move_idx = len(board.moves_history) - len(recent_moves) + i + 1
             pl_color = (150, 0, 0) if (move_idx % 2 == 1) else (0, 0, 0)
-            move_text = small_font.render(f"{move_idx}. {move}", True, pl_color)
+            move_text = TEXT_CACHE.render(small_font, f"{move_idx}. {move}", pl_color)
             screen.blit(move_text, (BOARD_WIDTH + 20, start_y + i * 24))
 
     except Exception as e:
         print(f"Sidebar drawing error: {e}")
 
     # Draw Buttons
+    if engine is None:
+        engine_label = "人机对弈"
+    elif engine.thinking and not engine.pondering:
+        engine_label = "停 止"
+    else:
+        engine_label = "双人对弈"
+    draw_button(screen, BTN_ENGINE_RECT, engine_label, small_font)
     draw_button(screen, BTN_SAVE_RECT, "保存FEN", small_font)
     draw_button(screen, BTN_RESTART_RECT, "重 开", small_font)
 
@@ -290,14 +510,15 @@ def main(winstyle=0):
     """
     pygame.mixer.init()
     pygame.init()
+    ASSETS.preload()
     bestdepth = pygame.display.mode_ok(SCREENRECT.size, winstyle, 32)
     screen = pygame.display.set_mode(SCREENRECT.size, winstyle, bestdepth)
     pygame.display.set_caption("中国象棋 AI (MyChess Modernized)")
 
     # Load resources
     try:
-        bgdtile = load_image("boardchess.gif")
-        load_sound("dong.mp3").play()
+        bgdtile = ASSETS.image(BOARD_FILE)
+        ASSETS.sound("dong.mp3").play()
     except pygame.error:
         bgdtile = pygame.Surface((80, 80))
         bgdtile.fill((200, 200, 150))
@@ -316,7 +537,7 @@ def main(winstyle=0):
     cbd.init_board()
 
     # Sprites
-    chessmans = pygame.sprite.Group()
+    chessmans = pygame.sprite.LayeredDirty()
     creat_sprite_group(chessmans, cbd.chessmans_hash)
     current_chessman = None
     cbd.calc_chessmans_moving_list()
@@ -332,9 +553,17 @@ def main(winstyle=0):
     background = pygame.Surface(SCREENRECT.size)
     for x in range(0, BOARD_WIDTH, bgdtile.get_width()):
         background.blit(bgdtile, (x, 0))
+    screen.blit(background, (0, 0))
+    chessmans.clear(screen, background)
+    full_update = True
+    last_sidebar = None
 
     game_over_text = ""
 
+    # Engine opponent (plays Black), searching in a worker process
+    engine = BackgroundSearch()
+    vs_engine = False
+
     while True:  # Main Loop
         # Check Winner
         winner = cbd.get_winner()
@@ -343,6 +572,8 @@ def main(winstyle=0):
                 game_over_text = "红方胜!"
             elif winner == "Black":
                 game_over_text = "黑方胜!"
+            elif winner == "Draw":
+                game_over_text = "和棋!"
         else:
             game_over_text = ""
 
@@ -357,8 +588,27 @@ def main(winstyle=0):
             else:
                 black_time += dt
 
+        # Engine: pick up its move, or start thinking on its turn
+        if vs_engine:
+            if engine.pondering and game_over_text:
+                engine.cancel()
+            elif engine.pondering and not cbd.is_red_turn:
+                # 红方走完后核对：猜中预期应着就接着算，否则取消后重新搜索
+                engine.check_ponder(cbd)
+            best_move = engine.poll()
+            if best_move:
+                pv = engine.pv
+                if apply_engine_move(chessmans, best_move) and pv[:1] == [best_move]:
+                    # 在红方的时间里按主要变例预计的应着思考
+                    if len(pv) > 1:
+                        control = TimeControl(max(0, ENGINE_CLOCK_MS - black_time))
+                        engine.ponder(cbd, pv[1], control)
+            elif not game_over_text and not cbd.is_red_turn and not engine.thinking:
+                engine.start(cbd, TimeControl(max(0, ENGINE_CLOCK_MS - black_time)))
+
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                engine.close()
                 sys.exit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Left click
@@ -370,7 +620,16 @@ def main(winstyle=0):
                         print(f"FEN Saved: {fen}")
                         continue
 
+                    if BTN_ENGINE_RECT.collidepoint(mouse_x, mouse_y):
+                        if engine.thinking and not engine.pondering:
+                            engine.stop()
+                        else:
+                            vs_engine = not vs_engine
+                            engine.cancel()
+                        continue
+
                     if BTN_RESTART_RECT.collidepoint(mouse_x, mouse_y):
+                        engine.cancel()
                         cbd = chessboard.Chessboard("000")
                         cbd.init_board()
                         chessmans.empty()
@@ -386,6 +645,9 @@ def main(winstyle=0):
                     # Board Interaction (Only if Game Not Over)
                     if game_over_text:
                         continue
+                    # 人机对弈时黑方由引擎走棋
+                    if vs_engine and not cbd.is_red_turn:
+                        continue
 
                     col_num, row_num = translate_hit_area((mouse_x, mouse_y))
                     if col_num < 0:
@@ -421,17 +683,31 @@ def main(winstyle=0):
 
         framerate.tick(20)
 
-        # Draw everything
-        screen.blit(background, (0, 0))  # Redraw background
+        # Draw only what changed: moved/blinking pieces and the sidebar
         chessmans.update()
-        chessmans.draw(screen)
-
-        # Draw Sidebar
-        draw_sidebar(
-            screen, cbd, font, small_font, red_time, black_time, game_over_text
-        )
+        dirty_rects = chessmans.draw(screen)
+
+        shown_engine = engine if vs_engine else None
+        state = sidebar_state(cbd, red_time, black_time, game_over_text, shown_engine)
+        if state != last_sidebar:
+            last_sidebar = state
+            draw_sidebar(
+                screen,
+                cbd,
+                font,
+                small_font,
+                red_time,
+                black_time,
+                game_over_text,
+                shown_engine,
+            )
+            dirty_rects.append(get_sidebar_rect())
 
-        pygame.display.update()
+        if full_update:
+            full_update = False
+            pygame.display.update()
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
 
 
 if __name__ == "__main__":
@@ -13,15 +13,41 @@ def setup_path():
     # can be resolved as a package.
     parent_dir = root_dir.parent
     if str(parent_dir) not in sys.path:
-        print(f"Adding {parent_dir} to sys.path")
+        # stderr: in the ucci and analyze modes stdout carries only protocol/JSON lines
+        print(f"Adding {parent_dir} to sys.path", file=sys.stderr)
         sys.path.insert(0, str(parent_dir))
 
 
 def main():
     setup_path()
 
-    # Check arguments to decide which mode to run (GUI or CLI)
-    if len(sys.argv) > 1 and sys.argv[1] == "cli":
+    # Check arguments to decide which mode to run (GUI, CLI, spectator, server, batch analysis, benchmarks, startup profile or UCCI)
+    # Only the GUI and spectator modes import pygame; the rest stay headless
+    if len(sys.argv) > 1 and sys.argv[1] == "--startup-profile":
+        from my_chess.chess_ai import startup
+
+        startup.main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "bench":
+        from my_chess.chess_ai import benchmark
+
+        benchmark.main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "watch":
+        from my_chess.chess_ui import watch
+
+        watch.main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from my_chess.chess_server import server
+
+        server.main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "analyze":
+        from my_chess.chess_ai import analyze
+
+        analyze.main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == "ucci":
+        from my_chess.chess_ai import ucci
+
+        ucci.main()
+    elif len(sys.argv) > 1 and sys.argv[1] == "cli":
         try:
             from my_chess.chess_ui import cli_game
 
@@ -0,0 +1,88 @@
+"""批量分析命令测试。"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+import my_chess
+from my_chess.chess_ai.analyze import analyze_lines, main, parse_position
+
+START_FEN = "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1"
+
+
+class TestAnalyze(unittest.TestCase):
+    def test_input_forms(self):
+        """FEN、UCCI position 语法和纯走法列表得到同一局面。"""
+        expected = parse_position(START_FEN + " moves h2e2").to_fen()
+        for text in (
+            "h2e2",
+            "startpos moves h2e2",
+            "position startpos moves h2e2",
+            f"fen {START_FEN} moves h2e2",
+        ):
+            self.assertEqual(parse_position(text).to_fen(), expected, text)
+        self.assertEqual(parse_position("startpos").to_fen(), START_FEN)
+        for text in ("h2e2 h2e2", "h2e2 xx", "rnbakabnr/9 w"):
+            with self.assertRaises(ValueError):
+                parse_position(text)
+
+    def test_results_in_order(self):
+        lines = list(enumerate(["startpos", "h2e2 h9g7", "h2e2 h2e2", "b2b9"], 1))
+        results = list(analyze_lines(lines, depth=1, workers=1, chunk_size=3))
+        self.assertEqual([r["line"] for r in results], [1, 2, 3, 4])
+        self.assertEqual(len(results[0]["legal"]), 44)
+        self.assertIn(results[0]["best"], results[0]["legal"])
+        self.assertEqual(results[1]["turn"], "red")
+        self.assertIn("illegal", results[2]["error"])
+        self.assertIn("score", results[3])
+
+    def test_main_parallel(self):
+        """多进程分块处理，输出 JSON 行且保持输入顺序。"""
+        text = "# audit\n\n" + "".join(f"{m}\n" for m in ["h2e2", "b2e2", "h0g2"] * 3)
+        stdout = io.StringIO()
+        main(
+            ["--depth", "1", "--workers", "2", "--chunk", "2"],
+            io.StringIO(text),
+            stdout,
+        )
+        results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([r["line"] for r in results], list(range(3, 12)))
+        self.assertEqual([r["input"] for r in results], ["h2e2", "b2e2", "h0g2"] * 3)
+        self.assertTrue(all(r["best"] in r["legal"] for r in results))
+
+    def test_run_py_outputs_only_json(self):
+        """经 run.py 启动时，标准输出每一行都是 JSON，非法 FEN 也报为错误记录。"""
+        lines = [
+            "h2e2",
+            "P8/9/9/9/9/9/9/9/9/4K1k2 w",
+            "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNRR w",
+            "b2e2",
+        ]
+        package_dir = os.path.dirname(os.path.abspath(my_chess.__file__))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [os.path.dirname(package_dir), env.get("PYTHONPATH")])
+        )
+        output = subprocess.run(
+            [sys.executable, os.path.join(package_dir, "run.py"), "analyze"]
+            + ["--depth", "0", "--workers", "1"],
+            input="".join(line + "\n" for line in lines),
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        ).stdout
+        results = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([r["line"] for r in results], [1, 2, 3, 4])
+        self.assertEqual([r["input"] for r in results], lines)
+        self.assertIn("invalid FEN", results[1]["error"])
+        self.assertIn("invalid FEN", results[2]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
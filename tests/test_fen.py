@@ -95,6 +95,18 @@ class TestFEN(unittest.TestCase):
 
         self.assertIsNone(board.get_chessman(0, 0))
 
+    def test_from_fen_invalid(self):
+        """Malformed FENs are rejected instead of dropping pieces."""
+        for fen in (
+            "P8/9/9/9/9/9/9/9/9/4K1k2 w",  # black king outside the palace
+            "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNRR w",
+            "rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABN w",
+            "3k5/9/9/9/9/9/9/9/9/9 w",  # no red king
+            "4k4/9/9/9/9/9/9/9/4P4/4K4 w",  # red pawn behind its start rank
+        ):
+            with self.assertRaises(ValueError, msg=fen):
+                Chessboard.from_fen(fen)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,74 @@
+"""走法流编码与读取测试。"""
+
+import os
+import socket
+import sys
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from my_chess.chess_core.move_stream import (
+    NEW_GAME,
+    MoveStreamDecoder,
+    MoveStreamReader,
+    MoveStreamWriter,
+    encode_frame,
+)
+from my_chess.chess_core.tables import move_from_ucci
+
+
+def poll_until(reader, count, timeout=5.0):
+    frames = []
+    deadline = time.monotonic() + timeout
+    while len(frames) < count and time.monotonic() < deadline:
+        frames.extend(reader.poll(0.05))
+    return frames
+
+
+class TestMoveStream(unittest.TestCase):
+    def test_decoder_keeps_partial_frames(self):
+        """半个帧留到下次读取时拼接。"""
+        data = encode_frame(3, NEW_GAME) + encode_frame(3, move_from_ucci("h2e2"))
+        decoder = MoveStreamDecoder()
+        self.assertEqual(decoder.feed(data[:6]), [(3, NEW_GAME)])
+        self.assertEqual(decoder.feed(data[6:]), [(3, move_from_ucci("h2e2"))])
+
+    def test_pipe(self):
+        read_fd, write_fd = os.pipe()
+        reader = MoveStreamReader(fd=read_fd)
+        try:
+            writer = MoveStreamWriter(write_fd)
+            writer.new_game(1)
+            writer.send_moves(1, [move_from_ucci("h2e2"), move_from_ucci("h9g7")])
+            frames = poll_until(reader, 3)
+            self.assertEqual(
+                frames,
+                [
+                    (1, NEW_GAME),
+                    (1, move_from_ucci("h2e2")),
+                    (1, move_from_ucci("h9g7")),
+                ],
+            )
+        finally:
+            reader.close()
+            os.close(read_fd)
+            os.close(write_fd)
+
+    def test_socket_writers(self):
+        """多个写入端可同时连接，各自的帧不会互相打断。"""
+        reader = MoveStreamReader(("127.0.0.1", 0))
+        connections = [socket.create_connection(reader.address) for _ in range(2)]
+        try:
+            for game_id, connection in enumerate(connections):
+                MoveStreamWriter(connection).send_moves(game_id, [game_id + 1] * 50)
+            frames = poll_until(reader, 100)
+            self.assertEqual(sorted(frames), [(0, 1)] * 50 + [(1, 2)] * 50)
+        finally:
+            for connection in connections:
+                connection.close()
+            reader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,7 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
-from my_chess.chess_core.chessboard import Chessboard
+from my_chess.chess_core.chessboard import STATE_VERSION, Chessboard
 
 
 class TestRookMoves(unittest.TestCase):
@@ -213,6 +213,65 @@ class TestPawnMoves(unittest.TestCase):
         self.assertNotIn((4, 4), moves, "兵不能后退")
 
 
+class TestMovingListBuffer(unittest.TestCase):
+    """棋子可走列表以整数走法保存。"""
+
+    def test_moves_are_packed_integers(self):
+        """重复计算不会累积，in_moving_list 与走法列表一致。"""
+        board = Chessboard.from_fen("4k4/9/9/9/9/9/p8/9/9/R3K4 w - - 0 1")
+        rook = board.get_chessman(0, 0)
+        rook.calc_moving_list()
+        rook.calc_moving_list()
+        expected = {(0, 1), (0, 2), (0, 3), (1, 0), (2, 0), (3, 0)}
+        self.assertEqual(sorted((p.x, p.y) for p in rook.moving_list), sorted(expected))
+        self.assertEqual(
+            sorted(m & 0xFF for m in rook.moves),
+            sorted(c + r * 9 for c, r in expected),
+        )
+        self.assertTrue(all(m >> 8 == 0 for m in rook.moves))
+        for col in range(-1, 10):
+            for row in range(-1, 11):
+                self.assertEqual(rook.in_moving_list(col, row), (col, row) in expected)
+        rook.clear_moving_list()
+        self.assertEqual(rook.moving_list, [])
+        self.assertFalse(rook.in_moving_list(0, 1))
+
+
+class TestPieceSlots(unittest.TestCase):
+    """棋子使用 __slots__，类型编码与落子范围是类常量。"""
+
+    def test_codes_and_bounds(self):
+        board = Chessboard("test")
+        board.init_board()
+        for piece in board.chessmans_hash.values():
+            self.assertFalse(hasattr(piece, "__dict__"))
+            self.assertEqual(board.codes[piece.col_num + 9 * piece.row_num], piece.code)
+            self.assertIs(piece.chessboard, board)
+        mandarin = board.get_chessman(3, 9)
+        self.assertEqual((mandarin.code, mandarin.fen_char), (8, "a"))
+        self.assertTrue(mandarin.border_check(4, 8))
+        self.assertFalse(mandarin.border_check(4, 6))
+        self.assertFalse(board.get_chessman(0, 3).border_check(0, 2), "兵不能后退")
+
+    def test_board_freed_without_gc(self):
+        """棋子只弱引用棋盘，没有循环引用，棋盘丢弃即释放。"""
+        import gc
+        import weakref
+
+        board = Chessboard("test")
+        board.init_board()
+        board.get_chessman(0, 0).calc_moving_list()
+        ref = weakref.ref(board)
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            del board
+            self.assertIsNone(ref())
+        finally:
+            if enabled:
+                gc.enable()
+
+
 class TestStalemate(unittest.TestCase):
     """困毙规则测试。"""
 
@@ -224,6 +283,32 @@ class TestStalemate(unittest.TestCase):
         winner = board.get_winner()
         self.assertIsNone(winner, "标准开局不应该有赢家")
 
+    def test_checkmate_detected(self):
+        """被将死（所有走法都送将）按无合法走法判负。"""
+        board = Chessboard.from_fen("R2k5/R8/9/9/9/9/9/9/9/4K4 b - - 0 1")
+        self.assertEqual(board.legal_moves(), [])
+        self.assertTrue(board._is_stalemated())
+        # FEN 局面的将帅名字带编号，胜负判断不能依赖名字
+        self.assertEqual(board.get_winner(), "Red")
+
+    def test_winner_check_keeps_moving_lists(self):
+        """反复检查胜负不改写棋子的可走列表，走棋后缓存失效。"""
+        board = Chessboard("test")
+        board.init_board()
+        board.calc_chessmans_moving_list()
+        sizes = {name: len(p.moving_list) for name, p in board.chessmans_hash.items()}
+        for _ in range(3):
+            self.assertIsNone(board.get_winner())
+        self.assertEqual(
+            {name: len(p.moving_list) for name, p in board.chessmans_hash.items()},
+            sizes,
+        )
+        self.assertEqual(len(board.legal_moves()), 44)
+        # 炮二平五后黑炮在 h 线上多出一步
+        board.make_move(7 + 2 * 9, 4 + 2 * 9)
+        self.assertEqual(len(board.legal_moves()), 45)
+        self.assertFalse(board.is_red_turn)
+
     def test_king_captured_wins(self):
         """将/帅被吃则对方获胜。"""
         # 使用标准开局，然后移除黑将
@@ -232,20 +317,224 @@ class TestStalemate(unittest.TestCase):
         # 模拟黑将被吃掉：从哈希表和棋盘中移除
         black_king = board.get_chessman_by_name("black_king")
         self.assertIsNotNone(black_king)
-        board.chessmans[4][9] = None
-        board.chessmans_hash.pop("black_king")
+        board.remove_chessman_target(4, 9)
+        board.remove_chessman_source(4, 9)
         winner = board.get_winner()
         self.assertEqual(winner, "Red", "黑将不在棋盘上，红方应该获胜")
 
     def test_repetition_penalty(self):
-        """三次重复局面，造成重复的一方判负。"""
+        """三次重复局面，长将的一方判负。"""
+        # 红车在 (0,8)/(0,9) 之间来回将军，黑将在 (3,9)/(3,8) 之间躲避
+        board = Chessboard.from_fen("3k5/R8/9/9/9/9/9/9/9/5K3 w - - 0 1")
+        cycle = [((0, 8), (0, 9)), ((3, 9), (3, 8)), ((0, 9), (0, 8)), ((3, 8), (3, 9))]
+        play_moves(board, cycle * 2)
+        self.assertEqual(board.hash_history[board.current_hash], 3)
+        self.assertEqual(board.get_winner(), "Black", "红方长将，应判黑方胜")
+
+
+def play_moves(board, moves):
+    """按 ((起点列, 起点行), (终点列, 终点行)) 依次走棋。"""
+    for (from_col, from_row), (to_col, to_row) in moves:
+        piece = board.get_chessman(from_col, from_row)
+        piece.calc_moving_list()
+        assert piece.move(to_col, to_row), f"illegal move {from_col}{from_row}"
+
+
+class TestRepetitionAdjudication(unittest.TestCase):
+    """长将/长捉裁决测试。"""
+
+    def test_idle_repetition_is_draw(self):
+        """双方都是闲着，重复局面判和。"""
+        board = Chessboard.from_fen("3k5/9/9/9/9/9/9/9/9/5K3 w - - 0 1")
+        cycle = [((5, 0), (5, 1)), ((3, 9), (3, 8)), ((5, 1), (5, 0)), ((3, 8), (3, 9))]
+        play_moves(board, cycle * 2)
+        self.assertEqual(board.get_winner(), "Draw")
+
+    def test_perpetual_chase_loses(self):
+        """红车长捉无根黑炮，红方判负。"""
+        board = Chessboard.from_fen("4k4/9/9/R8/8c/9/9/9/9/3K5 w - - 0 1")
+        cycle = [((0, 6), (0, 5)), ((8, 5), (8, 6)), ((0, 5), (0, 6)), ((8, 6), (8, 5))]
+        play_moves(board, cycle * 2)
+        self.assertEqual(board.get_winner(), "Black", "红方长捉，应判黑方胜")
+
+    def test_classify_move(self):
+        """着法分类：将军、捉子、闲着。"""
+        from my_chess.chess_core import repetition
+        from my_chess.chess_core.tables import square
+
+        board = Chessboard.from_fen("4k4/9/9/R8/8c/9/9/9/9/3K5 w - - 0 1")
+        kind, chased = repetition.classify_move(board, square(0, 6), square(0, 5))
+        self.assertEqual(kind, repetition.CHASE)
+        self.assertEqual(chased, {square(8, 5)})
+        board.unmake_move()
+
+        kind, _ = repetition.classify_move(board, square(0, 6), square(0, 9))
+        self.assertEqual(kind, repetition.CHECK)
+        board.unmake_move()
+
+        kind, _ = repetition.classify_move(board, square(3, 0), square(3, 1))
+        self.assertEqual(kind, repetition.IDLE)
+
+
+class TestPieceLists(unittest.TestCase):
+    """按颜色和兵种分组的棋子格子集合。"""
+
+    def test_piece_lists_follow_moves(self):
+        """走棋、吃子和悔棋后，棋子集合与棋盘编码一致。"""
+        board = Chessboard.from_fen("3k5/9/9/9/9/4r4/9/9/4R4/4K4 w - - 0 1")
+        self.assertEqual(board.king_square(True), 4)
+        self.assertEqual(board.king_square(False), 3 + 9 * 9)
+        board.make_move(4 + 9, 4 + 4 * 9)  # 红车吃黑车
+        self.assertEqual(board.piece_squares(4 + 7), set())
+        self.assertEqual(board.piece_squares(4), {4 + 4 * 9})
+        board.unmake_move()
+        for code in range(14):
+            expected = {sq for sq, c in enumerate(board.codes) if c == code}
+            self.assertEqual(board.piece_squares(code), expected)
+        self.assertEqual(
+            sorted(p.name for p in board.pieces_of(True)), ["red_king_1", "red_rook_1"]
+        )
+
+
+class TestAttackMaps(unittest.TestCase):
+    """攻击表与 make/unmake 测试。"""
+
+    def test_is_in_check(self):
+        """车将军、炮隔子将军、将帅对脸都应判为被将军。"""
+        board = Chessboard.from_fen("4k4/9/9/9/9/9/9/9/9/R3K4 b - - 0 1")
+        self.assertTrue(board.is_in_check(), "将帅对脸")
+        board = Chessboard.from_fen("3k5/9/9/9/9/9/9/9/9/R2C1K3 b - - 0 1")
+        self.assertFalse(board.is_in_check())
+        board = Chessboard.from_fen("3k5/9/9/3p5/9/9/9/9/9/3C1K3 b - - 0 1")
+        self.assertTrue(board.is_in_check(), "炮隔卒将军")
+
+    def test_attackers_of(self):
+        """标准开局中红方中兵的保护者。"""
         board = Chessboard("test")
         board.init_board()
-        # 模拟：当前轮到红方走棋 (_is_red_turn=True)
-        # 说明黑方刚走完造成了第3次重复，黑方判负，红方胜
-        board.hash_history[board.current_hash] = 3
-        winner = board.get_winner()
-        self.assertEqual(winner, "Red", "黑方造成重复，应判红方胜")
+        defenders = board.attackers_of(4, 3, True)
+        self.assertEqual(defenders, [], "中兵无根")
+        attackers = {p.fen_char for p in board.attackers_of(4, 1, True)}
+        self.assertEqual(attackers, {"K", "A"})
+        self.assertTrue(board.is_attacked(4, 8, False))
+
+    def test_unmake_restores_attack_maps(self):
+        """走棋再悔棋后攻击表、哈希完全恢复。"""
+        from my_chess.chess_core.tables import square
+
+        board = Chessboard("test")
+        board.init_board()
+        counts = [board.attack_count(sq, True) for sq in range(90)]
+        old_hash = board.current_hash
+        board.make_move(square(7, 2), square(7, 9))  # 炮二进七吃马
+        self.assertEqual(board.attack_count(square(7, 9), False), 1, "黑车保护")
+        board.unmake_move()
+        self.assertEqual([board.attack_count(sq, True) for sq in range(90)], counts)
+        self.assertEqual(board.current_hash, old_hash)
+        self.assertIsNotNone(board.get_chessman(7, 9))
+
+
+class TestCloneAndPickle(unittest.TestCase):
+    """棋盘复制与紧凑序列化测试。"""
+
+    def setUp(self):
+        from my_chess.chess_core.tables import move_from_ucci
+
+        self.board = Chessboard("test")
+        self.board.init_board()
+        for ucci in ("h2e2", "h9g7", "e2e6", "g6g5"):  # 炮五进四吃中卒
+            move = move_from_ucci(ucci)
+            piece = self.board.get_chessman((move >> 8) % 9, (move >> 8) // 9)
+            self.board.move_chessman(piece, (move & 0xFF) % 9, (move & 0xFF) // 9)
+
+    def assert_same_game(self, copied):
+        board = self.board
+        self.assertEqual(copied.to_fen(), board.to_fen())
+        self.assertEqual(copied.codes, board.codes)
+        self.assertEqual(copied.current_hash, board.current_hash)
+        self.assertEqual(copied.mirror_hash, board.mirror_hash)
+        self.assertEqual(copied.hash_stack, board.hash_stack)
+        self.assertEqual(copied.move_stack, board.move_stack)
+        self.assertEqual(copied.moves_history, board.moves_history)
+        self.assertEqual(sorted(copied.legal_moves()), sorted(board.legal_moves()))
+        for sq in range(90):
+            for is_red in (True, False):
+                self.assertEqual(
+                    copied.attack_count(sq, is_red), board.attack_count(sq, is_red)
+                )
+        for name, piece in copied.chessmans_hash.items():
+            self.assertIs(piece.chessboard, copied)
+            self.assertIsNot(piece, board.chessmans_hash[name])
+            self.assertIs(copied.get_chessman(piece.col_num, piece.row_num), piece)
+
+    def test_clone_and_pickle_are_independent(self):
+        """复制品走棋、悔棋不影响原棋盘，且悔棋能恢复被吃的棋子。"""
+        import copy
+        import pickle
+
+        data = pickle.dumps(self.board)
+        self.assertLess(len(data), 2000)
+        fen = self.board.to_fen()
+        copies = (self.board.clone(), pickle.loads(data), copy.deepcopy(self.board))
+        for copied in copies:
+            self.assert_same_game(copied)
+            while copied.move_stack:
+                copied.unmake_move()
+            self.assertEqual(self.board.to_fen(), fen)
+            self.assertEqual(len(self.board.chessmans_hash), 31)
+            pawn = copied.get_chessman(4, 6)
+            self.assertEqual(pawn.name, "black_pawn_3")
+            self.assertIs(copied.get_chessman_by_name("black_pawn_3"), pawn)
+            self.assertEqual(len(copied.hash_history), 1)
+
+    def test_bytes_round_trip_keeps_rules(self):
+        from my_chess.chess_core import repetition
+
+        self.board.rules = repetition.CHINESE_RULES
+        copied = Chessboard.from_bytes(memoryview(self.board.to_bytes()))
+        self.assertIs(copied.rules, repetition.CHINESE_RULES)
+        self.assert_same_game(copied)
+        with self.assertRaises(ValueError):
+            data = self.board.to_bytes()
+            Chessboard.from_bytes(bytes([STATE_VERSION + 1]) + data[1:])
+
+
+class TestMirrorHash(unittest.TestCase):
+    """左右镜像局面的规范哈希测试。"""
+
+    def play(self, *moves):
+        from my_chess.chess_core.tables import move_from_ucci
+
+        board = Chessboard("test")
+        board.init_board()
+        for ucci in moves:
+            move = move_from_ucci(ucci)
+            board.make_move(move >> 8, move & 0xFF)
+        return board
+
+    def test_mirror_images_share_canonical_hash(self):
+        """炮二平五与炮八平五互为镜像，规范哈希相同而局面哈希不同。"""
+        left, right = self.play("h2e2", "h9g7"), self.play("b2e2", "b9c7")
+        self.assertNotEqual(left.current_hash, right.current_hash)
+        self.assertEqual(left.current_hash, right.mirror_hash)
+        self.assertEqual(left.canonical_hash, right.canonical_hash)
+        self.assertNotEqual(left.is_mirrored, right.is_mirrored)
+        start = self.play()
+        self.assertEqual(start.current_hash, start.mirror_hash)
+        self.assertFalse(start.is_mirrored)
+
+    def test_incremental_matches_full_hash(self):
+        """走棋、吃子、悔棋后增量维护的镜像哈希与重新计算的一致。"""
+        board = self.play("h2e2", "h9g7", "e2e6", "g6g5")
+        self.assertEqual(
+            board.mirror_hash, board.zobrist.hash_board(board, mirror=True)
+        )
+        self.assertEqual(
+            Chessboard.from_fen(board.to_fen()).mirror_hash, board.mirror_hash
+        )
+        for _ in range(4):
+            board.unmake_move()
+        self.assertEqual(board.mirror_hash, self.play().mirror_hash)
 
 
 class TestMoveNotation(unittest.TestCase):
@@ -0,0 +1,307 @@
+"""SEE 与搜索单元测试。"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from my_chess.chess_ai.background import BackgroundSearch
+from my_chess.chess_ai.benchmark import SELECTIVE_OPTIONS
+from my_chess.chess_ai.move_picker import MovePicker
+from my_chess.chess_ai.search import MATE_SCORE, Searcher
+from my_chess.chess_ai.see import see
+from my_chess.chess_ai.smp import parallel_search
+from my_chess.chess_ai.transposition import LOWER, SharedTranspositionTable
+from my_chess.chess_core import movegen
+from my_chess.chess_core.chessboard import Chessboard
+from my_chess.chess_core.tables import mirror_move, move_from_ucci, move_to_ucci
+
+
+class TestSEE(unittest.TestCase):
+    """静态交换评估测试。"""
+
+    def test_undefended_capture(self):
+        """吃无根子得到该子全部价值。"""
+        board = Chessboard.from_fen("4k4/9/9/9/9/R3n4/9/9/9/3K5 w - - 0 1")
+        self.assertEqual(see(board, move_from_ucci("a4e4")), 400)
+
+    def test_defended_capture_loses(self):
+        """车吃有车保护的卒，亏车。"""
+        board = Chessboard.from_fen("3rk4/9/9/9/3p5/9/9/9/9/3R1K3 w - - 0 1")
+        self.assertEqual(see(board, move_from_ucci("d0d5")), -800)
+
+    def test_cannon_screen(self):
+        """炮架在交换中出现或消失。"""
+        # 黑炮隔马打到 e5
+        board = Chessboard.from_fen("3k5/4c4/4n4/9/R3p4/9/9/9/9/5K3 w - - 0 1")
+        self.assertEqual(see(board, move_from_ucci("a5e5")), -800)
+        # 红炮吃卒后，e 线上没有炮架，黑炮无法吃回
+        board = Chessboard.from_fen("3kc4/9/9/9/4p4/9/4P4/4C4/9/5K3 w - - 0 1")
+        self.assertEqual(see(board, move_from_ucci("e2e5")), 100)
+
+    def test_kings_facing_pin(self):
+        """黑马离开 e 线会造成将帅对脸，不能吃回。"""
+        board = Chessboard.from_fen("4k4/9/4n4/9/3p5/9/9/9/3R5/4K4 w - - 0 1")
+        self.assertEqual(see(board, move_from_ucci("d1d5")), 100)
+
+
+class TestSearcher(unittest.TestCase):
+    """搜索测试。"""
+
+    def test_finds_winning_move(self):
+        """双车可以一步杀（f0f8 困毙或 a1e1 将死）。"""
+        board = Chessboard.from_fen("4k4/9/9/9/9/9/9/9/R8/3K1R3 w - - 0 1")
+        move, score = Searcher(board).search(2)
+        self.assertIn(move_to_ucci(move), ("f0f8", "a1e1"))
+        self.assertEqual(score, MATE_SCORE - 1)
+        board.make_move(move >> 8, move & 0xFF)
+        self.assertEqual(movegen.legal_moves(board), [])
+
+    def test_search_restores_board(self):
+        """搜索结束后棋盘恢复原状。"""
+        board = Chessboard("test")
+        board.init_board()
+        fen, current_hash = board.to_fen(), board.current_hash
+        Searcher(board).search(2)
+        self.assertEqual(board.to_fen(), fen)
+        self.assertEqual(board.current_hash, current_hash)
+
+    def test_ordering_keeps_result(self):
+        """走法排序只减少节点数，不改变搜索结果。"""
+        fen = "3ak4/4a4/4b4/p3R3p/9/2n3p2/P1r3P1P/4C4/4A4/3AK4 w - - 0 1"
+        plain = Searcher(Chessboard.from_fen(fen), use_ordering=False)
+        ordered = Searcher(Chessboard.from_fen(fen), use_ordering=True)
+        self.assertEqual(plain.search(3)[1], ordered.search(3)[1])
+        self.assertLess(ordered.nodes, plain.nodes)
+
+    def test_principal_variation(self):
+        """主要变例从置换表中取出，第一步即最佳走法。"""
+        board = Chessboard.from_fen("4k4/9/9/9/9/9/9/9/R8/3K1R3 w - - 0 1")
+        searcher = Searcher(board)
+        move, _ = searcher.search(2)
+        self.assertEqual(searcher.principal_variation()[0], move)
+
+    def test_selective_switches(self):
+        """选择性搜索的各项开关单独开启都不漏一步杀，全部开启时节点更少且棋盘复原。"""
+        mate = "4k4/9/9/9/9/9/9/9/R8/3K1R3 w - - 0 1"
+        for option in SELECTIVE_OPTIONS:
+            options = {other: other == option for other in SELECTIVE_OPTIONS}
+            move, score = Searcher(Chessboard.from_fen(mate), **options).search(3)
+            self.assertIn(move_to_ucci(move), ("f0f8", "a1e1"), option)
+            self.assertEqual(score, MATE_SCORE - 1, option)
+
+        fen = "3ak4/4a4/4b4/p3R3p/9/2n3p2/P1r3P1P/4C4/4A4/3AK4 w - - 0 1"
+        plain = Searcher(
+            Chessboard.from_fen(fen), **{option: False for option in SELECTIVE_OPTIONS}
+        )
+        plain.search(4)
+        board = Chessboard.from_fen(fen)
+        state = (board.to_fen(), board.current_hash, board.mirror_hash)
+        selective = Searcher(board)
+        selective.search(4)
+        self.assertLess(selective.nodes, plain.nodes)
+        self.assertEqual((board.to_fen(), board.current_hash, board.mirror_hash), state)
+        self.assertEqual(selective.null_count, 0)
+
+    def test_null_move_zugzwang_guard(self):
+        """只剩士象兵的一方不做空着，避免等着局面误判。"""
+        board = Chessboard.from_fen("3k5/9/9/9/9/9/9/9/4A4/3AK4 w - - 0 1")
+        self.assertFalse(Searcher(board)._null_move_allowed())
+        board = Chessboard("test")
+        board.init_board()
+        self.assertTrue(Searcher(board)._null_move_allowed())
+        fen, current_hash = board.to_fen(), board.current_hash
+        board.make_null_move()
+        self.assertFalse(board.is_red_turn)
+        self.assertNotEqual(board.current_hash, current_hash)
+        board.unmake_null_move()
+        self.assertEqual((board.to_fen(), board.current_hash), (fen, current_hash))
+
+    def test_stop_inside_null_move(self):
+        """在空着子树中途停止搜索，棋盘与重复局面记录原样恢复。"""
+        board = Chessboard.from_fen(
+            "3ak4/4a4/4b4/p3R3p/9/2n3p2/P1r3P1P/4C4/4A4/3AK4 w - - 0 1"
+        )
+        base = len(board.move_stack)
+        state = (
+            dict(board.hash_history),
+            list(board.hash_stack),
+            board.current_hash,
+            board.mirror_hash,
+        )
+        searcher = None
+
+        class NullMoveStop:
+            stopped = False
+
+            def is_set(self):
+                # 空着所在层之后又走了着法，说明正处于空着子树内部
+                depth = len(board.move_stack) - base
+                if searcher is not None and any(searcher.null_plies[:depth]):
+                    self.stopped = True
+                return self.stopped
+
+        stop = NullMoveStop()
+        searcher = Searcher(board, stop=stop)
+        searcher.search(6)
+        self.assertTrue(stop.stopped)
+        self.assertEqual(
+            (
+                dict(board.hash_history),
+                list(board.hash_stack),
+                board.current_hash,
+                board.mirror_hash,
+            ),
+            state,
+        )
+        self.assertEqual(len(board.move_stack), base)
+
+    def test_multi_pv(self):
+        """多主变搜索给出互不相同、分数不升的几条主变，第一条与单主变结果一致。"""
+        fen = "3ak4/4a4/4b4/p3R3p/9/2n3p2/P1r3P1P/4C4/4A4/3AK4 w - - 0 1"
+        move, score = Searcher(Chessboard.from_fen(fen)).search(3)
+        searcher = Searcher(Chessboard.from_fen(fen), multi_pv=3)
+        self.assertEqual(searcher.search(3), (move, score))
+        moves = [line_move for line_move, _ in searcher.pv_lines]
+        scores = [line_score for _, line_score in searcher.pv_lines]
+        self.assertEqual(len(set(moves)), 3)
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        variations = searcher.principal_variations()
+        self.assertEqual([line[0] for _, line in variations], moves)
+        self.assertEqual([line_score for line_score, _ in variations], scores)
+
+    def test_exclude_moves(self):
+        """排除的根着法不会被搜索。"""
+        board = Chessboard.from_fen("4k4/9/9/9/9/9/9/9/R8/3K1R3 w - - 0 1")
+        excluded = [move_from_ucci("a1e1")]
+        move, score = Searcher(board, exclude_moves=excluded).search(2)
+        self.assertEqual((move_to_ucci(move), score), ("f0f8", MATE_SCORE - 1))
+        excluded.append(move)
+        move, _ = Searcher(board, exclude_moves=excluded).search(2)
+        self.assertNotIn(move, excluded)
+
+    def test_mirrored_position_shares_table(self):
+        """左右镜像局面共用置换表条目，取出的走法按当前局面镜像还原。"""
+        searcher = Searcher(Chessboard.from_fen("4k4/9/9/9/9/9/9/9/R8/3K1R3 w - - 0 1"))
+        move, score = searcher.search(2)
+        mirrored = Searcher(
+            Chessboard.from_fen("4k4/9/9/9/9/9/9/9/8R/3R1K3 w - - 0 1"), tt=searcher.tt
+        )
+        self.assertEqual(mirrored.principal_variation()[0], mirror_move(move))
+        self.assertEqual(mirrored.search(2), (mirror_move(move), score))
+
+
+class TestMovePicker(unittest.TestCase):
+    """分阶段走法生成测试。"""
+
+    def test_yields_every_move_once(self):
+        """置换表走法最先给出，所有走法恰好出现一次。"""
+        board = Chessboard.from_fen(
+            "r2akab1r/3n5/4b1nc1/p1p1p3p/6p2/2P1c4/P3P1P1P/1CN1C1N2/9/R1BAKAB1R w - - 0 1"
+        )
+        tt_move = move_from_ucci("b2b9")
+        killer = move_from_ucci("a0a1")
+        moves = list(MovePicker(board, tt_move, [killer, 0], 0, [0] * (1 << 15)))
+        self.assertEqual(moves[0], tt_move)
+        self.assertEqual(sorted(moves), sorted(movegen.generate_moves(board, [])))
+
+    def test_rejects_foreign_tt_move(self):
+        """不属于当前局面的置换表走法被丢弃。"""
+        board = Chessboard.from_fen("4k4/9/9/9/9/9/9/9/R8/3K1R3 w - - 0 1")
+        bogus = move_from_ucci("e9e8")
+        moves = list(MovePicker(board, bogus))
+        self.assertNotIn(bogus, moves)
+        self.assertEqual(sorted(moves), sorted(movegen.generate_moves(board, [])))
+
+
+class TestParallelSearch(unittest.TestCase):
+    """多进程并行搜索测试。"""
+
+    def test_zobrist_is_deterministic(self):
+        """不同棋盘对象的同一局面哈希相同，进程间才能共享置换表。"""
+        first = Chessboard("a")
+        first.init_board()
+        second = Chessboard.from_fen(first.to_fen())
+        self.assertEqual(first.current_hash, second.current_hash)
+
+    def test_shared_table_round_trip(self):
+        """共享内存置换表与普通置换表行为一致，可以被其他进程附加。"""
+        table = SharedTranspositionTable(1024)
+        try:
+            key = (1 << 63) + 12345
+            table.store(key, 5, LOWER, -29990, move_from_ucci("h2e2"))
+            other = SharedTranspositionTable(1024, name=table.name)
+            self.assertEqual(
+                other.probe(key), (5, LOWER, -29990, move_from_ucci("h2e2"))
+            )
+            self.assertIsNone(other.probe(key + 1024))
+            # 浅层的非精确结果不覆盖深层结果
+            other.store(key, 2, LOWER, 0, 0)
+            self.assertEqual(table.probe(key)[0], 5)
+            other.close()
+        finally:
+            table.close()
+            table.unlink()
+
+    def test_parallel_search(self):
+        """多个进程的搜索结果与单进程一致，节点数合计。"""
+        fen = "4k4/9/9/9/9/9/9/9/R8/3K1R3 w - - 0 1"
+        single = parallel_search(Chessboard.from_fen(fen), 2, workers=1)
+        board = Chessboard.from_fen(fen)
+        result = parallel_search(board, 2, workers=2)
+        self.assertEqual(result.score, single.score)
+        self.assertEqual(result.workers, 2)
+        self.assertGreater(result.nodes, 0)
+        self.assertEqual(board.to_fen(), fen)
+
+
+class TestBackgroundSearch(unittest.TestCase):
+    """后台进程搜索测试。"""
+
+    def wait_for_move(self, engine):
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            move = engine.poll()
+            if move is not None:
+                return move
+            time.sleep(0.01)
+        self.fail("background search did not finish")
+
+    def test_poll_returns_best_move(self):
+        """轮询不阻塞，搜索结束后返回最佳走法并更新搜索信息。"""
+        board = Chessboard.from_fen("4k4/9/9/9/9/9/9/9/R8/3K1R3 w - - 0 1")
+        engine = BackgroundSearch(depth=2, workers=1)
+        try:
+            engine.start(board)
+            self.assertTrue(engine.thinking)
+            move = self.wait_for_move(engine)
+            self.assertIn(move_to_ucci(move), ("f0f8", "a1e1"))
+            self.assertFalse(engine.thinking)
+            self.assertEqual(engine.score, MATE_SCORE - 1)
+            self.assertEqual(engine.pv[0], move)
+        finally:
+            engine.close()
+
+    def test_stop_and_cancel(self):
+        """停止后仍返回走法；取消后旧结果被丢弃。"""
+        board = Chessboard("test")
+        board.init_board()
+        engine = BackgroundSearch(depth=20, workers=1)
+        try:
+            engine.start(board)
+            time.sleep(0.5)
+            engine.stop()
+            move = self.wait_for_move(engine)
+            self.assertTrue(movegen.is_legal(board, move))
+            engine.start(board)
+            engine.cancel()
+            self.assertFalse(engine.thinking)
+            self.assertIsNone(engine.poll())
+        finally:
+            engine.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""对局服务器测试。"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from my_chess.chess_server.server import GameServer
+
+
+class TestGameServer(unittest.TestCase):
+    def run_session(self, requests):
+        """启动服务器，按顺序发送请求，返回每个请求的响应。"""
+
+        async def scenario():
+            game_server = GameServer(ProcessPoolExecutor(max_workers=1))
+            server = await game_server.start("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = []
+            try:
+                for request in requests:
+                    writer.write(json.dumps(request).encode() + b"\n")
+                    await writer.drain()
+                    responses.append(json.loads(await reader.readline()))
+            finally:
+                writer.close()
+                await game_server.close()
+            return responses, game_server
+
+        return asyncio.run(scenario())
+
+    def test_human_vs_human(self):
+        responses, game_server = self.run_session(
+            [
+                {"op": "new", "id": 1},
+                {"op": "move", "game": 1, "move": "h2e2", "id": 2},
+                {"op": "move", "game": 1, "move": "h2e2", "id": 3},
+                {"op": "state", "game": 1},
+                {"op": "metrics"},
+            ]
+        )
+        new, move, illegal, state, metrics = responses
+        self.assertTrue(new["ok"])
+        self.assertEqual(new["id"], 1)
+        self.assertEqual(move["moves"], ["h2e2"])
+        self.assertIsNone(move["reply"])
+        self.assertFalse(illegal["ok"])
+        self.assertIn("illegal", illegal["error"])
+        self.assertEqual(state["turn"], "black")
+        self.assertEqual(state["notation"], ["炮二平五"])
+        self.assertEqual(metrics["per_game"]["1"]["requests"]["count"], 4)
+
+    def test_engine_reply(self):
+        responses, _ = self.run_session(
+            [
+                {"op": "new", "engine": "black", "depth": 1},
+                {"op": "move", "game": 1, "move": "h2e2"},
+                {"op": "metrics"},
+            ]
+        )
+        move = responses[1]
+        self.assertTrue(move["ok"])
+        self.assertEqual(len(move["moves"]), 2)
+        self.assertEqual(move["reply"]["move"], move["moves"][1])
+        self.assertEqual(move["turn"], "red")
+        self.assertEqual(responses[2]["per_game"]["1"]["engine"]["count"], 1)
+
+    def test_bad_requests(self):
+        responses, _ = self.run_session(
+            [{"op": "state", "game": 9}, {"op": "move"}, {"op": "new", "engine": "x"}]
+        )
+        self.assertEqual([r["ok"] for r in responses], [False, False, False])
+
+    def test_snapshot_resume(self):
+        """保存的对局在新服务器上恢复，编号、设置和计时不变。"""
+        _, game_server = self.run_session(
+            [
+                {"op": "new", "engine": "black", "depth": 2},
+                {"op": "new"},
+                {"op": "move", "game": 2, "move": "h2e2"},
+            ]
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.snap")
+            self.assertEqual(game_server.save_games(path), 2)
+            resumed = GameServer(ProcessPoolExecutor(max_workers=1))
+            try:
+                self.assertEqual(resumed.restore_games(path), 2)
+            finally:
+                resumed.executor.shutdown()
+        self.assertEqual(resumed.next_id, 3)
+        for game_id, session in game_server.games.items():
+            self.assertEqual(resumed.games[game_id].state(), session.state())
+        self.assertEqual(resumed.games[1].engine_is_red, False)
+        self.assertEqual(resumed.games[1].depth, 2)
+        self.assertIsNone(resumed.games[2].engine_is_red)
+        self.assertEqual(resumed.games[2].state()["notation"], ["炮二平五"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""对局快照保存与恢复测试。"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from my_chess.chess_core import movegen, repetition
+from my_chess.chess_core.chessboard import Chessboard
+from my_chess.chess_core.snapshot import GameSnapshot, load_many, save_many
+from my_chess.chess_core.tables import col_of, row_of
+
+
+def random_game(seed, plies, fen=None):
+    """按随机合法走法下若干步，返回棋盘。"""
+    rng = random.Random(seed)
+    if fen is None:
+        board = Chessboard("snapshot")
+        board.init_board()
+    else:
+        board = Chessboard.from_fen(fen)
+    for _ in range(plies):
+        moves = movegen.legal_moves(board)
+        if not moves:
+            break
+        move = rng.choice(moves)
+        from_sq, to_sq = move >> 8, move & 0xFF
+        piece = board.get_chessman(col_of(from_sq), row_of(from_sq))
+        board.move_chessman(piece, col_of(to_sq), row_of(to_sq))
+    return board
+
+
+class TestGameSnapshot(unittest.TestCase):
+    def assertSameGame(self, restored, board):
+        self.assertEqual(restored.to_fen(), board.to_fen())
+        self.assertEqual(restored.move_stack, board.move_stack)
+        self.assertEqual(restored.hash_stack, board.hash_stack)
+        self.assertEqual(restored.hash_history, board.hash_history)
+        self.assertEqual(restored.moves_history, board.moves_history)
+        self.assertEqual(restored.get_winner(), board.get_winner())
+
+    def test_round_trip(self):
+        """二进制与 JSON 两种格式都能完整恢复对局，包括计时和规则。"""
+        board = random_game(1, 40)
+        board.rules = repetition.CHINESE_RULES
+        snapshot = GameSnapshot.capture(board, 61000, 58000, "meta")
+        self.assertEqual(board.to_fen(), random_game(1, 40).to_fen())  # 棋盘不变
+        for copy in (
+            GameSnapshot.unpack(snapshot.pack()),
+            GameSnapshot.from_json(snapshot.to_json()),
+        ):
+            self.assertEqual(copy, snapshot)
+            restored = copy.restore()
+            self.assertSameGame(restored, board)
+            self.assertIs(restored.rules, repetition.CHINESE_RULES)
+        self.assertEqual((snapshot.red_ms, snapshot.black_ms), (61000, 58000))
+
+    def test_cleared_board(self):
+        """clear_board 得到的棋盘没有哈希记录，也能打包和解包。"""
+        board = Chessboard("empty")
+        board.clear_board()
+        snapshot = GameSnapshot.capture(board)
+        self.assertEqual(snapshot.hashes, [])
+        self.assertEqual(GameSnapshot.unpack(snapshot.pack()), snapshot)
+
+    def test_fen_start(self):
+        fen = "3k5/9/9/9/9/9/9/9/4R4/4K4 w - - 0 1"
+        board = random_game(2, 10, fen)
+        snapshot = GameSnapshot.capture(board)
+        self.assertEqual(snapshot.fen, fen)
+        self.assertSameGame(snapshot.restore(), board)
+
+    def test_bulk_save_and_load(self):
+        boards = [random_game(seed, seed % 60) for seed in range(200)]
+        snapshots = [
+            GameSnapshot.capture(board, seed) for seed, board in enumerate(boards)
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.snap")
+            self.assertEqual(save_many(path, snapshots), 200)
+            loaded = load_many(path)
+        self.assertEqual(loaded, snapshots)
+        self.assertSameGame(loaded[57].restore(), boards[57])
+
+    def test_mismatch_rejected(self):
+        """哈希与走法不一致、文件格式不对时报错。"""
+        snapshot = GameSnapshot.capture(random_game(3, 12))
+        snapshot.hashes[-1] ^= 1
+        with self.assertRaises(ValueError):
+            snapshot.restore()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bad.snap")
+            with open(path, "wb") as file:
+                file.write(b"not a snapshot file")
+            with self.assertRaises(ValueError):
+                load_many(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""预计算表磁盘缓存测试。"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from my_chess.chess_core import table_cache, tables, zobrist
+
+
+class TestTableCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = os.path.join(self.tmp.name, "builder.py")
+        with open(self.source, "w") as f:
+            f.write("# builder\n")
+        patcher = mock.patch.dict(
+            os.environ, {table_cache.CACHE_ENV: os.path.join(self.tmp.name, "cache")}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return {"RAYS": [((1, 2), (3,))], "KEY": 1 << 63}
+
+    def load(self):
+        return table_cache.load_or_build("test", self.source, self.build)
+
+    def test_round_trip(self):
+        """第一次构建并写入，之后直接从缓存读出相同的表。"""
+        first = self.load()
+        self.assertEqual(table_cache.STATS["test"], "miss")
+        second = self.load()
+        self.assertEqual(table_cache.STATS["test"], "hit")
+        self.assertEqual(first, second)
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(
+            os.listdir(os.path.join(self.tmp.name, "cache")), ["test.marshal"]
+        )
+
+    def test_stale_or_corrupt_rebuilds(self):
+        """构建模块改动或缓存文件损坏时重新构建。"""
+        self.load()
+        with open(self.source, "a") as f:
+            f.write("# edited\n")
+        self.load()
+        self.assertEqual((table_cache.STATS["test"], self.builds), ("miss", 2))
+        with open(os.path.join(self.tmp.name, "cache", "test.marshal"), "r+b") as f:
+            f.truncate(7)
+        self.assertEqual(self.load(), self.build())
+        self.assertEqual(table_cache.STATS["test"], "miss")
+
+    def test_disabled(self):
+        with mock.patch.dict(os.environ, {table_cache.CACHE_ENV: ""}):
+            self.load()
+            self.load()
+        self.assertEqual((table_cache.STATS["test"], self.builds), ("off", 2))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "cache")))
+
+    def test_module_tables_match_build(self):
+        """模块加载的表（可能来自缓存）与重新构建的完全一致。"""
+        built = tables._build_tables()
+        for name, table in built.items():
+            self.assertEqual(getattr(tables, name), table, name)
+        self.assertEqual((zobrist.PIECE_KEYS, zobrist.TURN_KEY), zobrist._build_keys())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+"""用时管理测试。"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from my_chess.chess_ai import time_manager
+from my_chess.chess_ai.background import BackgroundSearch
+from my_chess.chess_ai.search import MAX_PLY, Searcher
+from my_chess.chess_ai.time_manager import TimeControl, TimeManager, allocate
+from my_chess.chess_core import movegen
+from my_chess.chess_core.chessboard import Chessboard
+from my_chess.chess_core.tables import move_from_ucci
+
+
+class TestAllocate(unittest.TestCase):
+    def test_sudden_death_and_increment(self):
+        """包干制按剩余步数平分，加秒部分计入；硬上限不超过剩余时间的一半。"""
+        optimum, maximum = allocate(TimeControl(time_ms=60000))
+        available = 60000 - time_manager.MOVE_OVERHEAD_MS
+        self.assertEqual(optimum, available // time_manager.MOVES_HORIZON)
+        self.assertLessEqual(maximum, available * time_manager.MAX_FRACTION)
+        self.assertGreater(maximum, optimum)
+        with_increment, _ = allocate(TimeControl(time_ms=60000, increment_ms=2000))
+        self.assertGreater(with_increment, optimum + 1000)
+
+    def test_moves_to_go(self):
+        """到时限前的最后一步可以用掉大部分剩余时间，但不会超时。"""
+        optimum, maximum = allocate(TimeControl(time_ms=10000, moves_to_go=1))
+        self.assertGreater(optimum, 5000)
+        self.assertLess(maximum, 10000 - time_manager.MOVE_OVERHEAD_MS)
+        ten_moves, _ = allocate(TimeControl(time_ms=10000, moves_to_go=10))
+        self.assertLess(ten_moves, optimum)
+
+    def test_nearly_flagging(self):
+        """时间将尽时的预算不超过扣除传递开销后的剩余时间。"""
+        for clock in (0, 20, 60, 100):
+            optimum, maximum = allocate(TimeControl(time_ms=clock))
+            self.assertLessEqual(optimum, maximum)
+            self.assertLessEqual(maximum, max(0, clock - time_manager.MOVE_OVERHEAD_MS))
+
+    def test_move_time(self):
+        self.assertEqual(allocate(TimeControl(move_time_ms=1000)), (950, 950))
+
+
+class TestTimeManager(unittest.TestCase):
+    def iteration(self, manager, depth, move, score):
+        board = Chessboard("test")
+        board.init_board()
+        searcher = SimpleNamespace(pv_lines=[(move, score)], board=board)
+        manager.on_iteration(searcher, depth, score)
+
+    def test_stability_scales_target(self):
+        """最佳着法稳定时缩短用时，着法变化或分数下跌时延长。"""
+        stable = TimeManager(TimeControl(time_ms=600000))
+        for depth in range(1, 6):
+            self.iteration(stable, depth, 1, 0)
+        self.assertLess(stable.target_ms, stable.optimum_ms)
+
+        changing = TimeManager(TimeControl(time_ms=600000))
+        for depth in range(1, 6):
+            self.iteration(changing, depth, depth, 0)
+        self.assertGreater(changing.target_ms, changing.optimum_ms)
+
+        dropping = TimeManager(TimeControl(time_ms=600000))
+        self.iteration(dropping, 1, 1, 100)
+        self.iteration(dropping, 2, 1, -100)
+        self.assertGreater(dropping.target_ms, dropping.optimum_ms)
+        self.assertLessEqual(dropping.target_ms, dropping.maximum_ms)
+        self.assertFalse(dropping.is_set())
+
+    def test_hard_stop_and_outside_stop(self):
+        manager = TimeManager(TimeControl(time_ms=70))
+        time.sleep(0.05)
+        self.assertTrue(manager.is_set())
+        stop = threading.Event()
+        manager = TimeManager(TimeControl(time_ms=600000), stop)
+        self.assertFalse(manager.is_set())
+        stop.set()
+        self.assertTrue(manager.is_set())
+
+    def test_ponder(self):
+        """后台思考时不受时限约束；ponderhit 后开始计时，已想够则立即停。"""
+        ponderhit = threading.Event()
+        manager = TimeManager(TimeControl(time_ms=70), ponderhit=ponderhit)
+        time.sleep(0.05)
+        self.iteration(manager, 1, 1, 0)
+        self.assertFalse(manager.is_set())
+        ponderhit.set()
+        self.assertTrue(manager.is_set())
+
+        ponderhit = threading.Event()
+        manager = TimeManager(TimeControl(time_ms=600000), ponderhit=ponderhit)
+        self.iteration(manager, 1, 1, 0)
+        ponderhit.set()
+        self.assertFalse(manager.is_set())
+        self.assertFalse(manager.pondering)
+        self.assertGreater(manager.deadline, time.perf_counter())
+
+    def test_timed_search(self):
+        """按时搜索不超过硬上限，且返回合法着法。"""
+        board = Chessboard("test")
+        board.init_board()
+        manager = TimeManager(TimeControl(time_ms=3000))
+        searcher = Searcher(board, stop=manager, on_iteration=manager.on_iteration)
+        move, _ = searcher.search(MAX_PLY)
+        self.assertTrue(movegen.is_legal(board, move))
+        self.assertLess(manager.elapsed_ms(), manager.maximum_ms + 100)
+        self.assertGreater(searcher.depth, 0)
+
+    def test_forced_move_is_instant(self):
+        """只有一个合法着法时搜完第一层就走。"""
+        board = Chessboard.from_fen("3k5/9/9/9/9/9/9/9/9/4K1R2 b - - 0 1")
+        self.assertEqual(len(board.legal_moves()), 1)
+        manager = TimeManager(TimeControl(time_ms=600000))
+        searcher = Searcher(board, stop=manager, on_iteration=manager.on_iteration)
+        searcher.search(MAX_PLY)
+        self.assertEqual(searcher.depth, 1)
+
+    def test_background_search_on_clock(self):
+        """后台搜索按给定的每步用时走棋。"""
+        board = Chessboard("test")
+        board.init_board()
+        engine = BackgroundSearch(workers=1)
+        try:
+            start = time.monotonic()
+            engine.start(board, TimeControl(move_time_ms=500))
+            while engine.poll() is None:
+                self.assertLess(time.monotonic() - start, 10)
+                time.sleep(0.01)
+            self.assertLess(time.monotonic() - start, 2)
+        finally:
+            engine.close()
+
+    def test_background_ponder(self):
+        """猜中对方应着时沿用后台思考的搜索并很快走棋；猜错则取消。"""
+        board = Chessboard("test")
+        board.init_board()
+        expected = move_from_ucci("h2e2")
+        engine = BackgroundSearch(workers=1)
+        try:
+            engine.ponder(board, expected, TimeControl(time_ms=3000))
+            self.assertTrue(engine.pondering)
+            time.sleep(0.5)
+            self.assertIsNone(engine.poll())
+            other = board.clone()
+            other.make_move(expected >> 8, expected & 0xFF)
+            start = time.monotonic()
+            self.assertTrue(engine.check_ponder(other))
+            self.assertFalse(engine.pondering)
+            move = engine.poll()
+            while move is None:
+                self.assertLess(time.monotonic() - start, 10)
+                time.sleep(0.01)
+                move = engine.poll()
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertTrue(movegen.is_legal(other, move))
+
+            engine.ponder(board, expected, TimeControl(time_ms=3000))
+            played = move_from_ucci("b2e2")
+            board.make_move(played >> 8, played & 0xFF)
+            self.assertFalse(engine.check_ponder(board))
+            self.assertFalse(engine.pondering or engine.thinking)
+        finally:
+            engine.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
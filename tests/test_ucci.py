@@ -1,10 +1,17 @@
-import unittest
-import sys
+import contextlib
+import io
 import os
+import pickle
+import subprocess
+import sys
+import time
+import unittest
 
 # Add project parent directory to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
+import my_chess
+from my_chess.chess_ai.ucci import UcciEngine
 from my_chess.chess_core.point import Point
 
 
@@ -58,6 +65,135 @@ class TestUCCI(unittest.TestCase):
         with self.assertRaises(ValueError):
             Point.from_ucci("a")
 
+    def test_interned_immutable(self):
+        p = Point(4, 4)
+        self.assertIs(p, Point(4, 4))
+        self.assertIs(p, Point.from_ucci("e4"))
+        self.assertIs(pickle.loads(pickle.dumps(p)), p)
+        self.assertEqual({p: 1}[Point(4, 4)], 1)
+        self.assertFalse(hasattr(p, "__dict__"))
+        with self.assertRaises(AttributeError):
+            p.x = 5
+        # Off-board points still work, they are just not cached
+        self.assertEqual(Point(-1, 0), Point(-1, 0))
+        self.assertIsNot(Point(-1, 0), Point(-1, 0))
+
+
+class TestUcciEngine(unittest.TestCase):
+    def setUp(self):
+        self.output = []
+        self.engine = UcciEngine(self.output.append)
+
+    def test_handshake(self):
+        self.engine.handle("ucci")
+        self.assertEqual(self.output[-1], "ucciok")
+        self.engine.handle("isready")
+        self.assertEqual(self.output[-1], "readyok")
+        self.assertFalse(self.engine.handle("quit"))
+
+    def test_position_moves(self):
+        self.engine.handle("position startpos moves h2e2 h9g7")
+        self.assertEqual(len(self.engine.board.move_stack), 2)
+        self.assertTrue(self.engine.board.is_red_turn)
+
+    def test_invalid_position(self):
+        """非法 FEN 不改变当前局面，也不往标准输出写任何内容。"""
+        self.engine.handle("position startpos moves h2e2")
+        fen = self.engine.board.to_fen()
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.engine.handle("position fen P8/9/9/9/9/9/9/9/9/4K1k2 w - - 0 1")
+        self.assertEqual(self.engine.board.to_fen(), fen)
+        self.assertEqual(self.output, [])
+        self.assertIn("ignored position", stderr.getvalue())
+
+    def test_go_depth(self):
+        self.engine.handle("setoption threads 2")
+        self.engine.handle("position fen 4k4/9/9/9/9/9/9/9/R8/3K1R3 w - - 0 1")
+        self.engine.handle("go depth 2")
+        self.engine.wait_search()
+        self.assertIn(self.output[-1], ("bestmove f0f8", "bestmove a1e1"))
+        self.assertTrue(any(" nps " in line for line in self.output))
+
+    def test_go_clock(self):
+        """go 的计时参数按走棋方读取，红方对应 UCI 的 white。"""
+        self.engine.handle("position startpos moves h2e2")
+        depth, control = self.engine.parse_go(
+            "wtime 1000 btime 60000 winc 1 binc 2000 movestogo 20".split()
+        )
+        self.assertEqual(
+            (control.time_ms, control.increment_ms, control.moves_to_go),
+            (60000, 2000, 20),
+        )
+        self.assertGreater(depth, 20)
+        depth, control = self.engine.parse_go("time 5000 increment 100 depth 3".split())
+        self.assertEqual((depth, control.time_ms, control.increment_ms), (3, 5000, 100))
+        self.assertEqual(self.engine.parse_go(["depth", "2"]), (2, None))
+        self.engine.handle("go movetime 300")
+        self.engine.wait_search()
+        self.assertTrue(self.output[-1].startswith("bestmove "))
+
+    def test_stop(self):
+        """搜索在后台进行：isready 立即回答，stop 使深层搜索及时给出着法。"""
+        self.engine.handle("position startpos")
+        start = time.monotonic()
+        self.engine.handle("go depth 30")
+        self.engine.handle("isready")
+        self.assertIn("readyok", self.output)
+        time.sleep(0.2)
+        self.engine.handle("stop")
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertTrue(self.output[-1].startswith("bestmove "))
+        self.assertIsNone(self.engine.search_thread)
+
+    def test_multi_pv(self):
+        self.engine.handle("setoption multipv 3")
+        self.engine.handle("position startpos moves h2e2 h9g7")
+        self.engine.handle("go depth 2")
+        self.engine.wait_search()
+        last = [line for line in self.output if line.startswith("info depth 2 ")]
+        self.assertEqual(
+            [line.split()[4] for line in last if " multipv " in line], ["1", "2", "3"]
+        )
+        self.assertTrue(self.output[-1].startswith("bestmove "))
+
+    def test_ponder(self):
+        """后台思考在 ponderhit 或 stop 之前不给出着法。"""
+        self.engine.handle("position startpos moves h2e2 h9g7")
+        self.engine.handle("go ponder wtime 60000 btime 60000")
+        time.sleep(0.3)
+        self.assertFalse(any(line.startswith("bestmove") for line in self.output))
+        self.engine.handle("isready")
+        self.assertEqual(self.output[-1], "readyok")
+        self.engine.handle("ponderhit")
+        self.engine.search_thread.join(30)
+        self.assertTrue(self.output[-1].startswith("bestmove "))
+        self.assertIn(" ponder ", self.output[-1])
+
+        del self.output[:]
+        self.engine.handle("go ponder depth 1")
+        time.sleep(0.3)
+        self.assertFalse(any(line.startswith("bestmove") for line in self.output))
+        self.engine.handle("stop")
+        self.assertTrue(self.output[-1].startswith("bestmove "))
+
+    def test_run_py_stdout(self):
+        """经 run.py 启动时，标准输出的第一行就是协议内容。"""
+        package_dir = os.path.dirname(os.path.abspath(my_chess.__file__))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [os.path.dirname(package_dir), env.get("PYTHONPATH")])
+        )
+        output = subprocess.run(
+            [sys.executable, os.path.join(package_dir, "run.py"), "ucci"],
+            input="ucci\nquit\n",
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        ).stdout
+        self.assertTrue(output.startswith("id name "), output)
+
 
 if __name__ == "__main__":
     unittest.main()
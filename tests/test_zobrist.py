@@ -0,0 +1,74 @@
+"""Zobrist 哈希测试。"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from my_chess.chess_core.chessboard import Chessboard
+from my_chess.chess_core.tables import EMPTY, move_from_ucci
+from my_chess.chess_core.zobrist import (
+    KEYS,
+    PIECE_KEYS,
+    TURN_KEY,
+    Zobrist,
+    hash_codes,
+    hash_many,
+)
+
+
+def slow_hash(board):
+    """按棋子逐个查二维键表的参考实现。"""
+    h = TURN_KEY if board.is_red_turn else 0
+    for sq, code in enumerate(board.codes):
+        if code != EMPTY:
+            h ^= PIECE_KEYS[code][sq]
+    return h
+
+
+class TestZobrist(unittest.TestCase):
+    def setUp(self):
+        self.boards = []
+        board = Chessboard("test")
+        board.init_board()
+        for ucci in ("h2e2", "h9g7", "e2e6", "g6g5", "b0c2"):
+            move = move_from_ucci(ucci)
+            board.make_move(move >> 8, move & 0xFF)
+            self.boards.append(board.clone())
+
+    def test_flat_table_matches_incremental_hash(self):
+        """增量哈希、整盘哈希与二维键表的结果一致。"""
+        self.assertEqual(len(KEYS), 14 * 90)
+        for board in self.boards:
+            self.assertEqual(board.current_hash, slow_hash(board))
+            self.assertEqual(Zobrist().hash_board(board), board.current_hash)
+            self.assertEqual(
+                hash_codes(board.codes, board.is_red_turn), board.current_hash
+            )
+        piece = self.boards[0].get_chessman(4, 2)
+        self.assertEqual(Zobrist().get_piece_index(piece), 5)
+
+    def test_hash_many(self):
+        """批量哈希与逐盘哈希一致（有无 NumPy 都适用）。"""
+        codes = [board.to_codes() for board in self.boards]
+        turns = [board.is_red_turn for board in self.boards]
+        expected = [board.current_hash for board in self.boards]
+        self.assertEqual([int(h) for h in hash_many(codes, turns)], expected)
+        red = [int(h) for h in hash_many(codes)]
+        self.assertEqual(red[0], expected[0] ^ TURN_KEY)
+        self.assertEqual(red[1], expected[1])
+
+    def test_hash_many_numpy(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+        codes = np.array([board.to_codes() for board in self.boards], dtype=np.int8)
+        hashes = hash_many(codes, [board.is_red_turn for board in self.boards])
+        self.assertEqual(hashes.dtype, np.uint64)
+        self.assertEqual(hashes.tolist(), [board.current_hash for board in self.boards])
+
+
+if __name__ == "__main__":
+    unittest.main()